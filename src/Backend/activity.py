@@ -0,0 +1,236 @@
+"""
+Lead Activity Summary
+
+WHY THIS FILE EXISTS:
+- Lead lists need "last contacted" / "next meeting" without fetching
+  every lead's calls and meetings
+- Keeps leads_activity_summary in sync from the call/meeting write paths
+- Provides a reconciliation job that rebuilds the summary from
+  client_calls and client_meetings
+
+DESIGN PRINCIPLE:
+- Creates are applied incrementally with a single UPDATE (no read-modify-write)
+- Deletes recompute the one affected lead, since a max/min can't be "undone"
+- All functions only stage changes; the caller owns the commit
+- next_meeting_at is only exact when written: once that meeting passes the
+  lead's following meeting is read from client_meetings instead
+  (next_meeting_at() in queries, roll_forward() on loaded rows)
+"""
+
+import logging
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, case, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import ClientCall, ClientMeeting, LeadActivitySummary, LeadsInfo
+
+logger = logging.getLogger(__name__)
+
+# lead ids per IN list in roll_forward
+CHUNK_SIZE = 1000
+
+
+def refresh_lead(db: Session, company_domain: str, lead_id: int) -> None:
+    """Recompute one lead's summary from its calls and meetings"""
+    now = datetime.now()
+
+    call_count, last_call_at = db.query(
+        func.count(ClientCall.call_id),
+        func.max(ClientCall.call_date)
+    ).filter(ClientCall.lead_id == lead_id).one()
+
+    last_status = None
+    if call_count:
+        latest_call = db.query(ClientCall.call_status).filter(
+            ClientCall.lead_id == lead_id
+        ).order_by(ClientCall.call_date.desc(), ClientCall.call_id.desc()).first()
+        last_status = latest_call.call_status if latest_call else None
+
+    meeting_count, next_meeting_at = db.query(
+        func.count(ClientMeeting.meeting_id),
+        func.min(case((ClientMeeting.meeting_date >= now, ClientMeeting.meeting_date)))
+    ).filter(ClientMeeting.lead_id == lead_id).one()
+
+    db.merge(LeadActivitySummary(
+        lead_id=lead_id,
+        company_domain=company_domain,
+        call_count=call_count,
+        meeting_count=meeting_count,
+        last_call_at=last_call_at,
+        next_meeting_at=next_meeting_at,
+        last_status=last_status
+    ))
+
+
+def record_call(db: Session, call: ClientCall) -> None:
+    """Apply a newly created call to its lead's summary"""
+    summary = LeadActivitySummary
+    is_latest = or_(summary.last_call_at.is_(None), summary.last_call_at <= call.call_date)
+
+    updated = db.query(summary).filter(summary.lead_id == call.lead_id).update({
+        summary.call_count: summary.call_count + 1,
+        summary.last_call_at: case((is_latest, call.call_date), else_=summary.last_call_at),
+        summary.last_status: case((is_latest, call.call_status), else_=summary.last_status),
+        summary.date_updated: func.getdate()
+    }, synchronize_session=False)
+
+    # leads created before the summary existed get a full rebuild instead
+    if not updated:
+        db.flush()
+        refresh_lead(db, call.company_domain, call.lead_id)
+
+
+def record_meeting(db: Session, meeting: ClientMeeting) -> None:
+    """Apply a newly created meeting to its lead's summary"""
+    summary = LeadActivitySummary
+    now = datetime.now()
+    values = {
+        summary.meeting_count: summary.meeting_count + 1,
+        summary.date_updated: func.getdate()
+    }
+
+    if meeting.meeting_date and meeting.meeting_date >= now:
+        is_next = or_(
+            summary.next_meeting_at.is_(None),
+            summary.next_meeting_at < now,
+            summary.next_meeting_at > meeting.meeting_date
+        )
+        values[summary.next_meeting_at] = case(
+            (is_next, meeting.meeting_date), else_=summary.next_meeting_at
+        )
+
+    updated = db.query(summary).filter(summary.lead_id == meeting.lead_id).update(
+        values, synchronize_session=False
+    )
+
+    if not updated:
+        db.flush()
+        refresh_lead(db, meeting.company_domain, meeting.lead_id)
+
+
+def next_meeting_at(now: datetime):
+    """
+    The lead's next meeting as of now, for filters and sorts. Rows whose
+    stored meeting has passed look up the following one (ix_client_meetings_lead).
+    """
+    summary = LeadActivitySummary
+    following = select(func.min(ClientMeeting.meeting_date)).where(
+        ClientMeeting.lead_id == summary.lead_id,
+        ClientMeeting.meeting_date >= now
+    ).scalar_subquery()
+    return case((summary.next_meeting_at < now, following), else_=summary.next_meeting_at)
+
+
+def roll_forward(db: Session, summaries: Iterable[Optional[LeadActivitySummary]]) -> None:
+    """Replace next_meeting_at values that have passed on loaded summaries; nothing is written"""
+    now = datetime.now()
+    stale = {
+        summary.lead_id: summary for summary in summaries
+        if summary is not None and summary.next_meeting_at is not None and summary.next_meeting_at < now
+    }
+    lead_ids = list(stale)
+    following = {}
+    for start in range(0, len(lead_ids), CHUNK_SIZE):
+        following.update(db.query(
+            ClientMeeting.lead_id, func.min(ClientMeeting.meeting_date)
+        ).filter(
+            ClientMeeting.lead_id.in_(lead_ids[start:start + CHUNK_SIZE]),
+            ClientMeeting.meeting_date >= now
+        ).group_by(ClientMeeting.lead_id).all())
+
+    for lead_id, summary in stale.items():
+        set_committed_value(summary, "next_meeting_at", following.get(lead_id))
+
+
+def reconcile(db: Session, company_domain: str) -> int:
+    """
+    Rebuild every summary row for a company from client_calls and
+    client_meetings in two set-based statements. Returns the number of leads.
+    """
+    now = datetime.now()
+
+    call_stats = select(
+        ClientCall.lead_id,
+        func.count(ClientCall.call_id).label("call_count"),
+        func.max(ClientCall.call_date).label("last_call_at")
+    ).where(
+        ClientCall.company_domain == company_domain
+    ).group_by(ClientCall.lead_id).subquery()
+
+    ranked_calls = select(
+        ClientCall.lead_id,
+        ClientCall.call_status,
+        func.row_number().over(
+            partition_by=ClientCall.lead_id,
+            order_by=(ClientCall.call_date.desc(), ClientCall.call_id.desc())
+        ).label("rn")
+    ).where(
+        ClientCall.company_domain == company_domain
+    ).subquery()
+
+    meeting_stats = select(
+        ClientMeeting.lead_id,
+        func.count(ClientMeeting.meeting_id).label("meeting_count"),
+        func.min(case((ClientMeeting.meeting_date >= now, ClientMeeting.meeting_date))).label("next_meeting_at")
+    ).where(
+        ClientMeeting.company_domain == company_domain
+    ).group_by(ClientMeeting.lead_id).subquery()
+
+    source = select(
+        LeadsInfo.lead_id,
+        LeadsInfo.company_domain,
+        func.coalesce(call_stats.c.call_count, 0),
+        func.coalesce(meeting_stats.c.meeting_count, 0),
+        call_stats.c.last_call_at,
+        meeting_stats.c.next_meeting_at,
+        ranked_calls.c.call_status,
+        func.getdate()
+    ).select_from(LeadsInfo).outerjoin(
+        call_stats, call_stats.c.lead_id == LeadsInfo.lead_id
+    ).outerjoin(
+        ranked_calls, and_(ranked_calls.c.lead_id == LeadsInfo.lead_id, ranked_calls.c.rn == 1)
+    ).outerjoin(
+        meeting_stats, meeting_stats.c.lead_id == LeadsInfo.lead_id
+    ).where(LeadsInfo.company_domain == company_domain)
+
+    db.execute(delete(LeadActivitySummary).where(
+        LeadActivitySummary.company_domain == company_domain
+    ))
+    result = db.execute(insert(LeadActivitySummary).from_select([
+        "lead_id", "company_domain", "call_count", "meeting_count",
+        "last_call_at", "next_meeting_at", "last_status", "date_updated"
+    ], source))
+
+    return result.rowcount
+
+
+def reconcile_all(db: Session, company_domain: Optional[str] = None) -> dict:
+    """Reconcile one company, or every company that has leads"""
+    if company_domain:
+        domains = [company_domain]
+    else:
+        domains = [row[0] for row in db.query(LeadsInfo.company_domain).distinct().all()]
+
+    counts = {}
+    for domain in domains:
+        counts[domain] = reconcile(db, domain)
+        db.commit()
+    return counts
+
+
+if __name__ == "__main__":
+    # nightly job: python activity.py [company_domain]
+    import sys
+    import logging_config
+    from database import SessionLocal
+
+    logging_config.configure()
+    session = SessionLocal()
+    try:
+        for domain, count in reconcile_all(session, sys.argv[1] if len(sys.argv) > 1 else None).items():
+            logger.info("Reconciled %s leads for %s", count, domain)
+    finally:
+        session.close()
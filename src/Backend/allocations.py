@@ -0,0 +1,232 @@
+"""
+Memory Allocation Tracking
+
+WHY THIS FILE EXISTS:
+- The unbounded .all() list endpoints make worker memory jump, and nothing
+  said which endpoint (or which tenant) was behind a spike
+- Lets an operator (X-Ops-Token, auth.get_operator_user) switch
+  tracemalloc on, take snapshots and diff them by our own code lines, and
+  records each request's peak allocation next to the route metrics
+
+HOW IT WORKS:
+- tracker.start(frames) / stop() switch tracemalloc on and off in this
+  worker. A process started with PYTHONTRACEMALLOC=N traces from boot
+- A snapshot is attributed as soon as it is taken: every live allocation
+  is charged to the innermost frame in api/ or schemas.py of its
+  traceback, so rows built by SQLAlchemy or pydantic on behalf of
+  api/leads.py:189 count against that line. Allocations that never pass
+  through those files are only in the totals
+- Only the per-line totals are kept (SNAPSHOTS_KEPT of them), not the
+  tracemalloc snapshot itself, so snapshots stay cheap to hold and still
+  diff after tracing is stopped
+- request_started() / request_finished() bracket a request in
+  MetricsMiddleware: tracemalloc's peak is reset when no other request is
+  in flight, and the request's peak is the highest traced memory seen
+  minus what was traced when it began
+
+OVERHEAD:
+- Off: one tracemalloc.is_tracing() call per request
+- On: every allocation records its traceback; expect the worker to run
+  noticeably slower (more with more frames) and use more memory for the
+  traces - switch it on to investigate, then off again
+
+LIMITS:
+- tracemalloc is per process; with several workers each one has to be
+  switched on through a request it serves
+- The peak is process-wide: with overlapping requests it also counts what
+  the others allocated, so it is an upper bound there (exact for a request
+  that ran alone)
+- Frames deeper than the configured depth are cut off; an allocation whose
+  api/ frame is cut off is unattributed. Raise frames for deep call chains
+- ALLOCATION_TRACKING_ENABLED=false turns the operator switch off
+"""
+
+import os
+import secrets
+import threading
+import tracemalloc
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+ALLOCATION_TRACKING_ENABLED = os.getenv("ALLOCATION_TRACKING_ENABLED", "true").lower() == "true"
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "25"))
+SNAPSHOTS_KEPT = int(os.getenv("SNAPSHOTS_KEPT", "10"))
+
+TOP_LINES = 50
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+API_DIR = os.path.join(BACKEND_DIR, "api") + os.sep
+SCHEMAS_FILE = os.path.join(BACKEND_DIR, "schemas.py")
+
+# (size, count) per location
+Totals = Dict[str, Tuple[int, int]]
+
+
+def is_ours(filename: str) -> bool:
+    return filename.startswith(API_DIR) or filename == SCHEMAS_FILE
+
+
+def attribute(snapshot: tracemalloc.Snapshot) -> Totals:
+    """Live allocations per "file:line", charged to the innermost api/ or schemas.py frame"""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(True, API_DIR + "*", all_frames=True),
+        tracemalloc.Filter(True, SCHEMAS_FILE, all_frames=True),
+    ])
+    sizes: Dict[str, int] = defaultdict(int)
+    counts: Dict[str, int] = defaultdict(int)
+    # one group per distinct traceback; far fewer than traces
+    for stat in snapshot.statistics("traceback"):
+        for frame in reversed(stat.traceback):
+            if is_ours(frame.filename):
+                location = f"{frame.filename[len(BACKEND_DIR):]}:{frame.lineno}"
+                sizes[location] += stat.size
+                counts[location] += stat.count
+                break
+    return {location: (size, counts[location]) for location, size in sizes.items()}
+
+
+def group(totals: Totals, group_by: str) -> Totals:
+    if group_by == "lineno":
+        return totals
+    sizes: Dict[str, int] = defaultdict(int)
+    counts: Dict[str, int] = defaultdict(int)
+    for location, (size, count) in totals.items():
+        filename = location.rsplit(":", 1)[0]
+        sizes[filename] += size
+        counts[filename] += count
+    return {filename: (size, counts[filename]) for filename, size in sizes.items()}
+
+
+class MemorySnapshot:
+
+    def __init__(self, totals: Totals, traced_bytes: int, frames: int, label: Optional[str]):
+        self.snapshot_id = secrets.token_hex(8)
+        self.taken_at = datetime.now()
+        self.label = label
+        self.frames = frames
+        self.traced_bytes = traced_bytes
+        self.totals = totals
+
+    def summary(self) -> dict:
+        return {
+            "snapshot_id": self.snapshot_id,
+            "label": self.label,
+            "taken_at": self.taken_at,
+            "frames": self.frames,
+            "traced_bytes": self.traced_bytes,
+            "attributed_bytes": sum(size for size, _ in self.totals.values()),
+        }
+
+    def stats(self, group_by: str = "lineno", limit: int = TOP_LINES) -> List[dict]:
+        rows = sorted(group(self.totals, group_by).items(), key=lambda item: item[1][0], reverse=True)
+        return [{"location": location, "size_bytes": size, "count": count}
+                for location, (size, count) in rows[:limit]]
+
+    def diff(self, before: "MemorySnapshot", group_by: str = "lineno", limit: int = TOP_LINES) -> List[dict]:
+        """Per-location growth since before, biggest change (either way) first"""
+        now = group(self.totals, group_by)
+        then = group(before.totals, group_by)
+        rows = []
+        for location in now.keys() | then.keys():
+            size, count = now.get(location, (0, 0))
+            old_size, old_count = then.get(location, (0, 0))
+            if size != old_size or count != old_count:
+                rows.append({"location": location, "size_bytes": size, "size_diff_bytes": size - old_size,
+                             "count": count, "count_diff": count - old_count})
+        rows.sort(key=lambda row: abs(row["size_diff_bytes"]), reverse=True)
+        return rows[:limit]
+
+
+class AllocationTracker:
+
+    def __init__(self, kept: int = SNAPSHOTS_KEPT):
+        self.lock = threading.Lock()
+        self.kept = kept
+        self.snapshots: "OrderedDict[str, MemorySnapshot]" = OrderedDict()
+        self.started_at: Optional[datetime] = None
+
+    def start(self, frames: Optional[int] = None) -> None:
+        with self.lock:
+            frames = frames or TRACEMALLOC_FRAMES
+            if tracemalloc.is_tracing():
+                if tracemalloc.get_traceback_limit() == frames:
+                    return
+                # the depth is fixed per run
+                tracemalloc.stop()
+            tracemalloc.start(frames)
+            self.started_at = datetime.now()
+
+    def stop(self) -> None:
+        with self.lock:
+            tracemalloc.stop()
+            self.started_at = None
+
+    def snapshot(self, label: Optional[str] = None) -> MemorySnapshot:
+        """Attribute the live allocations now; raises RuntimeError when not tracing"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing")
+        raw = tracemalloc.take_snapshot()
+        traced_bytes, _ = tracemalloc.get_traced_memory()
+        snapshot = MemorySnapshot(attribute(raw), traced_bytes, raw.traceback_limit, label)
+        del raw
+        with self.lock:
+            self.snapshots[snapshot.snapshot_id] = snapshot
+            while len(self.snapshots) > self.kept:
+                self.snapshots.popitem(last=False)
+        return snapshot
+
+    def get(self, snapshot_id: str) -> Optional[MemorySnapshot]:
+        with self.lock:
+            return self.snapshots.get(snapshot_id)
+
+    def list(self) -> List[MemorySnapshot]:
+        with self.lock:
+            return list(reversed(self.snapshots.values()))
+
+    def status(self) -> dict:
+        tracing = tracemalloc.is_tracing()
+        traced_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else None,
+            "started_at": self.started_at,
+            "traced_bytes": traced_bytes,
+            "peak_bytes": peak_bytes,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": [snapshot.summary() for snapshot in self.list()],
+        }
+
+
+tracker = AllocationTracker()
+
+
+# Per-request peaks
+
+_lock = threading.Lock()
+_in_flight = 0
+
+
+def request_started() -> Optional[int]:
+    """Traced bytes at the start of a request, or None when not tracing"""
+    global _in_flight
+    if not tracemalloc.is_tracing():
+        return None
+    with _lock:
+        if _in_flight == 0:
+            tracemalloc.reset_peak()
+        _in_flight += 1
+        return tracemalloc.get_traced_memory()[0]
+
+
+def request_finished(baseline: Optional[int]) -> Optional[int]:
+    """Peak bytes allocated above baseline while the request ran"""
+    global _in_flight
+    if baseline is None:
+        return None
+    with _lock:
+        _in_flight -= 1
+        if not tracemalloc.is_tracing():
+            # switched off mid-request
+            return None
+        return max(0, tracemalloc.get_traced_memory()[1] - baseline)
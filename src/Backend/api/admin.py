@@ -0,0 +1,200 @@
+"""
+Admin Diagnostics API Endpoints
+
+WHY THIS FILE EXISTS:
+- Operators need to see where a slow request spends its time, and what
+  holds on to memory, without shell access to the server
+- Every endpoint here requires get_operator_user (the X-Ops-Token operator
+  credential): the rolling sampler and tracemalloc are process-wide and
+  see every tenant's requests, so a company admin check is not enough
+- Request profiles are still kept per company; an operator sees those of
+  the company they log in with
+
+ENDPOINTS PROVIDED:
+- GET  /profiles                      - Request profiles of this company, newest first
+- GET  /profiles/{profile_id}         - One profile: functions (cprofile) or stacks (sample)
+- GET  /profiles/{profile_id}/collapsed - Collapsed stacks as text, for flame graphs
+- GET  /profiler/sampler              - Rolling sampler state
+- PUT  /profiler/sampler              - Start / stop / reset the rolling sampler
+- GET  /profiler/sampler/collapsed    - Hot stacks across all requests, as text
+- GET  /memory                        - tracemalloc state and kept snapshots
+- PUT  /memory                        - Start / stop tracemalloc
+- POST /memory/snapshots              - Snapshot live allocations by api/ and schemas.py line
+- GET  /memory/snapshots/{snapshot_id} - One snapshot, by line or by file
+- GET  /memory/snapshots/{snapshot_id}/diff?against= - Growth since an earlier snapshot
+- GET  /health                        - The health prober's full last result (public /health has statuses only)
+
+A request is profiled by sending it with X-Profile: cprofile|sample (or
+?_profile=...); see profiler.py. Memory tracking is in allocations.py.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from typing import List, Optional
+import logging
+
+from auth import get_operator_user
+from models import UserInfo
+from schemas import (
+    MemoryConfig, MemoryDiff, MemorySnapshotCreate, MemorySnapshotDetail, MemorySnapshotSummary, MemoryStatus,
+    ProfileDetail, ProfileSummary, SamplerConfig, SamplerStatus
+)
+import allocations
+import metrics
+import profiler
+from health import prober
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def profile_or_404(current_user: UserInfo, profile_id: str) -> profiler.Profile:
+    profile = profiler.store.get(current_user.company_domain, profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return profile
+
+
+def memory_status() -> dict:
+    return {**allocations.tracker.status(), "tenants": metrics.registry.tenant_peaks_summary()}
+
+
+def snapshot_or_404(snapshot_id: str) -> allocations.MemorySnapshot:
+    snapshot = allocations.tracker.get(snapshot_id)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Snapshot not found"
+        )
+    return snapshot
+
+
+@router.get("/profiles", response_model=List[ProfileSummary])
+def list_profiles(current_user: UserInfo = Depends(get_operator_user)):
+    return [profile.summary() for profile in profiler.store.list(current_user.company_domain)]
+
+
+@router.get("/profiles/{profile_id}", response_model=ProfileDetail)
+def get_profile(profile_id: str, current_user: UserInfo = Depends(get_operator_user)):
+    return profile_or_404(current_user, profile_id).detail()
+
+
+@router.get("/profiles/{profile_id}/collapsed", response_class=PlainTextResponse)
+def get_profile_collapsed(profile_id: str, current_user: UserInfo = Depends(get_operator_user)):
+    profile = profile_or_404(current_user, profile_id)
+    if profile.mode != "sample":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Collapsed stacks are only recorded in sample mode"
+        )
+    return PlainTextResponse(profile.collapsed())
+
+
+@router.get("/profiler/sampler", response_model=SamplerStatus)
+def get_sampler_status(current_user: UserInfo = Depends(get_operator_user)):
+    return profiler.sampler.status()
+
+
+@router.put("/profiler/sampler", response_model=SamplerStatus)
+def configure_sampler(config: SamplerConfig, current_user: UserInfo = Depends(get_operator_user)):
+    if not profiler.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Profiling is disabled on this server (PROFILING_ENABLED)"
+        )
+
+    if config.enabled:
+        if config.interval_ms and profiler.sampler.running and config.interval_ms != profiler.sampler.interval_ms:
+            # the interval is fixed per run
+            profiler.sampler.stop()
+        if config.reset:
+            profiler.sampler.reset()
+        profiler.sampler.start(config.interval_ms)
+    else:
+        profiler.sampler.stop()
+        if config.reset:
+            profiler.sampler.reset()
+
+    logger.info("Rolling sampler %s by user %s", "started" if config.enabled else "stopped", current_user.id)
+    return profiler.sampler.status()
+
+
+@router.get("/profiler/sampler/collapsed", response_class=PlainTextResponse)
+def get_sampler_collapsed(
+    limit: Optional[int] = Query(None, ge=1, le=profiler.MAX_STACKS, description="Only the hottest stacks"),
+    current_user: UserInfo = Depends(get_operator_user)
+):
+    return PlainTextResponse(profiler.sampler.collapsed(limit))
+
+
+@router.get("/memory", response_model=MemoryStatus)
+def get_memory_status(current_user: UserInfo = Depends(get_operator_user)):
+    return memory_status()
+
+
+@router.put("/memory", response_model=MemoryStatus)
+def configure_memory_tracking(config: MemoryConfig, current_user: UserInfo = Depends(get_operator_user)):
+    if not allocations.ALLOCATION_TRACKING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Allocation tracking is disabled on this server (ALLOCATION_TRACKING_ENABLED)"
+        )
+
+    if config.enabled:
+        allocations.tracker.start(config.frames)
+    else:
+        allocations.tracker.stop()
+
+    logger.info("tracemalloc %s by user %s", "started" if config.enabled else "stopped", current_user.id)
+    return memory_status()
+
+
+@router.post("/memory/snapshots", response_model=MemorySnapshotSummary, status_code=status.HTTP_201_CREATED)
+def take_memory_snapshot(body: MemorySnapshotCreate, current_user: UserInfo = Depends(get_operator_user)):
+    try:
+        snapshot = allocations.tracker.snapshot(body.label)
+    except RuntimeError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="tracemalloc is not running; start it with PUT /memory first"
+        )
+    return snapshot.summary()
+
+
+@router.get("/memory/snapshots/{snapshot_id}", response_model=MemorySnapshotDetail)
+def get_memory_snapshot(
+    snapshot_id: str,
+    group_by: str = Query("lineno", pattern="^(lineno|filename)$"),
+    limit: int = Query(allocations.TOP_LINES, ge=1, le=1000),
+    current_user: UserInfo = Depends(get_operator_user)
+):
+    snapshot = snapshot_or_404(snapshot_id)
+    return {**snapshot.summary(), "group_by": group_by, "stats": snapshot.stats(group_by, limit)}
+
+
+@router.get("/memory/snapshots/{snapshot_id}/diff", response_model=MemoryDiff)
+def diff_memory_snapshots(
+    snapshot_id: str,
+    against: str = Query(..., description="The earlier snapshot"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename)$"),
+    limit: int = Query(allocations.TOP_LINES, ge=1, le=1000),
+    current_user: UserInfo = Depends(get_operator_user)
+):
+    snapshot = snapshot_or_404(snapshot_id)
+    before = snapshot_or_404(against)
+    return {
+        "snapshot_id": snapshot.snapshot_id,
+        "against": before.snapshot_id,
+        "group_by": group_by,
+        "traced_diff_bytes": snapshot.traced_bytes - before.traced_bytes,
+        "stats": snapshot.diff(before, group_by, limit),
+    }
+
+
+@router.get("/health")
+def get_health_details(current_user: UserInfo = Depends(get_operator_user)):
+    return prober.latest()
@@ -11,6 +11,8 @@ ENDPOINTS PROVIDED:
 - POST /login - User authentication
 - GET /me - Current user information  
 - GET /permissions - User's permissions for UI
+- GET /health - Cached health status (health.py)
+- GET /db-info - Database name and approximate record counts (authenticated)
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -21,11 +23,13 @@ from database import get_db
 from auth import get_current_user, verify_credentials
 from schemas import UserLogin, UserResponse, PermissionResponse, SuccessResponse
 from permissions import get_user_permissions
+from profiler import ProfiledRoute
 from models import UserInfo
+from health import prober
 
 # Create router instance
 # WHY ROUTER: Allows grouping related endpoints together
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.post("/login", response_model=UserResponse)
 def login(credentials: UserLogin, db: Session = Depends(get_db)):
@@ -97,31 +101,32 @@ def health_check():
     - Verify API is running
     - No authentication required
     - Useful for monitoring/deployment checks
+    - Answers from the prober's last result, never touches the database
     """
-    return SuccessResponse(message="API is healthy")
+    health = prober.latest()
+    if health["status"] == "down":
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=health.get("error") or "A required dependency is down"
+        )
+    return SuccessResponse(message="API is healthy" if health["status"] == "ok" else "API is degraded")
 
 @router.get("/db-info")
-def get_database_info(db: Session = Depends(get_db)):
-    """Get current database information"""
-    try:
-        from sqlalchemy import text
-        
-        # Get database name
-        db_name = db.execute(text("SELECT DB_NAME() as database_name")).first()
-        
-        # Count records in key tables
-        employee_count = db.execute(text("SELECT COUNT(*) FROM employees_info")).scalar()
-        user_count = db.execute(text("SELECT COUNT(*) FROM user_info")).scalar()
-        
-        return {
-            "database_name": db_name[0] if db_name else "Unknown",
-            "record_counts": {
-                "employees": employee_count,
-                "users": user_count
-            }
-        }
-    except Exception as e:
-        return {"error": str(e)}
+def get_database_info(current_user: UserInfo = Depends(get_current_user)):
+    """Get current database information (from the last health probe; counts are approximate)"""
+    health = prober.latest()
+    database = health["checks"].get("database")
+    if not database or database["status"] == "down":
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database information is not available"
+        )
+    
+    return {
+        "database_name": database["database_name"] or "Unknown",
+        "record_counts": database["record_counts"],
+        "checked_at": health["checked_at"]
+    }
     
 @router.get("/users", response_model=List[UserResponse])
 def get_users_for_assignment(
@@ -1,21 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, text
-from typing import List
+from sqlalchemy import and_, bindparam, case, delete, func, insert, literal, or_, select, text, update
+from typing import List, Optional
 from typing import Dict
 from datetime import datetime
+from decimal import Decimal
+import csv
+import json
+import logging
+import re
 
 from database import get_db
 from auth import get_current_user
 from permissions import Modules, Features, require_permission
+from profiler import ProfiledRoute
 from schemas import (
-    EmployeeCreate, EmployeeUpdate, EmployeeResponse,
+    EmployeeCreate, EmployeeUpdate, EmployeeResponse, EmployeeSalarySummary,
+    EmployeeBulkDelete, EmployeeBulkDeleteResponse, EmployeeBulkUpdate, EmployeeBulkUpdateResponse,
+    EmployeeImportResponse,
     SalaryCreate, SalaryUpdate, SalaryResponse,
+    PayrollRunCreate, PayrollRunResponse, SalaryImportResponse,
+    PayrollMonthReport, PayrollYearReport, EmployeeYtdReport,
+    DeductionConfig, DeductionConfigResponse, DeductionPreviewRequest, SalaryDeductions,
+    PayrollForecastResponse, PayslipJobCreate, PayslipJobResponse,
     SuccessResponse
 )
-from models import UserInfo, EmployeeInfo, EmployeeSalary
+from models import UserInfo, EmployeeInfo, EmployeeSalary, PayrollDeductionConfig
+import deductions
+import employee_bulk
+import payroll_forecast
+import payroll_reports
+import payslips
+import salary_import
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# write paths use Core statements with RETURNING (OUTPUT on SQL Server), so the
+# existence check, the change and the result come back in one round-trip
+EMPLOYEES = EmployeeInfo.__table__
+SALARIES = EmployeeSalary.__table__
+DEDUCTION_CONFIGS = PayrollDeductionConfig.__table__
+
+def derive_deductions(db: Session, company_domain: str, values: dict) -> None:
+    """Fill insurance, taxes and net in place when only gross was given and the company has a config"""
+    if not deductions.needs_derivation(*(values.get(field) for field in deductions.AMOUNT_FIELDS)):
+        return
+    engine = deductions.for_company(db, company_domain)
+    if engine is None:
+        return
+    try:
+        values.update(engine.compute_one(values['gross_salary']))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.post("/employees", response_model=EmployeeResponse)
 def create_employee(
@@ -32,50 +74,44 @@ def create_employee(
         )
     
     try:
-        result = db.execute(text("""
-            INSERT INTO employees_info 
-            (company_domain, contact_name, business_phone, personal_phone, 
-             business_email, personal_email, gender, is_company_admin, user_uid)
-            OUTPUT INSERTED.employee_id, INSERTED.date_added
-            VALUES (:company_domain, :contact_name, :business_phone, :personal_phone,
-                    :business_email, :personal_email, :gender, :is_company_admin, :user_uid)
-        """), {
-            'company_domain': current_user.company_domain,
-            'contact_name': employee_data.contact_name.strip(),
-            'business_phone': employee_data.business_phone.strip() if employee_data.business_phone else None,
-            'personal_phone': employee_data.personal_phone.strip() if employee_data.personal_phone else None,
-            'business_email': employee_data.business_email.strip() if employee_data.business_email else None,
-            'personal_email': employee_data.personal_email.strip() if employee_data.personal_email else None,
-            'gender': employee_data.gender if employee_data.gender else None,
-            'is_company_admin': 1 if employee_data.is_company_admin else 0,
-            'user_uid': None
-        })
+        row = db.execute(
+            insert(EMPLOYEES).values(
+                company_domain=current_user.company_domain,
+                contact_name=employee_data.contact_name.strip(),
+                business_phone=employee_data.business_phone.strip() if employee_data.business_phone else None,
+                personal_phone=employee_data.personal_phone.strip() if employee_data.personal_phone else None,
+                business_email=employee_data.business_email.strip() if employee_data.business_email else None,
+                personal_email=employee_data.personal_email.strip() if employee_data.personal_email else None,
+                gender=employee_data.gender if employee_data.gender else None,
+                is_company_admin=1 if employee_data.is_company_admin else 0,
+                user_uid=None
+            ).returning(*EMPLOYEES.c)
+        ).fetchone()
         
-        row = result.fetchone()
         if not row:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create employee - no data returned"
             )
-            
-        employee_id = row[0]
-        date_added = row[1]
         
         db.commit()
         
         return EmployeeResponse(
-            employee_id=employee_id,
-            company_domain=current_user.company_domain,
-            contact_name=employee_data.contact_name.strip(),
-            business_phone=employee_data.business_phone,
-            personal_phone=employee_data.personal_phone,
-            business_email=employee_data.business_email,
-            personal_email=employee_data.personal_email,
-            gender=employee_data.gender,
-            is_company_admin=employee_data.is_company_admin,
-            date_added=date_added
+            employee_id=row.employee_id,
+            company_domain=row.company_domain,
+            contact_name=row.contact_name,
+            business_phone=row.business_phone,
+            personal_phone=row.personal_phone,
+            business_email=row.business_email,
+            personal_email=row.personal_email,
+            gender=row.gender,
+            is_company_admin=bool(row.is_company_admin) if row.is_company_admin is not None else False,
+            date_added=row.date_added
         )
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         error_msg = str(e).lower()
@@ -107,7 +143,7 @@ def create_employee(
                 detail="Invalid company domain or reference"
             )
         else:
-            print(f"Database error creating employee: {e}")
+            logger.exception("Database error creating employee: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create employee due to database error"
@@ -150,13 +186,252 @@ def get_all_employees(
         
         return employees_list
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error retrieving employees: {e}")
+        logger.exception("Error retrieving employees: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve employees"
         )
 
+@router.post("/employees/bulk-delete", response_model=EmployeeBulkDeleteResponse)
+def bulk_delete_employees(
+    request: EmployeeBulkDelete,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Delete many employees and all their salary records in one transaction"""
+    require_permission(db, current_user.id, Modules.HR, Features.EMPLOYEES, 'delete')
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'delete')
+    
+    try:
+        result = employee_bulk.delete_employees(db, current_user.company_domain, request.employee_ids)
+        company_domain = current_user.company_domain
+        db.commit()
+        if result["salaries"]:
+            payroll_reports.salaries_changed(company_domain)
+        
+        return EmployeeBulkDeleteResponse(**result)
+        
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.exception("Error bulk deleting employees: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to delete employees; nothing was deleted"
+        )
+
+@router.post("/employees/bulk-update", response_model=EmployeeBulkUpdateResponse)
+def bulk_update_employees(
+    request: EmployeeBulkUpdate,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Set is_company_admin and/or move business emails to a new domain for the
+    given employees (or the whole company) in one transaction
+    """
+    require_permission(db, current_user.id, Modules.HR, Features.EMPLOYEES, 'edit')
+    
+    values = {}
+    if request.is_company_admin is not None:
+        values['is_company_admin'] = 1 if request.is_company_admin else 0
+    email_domain = None
+    if request.business_email_domain:
+        email_domain = (request.business_email_domain.old_domain, request.business_email_domain.new_domain)
+    
+    if not values and not email_domain:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No fields to update"
+        )
+    
+    try:
+        result = employee_bulk.update_employees(
+            db, current_user.company_domain, request.employee_ids, values, email_domain
+        )
+        db.commit()
+        
+        return EmployeeBulkUpdateResponse(**result)
+        
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        if "unique" in str(e).lower() or "duplicate" in str(e).lower():
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The new business email domain would duplicate an existing email; nothing was updated"
+            )
+        logger.exception("Error bulk updating employees: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to update employees; nothing was updated"
+        )
+
+@router.post("/employees/import", response_model=EmployeeImportResponse)
+def import_employees(
+    file: UploadFile = File(..., description="CSV with a header row, or NDJSON"),
+    file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$",
+                                       description="Defaults from the file extension"),
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create employees from a file in one transaction. Invalid rows are
+    reported per line and skipped; a database error (e.g. a duplicate
+    business email) rolls back the whole file.
+    """
+    require_permission(db, current_user.id, Modules.HR, Features.EMPLOYEES, 'write')
+    
+    if file_format is None:
+        filename = (file.filename or "").lower()
+        file_format = "ndjson" if filename.endswith((".ndjson", ".jsonl")) else "csv"
+    
+    try:
+        result = employee_bulk.create_employees(db, current_user.company_domain, file.file, file_format)
+        db.commit()
+        
+        return EmployeeImportResponse(**result)
+        
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read the {file_format.upper()} file: {e}. Nothing was imported"
+        )
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        error_msg = str(e).lower()
+        if "unique" in error_msg or "duplicate" in error_msg:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="The file contains an employee whose email or phone already exists; nothing was imported"
+            )
+        logger.exception("Error importing employees: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to import employees; nothing was imported"
+        )
+
+# must stay above /employees/{employee_id}, which would otherwise match "summary"
+@router.get("/employees/summary", response_model=List[EmployeeSalarySummary])
+def get_employees_salary_summary(
+    response: Response,
+    year: Optional[int] = Query(None, ge=2020, le=2030, description="Year-to-date year, default current year"),
+    month: Optional[int] = Query(None, ge=1, le=12, description="Last month included, default current month"),
+    sort: str = Query("employee_id", pattern="^(employee_id|name|latest_gross|ytd_gross|ytd_net|records)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+    offset: int = Query(0, ge=0),
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Each employee with their latest salary, year-to-date gross/net and
+    salary row count, in one windowed query. The total number of employees
+    is returned in the X-Total-Count header.
+    """
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    today = datetime.now()
+    if year is None:
+        year = today.year
+    if month is None:
+        month = today.month if year == today.year else 12
+    
+    in_ytd = and_(SALARIES.c.due_year == year, SALARIES.c.due_month <= month)
+    by_employee = SALARIES.c.employee_id
+    ranked = select(
+        SALARIES.c.employee_id,
+        SALARIES.c.due_year,
+        SALARIES.c.due_month,
+        SALARIES.c.gross_salary,
+        SALARIES.c.net_salary,
+        func.row_number().over(
+            partition_by=by_employee,
+            order_by=(SALARIES.c.due_year.desc(), SALARIES.c.due_month.desc())
+        ).label("position"),
+        func.count().over(partition_by=by_employee).label("records"),
+        func.sum(case((in_ytd, SALARIES.c.gross_salary))).over(partition_by=by_employee).label("ytd_gross"),
+        func.sum(case((in_ytd, SALARIES.c.net_salary))).over(partition_by=by_employee).label("ytd_net")
+    ).where(SALARIES.c.company_domain == current_user.company_domain).subquery("ranked")
+    
+    columns = {
+        "employee_id": EMPLOYEES.c.employee_id,
+        "name": EMPLOYEES.c.contact_name,
+        "latest_gross": ranked.c.gross_salary,
+        "ytd_gross": func.coalesce(ranked.c.ytd_gross, 0),
+        "ytd_net": func.coalesce(ranked.c.ytd_net, 0),
+        "records": func.coalesce(ranked.c.records, 0)
+    }
+    sort_column = columns[sort]
+    
+    try:
+        rows = db.execute(
+            select(
+                EMPLOYEES.c.employee_id,
+                EMPLOYEES.c.contact_name,
+                EMPLOYEES.c.business_email,
+                EMPLOYEES.c.is_company_admin,
+                ranked.c.due_year.label("latest_year"),
+                ranked.c.due_month.label("latest_month"),
+                ranked.c.gross_salary.label("latest_gross"),
+                ranked.c.net_salary.label("latest_net"),
+                columns["ytd_gross"].label("ytd_gross"),
+                columns["ytd_net"].label("ytd_net"),
+                columns["records"].label("records"),
+                func.count().over().label("total")
+            ).select_from(
+                EMPLOYEES.outerjoin(ranked, and_(
+                    ranked.c.employee_id == EMPLOYEES.c.employee_id,
+                    ranked.c.position == 1
+                ))
+            ).where(
+                EMPLOYEES.c.company_domain == current_user.company_domain
+            ).order_by(
+                sort_column.desc() if order == "desc" else sort_column.asc(),
+                EMPLOYEES.c.employee_id
+            ).limit(limit).offset(offset)
+        ).fetchall()
+        
+        if rows:
+            response.headers["X-Total-Count"] = str(rows[0].total)
+        
+        return [
+            EmployeeSalarySummary(
+                employee_id=row.employee_id,
+                contact_name=row.contact_name,
+                business_email=row.business_email,
+                is_company_admin=bool(row.is_company_admin) if row.is_company_admin is not None else False,
+                latest_year=row.latest_year,
+                latest_month=row.latest_month,
+                latest_gross=row.latest_gross,
+                latest_net=row.latest_net,
+                ytd_gross=payroll_reports.money(row.ytd_gross),
+                ytd_net=payroll_reports.money(row.ytd_net),
+                records=row.records
+            )
+            for row in rows
+        ]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error retrieving employee salary summary: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve employee salary summary"
+        )
+
 @router.get("/employees/{employee_id}", response_model=EmployeeResponse)
 def get_employee_by_id(
     employee_id: int,
@@ -200,7 +475,7 @@ def get_employee_by_id(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error retrieving employee {employee_id}: {e}")
+        logger.exception("Error retrieving employee %s: %s", employee_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve employee"
@@ -216,20 +491,6 @@ def update_employee(
     require_permission(db, current_user.id, Modules.HR, Features.EMPLOYEES, 'edit')
     
     try:
-        check_result = db.execute(text("""
-            SELECT employee_id FROM employees_info 
-            WHERE company_domain = :company_domain AND employee_id = :employee_id
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id
-        })
-        
-        if not check_result.fetchone():
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Employee not found"
-            )
-        
         update_data = employee_update.dict(exclude_unset=True)
         if not update_data:
             raise HTTPException(
@@ -243,35 +504,49 @@ def update_employee(
                 detail="Contact name cannot be empty"
             )
         
-        set_clauses = []
-        params = {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id
-        }
-        
+        values = {}
         for field, value in update_data.items():
             if field == 'is_company_admin':
-                set_clauses.append(f"{field} = :{field}")
-                params[field] = 1 if value else 0
+                values[field] = 1 if value else 0
             elif isinstance(value, str):
-                set_clauses.append(f"{field} = :{field}")
-                params[field] = value.strip() if value else None
+                values[field] = value.strip() if value else None
             else:
-                set_clauses.append(f"{field} = :{field}")
-                params[field] = value
+                values[field] = value
         
-        update_query = f"""
-            UPDATE employees_info 
-            SET {', '.join(set_clauses)}
-            WHERE company_domain = :company_domain AND employee_id = :employee_id
-        """
+        row = db.execute(
+            update(EMPLOYEES).where(and_(
+                EMPLOYEES.c.company_domain == current_user.company_domain,
+                EMPLOYEES.c.employee_id == employee_id
+            )).values(values).returning(*EMPLOYEES.c)
+        ).fetchone()
+        
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Employee not found"
+            )
         
-        db.execute(text(update_query), params)
         db.commit()
         
-        return get_employee_by_id(employee_id, current_user, db)
+        if 'contact_name' in update_data:
+            # year-to-date reports carry the employee's name
+            payroll_reports.salaries_changed(row.company_domain)
+        
+        return EmployeeResponse(
+            employee_id=row.employee_id,
+            company_domain=row.company_domain,
+            contact_name=row.contact_name,
+            business_phone=row.business_phone,
+            personal_phone=row.personal_phone,
+            business_email=row.business_email,
+            personal_email=row.personal_email,
+            gender=row.gender,
+            is_company_admin=bool(row.is_company_admin) if row.is_company_admin is not None else False,
+            date_added=row.date_added
+        )
         
     except HTTPException:
+        db.rollback()
         raise
     except Exception as e:
         db.rollback()
@@ -294,7 +569,7 @@ def update_employee(
                 detail="Gender must be either 'Male' or 'Female'"
             )
         
-        print(f"Error updating employee {employee_id}: {e}")
+        logger.exception("Error updating employee %s: %s", employee_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update employee"
@@ -309,15 +584,21 @@ def delete_employee(
     require_permission(db, current_user.id, Modules.HR, Features.EMPLOYEES, 'delete')
     
     try:
-        check_result = db.execute(text("""
-            SELECT contact_name FROM employees_info 
+        db.execute(text("""
+            DELETE FROM employees_salaries 
             WHERE company_domain = :company_domain AND employee_id = :employee_id
         """), {
             'company_domain': current_user.company_domain,
             'employee_id': employee_id
         })
         
-        employee_row = check_result.fetchone()
+        employee_row = db.execute(
+            delete(EMPLOYEES).where(and_(
+                EMPLOYEES.c.company_domain == current_user.company_domain,
+                EMPLOYEES.c.employee_id == employee_id
+            )).returning(EMPLOYEES.c.contact_name, EMPLOYEES.c.company_domain)
+        ).fetchone()
+        
         if not employee_row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -326,33 +607,19 @@ def delete_employee(
         
         employee_name = employee_row.contact_name
         
-        db.execute(text("""
-            DELETE FROM employees_salaries 
-            WHERE company_domain = :company_domain AND employee_id = :employee_id
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id
-        })
-        
-        db.execute(text("""
-            DELETE FROM employees_info 
-            WHERE company_domain = :company_domain AND employee_id = :employee_id
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id
-        })
-        
         db.commit()
+        payroll_reports.salaries_changed(employee_row.company_domain)
         
         return SuccessResponse(
             message=f"Employee '{employee_name}' and all related salary records deleted successfully"
         )
         
     except HTTPException:
+        db.rollback()
         raise
     except Exception as e:
         db.rollback()
-        print(f"Error deleting employee {employee_id}: {e}")
+        logger.exception("Error deleting employee %s: %s", employee_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete employee"
@@ -367,76 +634,42 @@ def add_salary_to_employee(
 ):
     require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'write')
     
+    values = {
+        'gross_salary': salary_data.gross_salary,
+        'insurance': salary_data.insurance,
+        'taxes': salary_data.taxes,
+        'net_salary': salary_data.net_salary,
+        'due_year': salary_data.due_year,
+        'due_month': salary_data.due_month,
+        'due_date': salary_data.due_date
+    }
+    
     try:
-        employee_check = db.execute(text("""
-            SELECT contact_name FROM employees_info 
-            WHERE company_domain = :company_domain AND employee_id = :employee_id
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id
-        })
+        derive_deductions(db, current_user.company_domain, values)
+        
+        # selecting from employees_info makes the insert a no-op for unknown employees
+        row = db.execute(
+            insert(SALARIES).from_select(
+                ['company_domain', 'employee_id'] + list(values),
+                select(
+                    EMPLOYEES.c.company_domain, EMPLOYEES.c.employee_id,
+                    *(literal(value, SALARIES.c[name].type) for name, value in values.items())
+                ).where(and_(
+                    EMPLOYEES.c.company_domain == current_user.company_domain,
+                    EMPLOYEES.c.employee_id == employee_id
+                ))
+            ).returning(*SALARIES.c)
+        ).fetchone()
         
-        if not employee_check.fetchone():
+        if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Employee not found"
             )
         
-        existing_check = db.execute(text("""
-            SELECT 1 FROM employees_salaries 
-            WHERE company_domain = :company_domain 
-            AND employee_id = :employee_id 
-            AND due_year = :due_year 
-            AND due_month = :due_month
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id,
-            'due_year': salary_data.due_year,
-            'due_month': salary_data.due_month
-        })
-        
-        if existing_check.fetchone():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Salary record already exists for {salary_data.due_month}/{salary_data.due_year}"
-            )
-        
-        db.execute(text("""
-            INSERT INTO employees_salaries 
-            (company_domain, employee_id, gross_salary, insurance, taxes, net_salary, 
-             due_year, due_month, due_date)
-            VALUES (:company_domain, :employee_id, :gross_salary, :insurance, :taxes, 
-                    :net_salary, :due_year, :due_month, :due_date)
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id,
-            'gross_salary': salary_data.gross_salary,
-            'insurance': salary_data.insurance,
-            'taxes': salary_data.taxes,
-            'net_salary': salary_data.net_salary,
-            'due_year': salary_data.due_year,
-            'due_month': salary_data.due_month,
-            'due_date': salary_data.due_date
-        })
-        
         db.commit()
+        payroll_reports.salary_changed(row.company_domain, row.due_year, row.due_month)
         
-        result = db.execute(text("""
-            SELECT company_domain, employee_id, gross_salary, insurance, taxes, 
-                   net_salary, due_year, due_month, due_date, date_added
-            FROM employees_salaries 
-            WHERE company_domain = :company_domain 
-            AND employee_id = :employee_id 
-            AND due_year = :due_year 
-            AND due_month = :due_month
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id,
-            'due_year': salary_data.due_year,
-            'due_month': salary_data.due_month
-        })
-        
-        row = result.fetchone()
         return SalaryResponse(
             employee_id=row.employee_id,
             company_domain=row.company_domain,
@@ -451,10 +684,17 @@ def add_salary_to_employee(
         )
         
     except HTTPException:
+        db.rollback()
         raise
     except Exception as e:
         db.rollback()
-        print(f"Error creating salary record: {e}")
+        error_msg = str(e).lower()
+        if "unique" in error_msg or "duplicate" in error_msg or "primary key" in error_msg:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Salary record already exists for {salary_data.due_month}/{salary_data.due_year}"
+            )
+        logger.exception("Error creating salary record: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create salary record"
@@ -514,30 +754,96 @@ def get_employee_salaries(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error retrieving salaries for employee {employee_id}: {e}")
+        logger.exception("Error retrieving salaries for employee %s: %s", employee_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve salary records"
         )
 
+SALARY_CURSOR = re.compile(r"^(\d{4})-(\d{1,2})-(\d+)$")
+
 @router.get("/salaries", response_model=List[SalaryResponse])
 def get_all_salaries(
+    response: Response,
+    limit: int = Query(500, ge=1, le=5000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    employee_id: Optional[int] = Query(None),
+    from_year: Optional[int] = Query(None, ge=2020, le=2030),
+    from_month: int = Query(1, ge=1, le=12),
+    to_year: Optional[int] = Query(None, ge=2020, le=2030),
+    to_month: int = Query(12, ge=1, le=12),
+    min_gross: Optional[Decimal] = Query(None, ge=0),
+    max_gross: Optional[Decimal] = Query(None, ge=0),
+    min_net: Optional[Decimal] = Query(None, ge=0),
+    max_net: Optional[Decimal] = Query(None, ge=0),
     current_user: UserInfo = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    """
+    Salaries newest period first, keyset-paginated on
+    (due_year DESC, due_month DESC, employee_id). When more rows exist the
+    response carries an X-Next-Cursor header to pass back as ?cursor=.
+    """
     require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
     
+    salary = EmployeeSalary
+    conditions = [salary.company_domain == current_user.company_domain]
+    
+    if cursor:
+        match = SALARY_CURSOR.match(cursor)
+        if not match:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        year, month, last_employee = (int(part) for part in match.groups())
+        conditions.append(or_(
+            salary.due_year < year,
+            and_(salary.due_year == year, salary.due_month < month),
+            and_(salary.due_year == year, salary.due_month == month, salary.employee_id > last_employee)
+        ))
+    
+    if employee_id is not None:
+        conditions.append(salary.employee_id == employee_id)
+    if from_year is not None:
+        conditions.append(or_(
+            salary.due_year > from_year,
+            and_(salary.due_year == from_year, salary.due_month >= from_month)
+        ))
+    if to_year is not None:
+        conditions.append(or_(
+            salary.due_year < to_year,
+            and_(salary.due_year == to_year, salary.due_month <= to_month)
+        ))
+    if min_gross is not None:
+        conditions.append(salary.gross_salary >= min_gross)
+    if max_gross is not None:
+        conditions.append(salary.gross_salary <= max_gross)
+    if min_net is not None:
+        conditions.append(salary.net_salary >= min_net)
+    if max_net is not None:
+        conditions.append(salary.net_salary <= max_net)
+    
     try:
-        result = db.execute(text("""
-            SELECT company_domain, employee_id, gross_salary, insurance, taxes, 
-                   net_salary, due_year, due_month, due_date, date_added
-            FROM employees_salaries 
-            WHERE company_domain = :company_domain
-            ORDER BY due_year DESC, due_month DESC, employee_id
-        """), {'company_domain': current_user.company_domain})
+        # one extra row tells us whether there is a next page
+        result = db.execute(
+            select(
+                salary.company_domain, salary.employee_id, salary.gross_salary, salary.insurance,
+                salary.taxes, salary.net_salary, salary.due_year, salary.due_month,
+                salary.due_date, salary.date_added
+            ).where(and_(*conditions)).order_by(
+                salary.due_year.desc(), salary.due_month.desc(), salary.employee_id
+            ).limit(limit + 1)
+        )
+        rows = result.fetchall()
+        
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            response.headers["X-Next-Cursor"] = f"{last.due_year}-{last.due_month}-{last.employee_id}"
         
         salaries = []
-        for row in result.fetchall():
+        for row in rows:
             salaries.append(SalaryResponse(
                 employee_id=row.employee_id,
                 company_domain=row.company_domain,
@@ -553,13 +859,511 @@ def get_all_salaries(
         
         return salaries
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error retrieving all salaries: {e}")
+        logger.exception("Error retrieving all salaries: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve salary records"
         )
 
+@router.post("/salaries/import", response_model=SalaryImportResponse)
+def import_salaries(
+    file: UploadFile = File(..., description="CSV with a header row, or NDJSON"),
+    file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$",
+                                       description="Defaults from the file extension"),
+    mode: str = Query("upsert", pattern="^(upsert|insert)$",
+                      description="upsert overwrites existing months, insert skips them"),
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream salary rows from a file in chunks. Invalid rows and unknown
+    employees are reported per line; valid rows are still imported.
+    """
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'write')
+    if mode == "upsert":
+        require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'edit')
+    
+    if file_format is None:
+        filename = (file.filename or "").lower()
+        file_format = "ndjson" if filename.endswith((".ndjson", ".jsonl")) else "csv"
+    
+    try:
+        result = salary_import.import_salaries(
+            db, current_user.company_domain, file.file, file_format, upsert=(mode == "upsert")
+        )
+        
+        return SalaryImportResponse(
+            rows=result.rows,
+            inserted=result.inserted,
+            updated=result.updated,
+            skipped_existing=result.skipped_existing,
+            failed=result.failed,
+            errors=result.errors
+        )
+        
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read the {file_format.upper()} file: {e}. Rows before the error may have been imported"
+        )
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.exception("Error importing salaries: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to import salary records"
+        )
+
+@router.post("/payroll-runs", response_model=PayrollRunResponse)
+def create_payroll_run(
+    run: PayrollRunCreate,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate a month's salary rows for every employee (or employee_ids) with
+    one INSERT ... SELECT, either copying each employee's previous month or
+    applying a template. Employees that already have a row are skipped.
+    """
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'write')
+
+    if run.source == "template" and run.template is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A template is required when source is 'template'"
+        )
+
+    previous_year, previous_month = (run.due_year, run.due_month - 1) if run.due_month > 1 else (run.due_year - 1, 12)
+    params = {
+        'company_domain': current_user.company_domain,
+        'due_year': run.due_year,
+        'due_month': run.due_month,
+        'due_date': run.due_date,
+        'previous_year': previous_year,
+        'previous_month': previous_month
+    }
+
+    employee_filter = ""
+    if run.employee_ids:
+        employee_filter = "AND e.employee_id IN :employee_ids"
+        params['employee_ids'] = sorted(set(run.employee_ids))
+
+    def statement(sql: str):
+        stmt = text(sql)
+        return stmt.bindparams(bindparam('employee_ids', expanding=True)) if run.employee_ids else stmt
+
+    existing_join = """
+        LEFT JOIN employees_salaries s ON s.company_domain = e.company_domain
+            AND s.employee_id = e.employee_id
+            AND s.due_year = :due_year
+            AND s.due_month = :due_month
+    """
+
+    if run.source == "previous_month":
+        previous_join = """
+            LEFT JOIN employees_salaries p ON p.company_domain = e.company_domain
+                AND p.employee_id = e.employee_id
+                AND p.due_year = :previous_year
+                AND p.due_month = :previous_month
+        """
+        amounts = "p.gross_salary, p.insurance, p.taxes, p.net_salary"
+        source_condition = "AND p.employee_id IS NOT NULL"
+        missing_source = "SUM(CASE WHEN p.employee_id IS NULL AND s.employee_id IS NULL THEN 1 ELSE 0 END)"
+    else:
+        previous_join = ""
+        amounts = ":gross_salary, :insurance, :taxes, :net_salary"
+        source_condition = ""
+        missing_source = "0"
+        template = run.template.dict()
+        derive_deductions(db, current_user.company_domain, template)
+        params.update(template)
+
+    try:
+        counts = db.execute(statement(f"""
+            SELECT COUNT(*) AS employees,
+                   COUNT(s.employee_id) AS existing,
+                   {missing_source} AS missing_source
+            FROM employees_info e
+            {existing_join}
+            {previous_join}
+            WHERE e.company_domain = :company_domain {employee_filter}
+        """), params).fetchone()
+
+        result = db.execute(statement(f"""
+            INSERT INTO employees_salaries
+            (company_domain, employee_id, gross_salary, insurance, taxes, net_salary,
+             due_year, due_month, due_date, date_added)
+            SELECT e.company_domain, e.employee_id, {amounts},
+                   :due_year, :due_month, :due_date, getdate()
+            FROM employees_info e
+            {existing_join}
+            {previous_join}
+            WHERE e.company_domain = :company_domain {employee_filter}
+            AND s.employee_id IS NULL {source_condition}
+        """), params)
+        created = result.rowcount
+
+        db.commit()
+        # params, not current_user: the commit expired the user and reading it would reload the row
+        payroll_reports.salary_changed(params['company_domain'], run.due_year, run.due_month)
+
+        return PayrollRunResponse(
+            due_year=run.due_year,
+            due_month=run.due_month,
+            source=run.source,
+            employees=counts.employees,
+            created=created,
+            skipped_existing=counts.existing,
+            missing_source=counts.missing_source or 0
+        )
+
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        if "unique" in str(e).lower() or "duplicate" in str(e).lower() or "primary key" in str(e).lower():
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Another payroll run for {run.due_month}/{run.due_year} is in progress"
+            )
+        logger.exception("Error creating payroll run: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create payroll run"
+        )
+
+@router.get("/reports/payroll/monthly", response_model=List[PayrollMonthReport])
+def get_monthly_payroll_report(
+    year: int = Query(..., ge=2020, le=2030),
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Gross, insurance, taxes and net totals for each month of a year that has salaries"""
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    try:
+        months = payroll_reports.monthly_totals(db, current_user.company_domain, year)
+        return [
+            PayrollMonthReport(due_year=year, due_month=month, **totals)
+            for month, totals in sorted(months.items())
+            if totals["records"]
+        ]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error building monthly payroll report: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to build payroll report"
+        )
+
+@router.get("/reports/payroll/yearly", response_model=List[PayrollYearReport])
+def get_yearly_payroll_report(
+    from_year: int = Query(..., ge=2020, le=2030),
+    to_year: int = Query(..., ge=2020, le=2030),
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    if from_year > to_year:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_year must not be after to_year"
+        )
+    
+    try:
+        report = []
+        for year in range(from_year, to_year + 1):
+            months = payroll_reports.monthly_totals(db, current_user.company_domain, year)
+            totals = payroll_reports.add_totals(months.values())
+            if totals["records"]:
+                report.append(PayrollYearReport(due_year=year, **totals))
+        return report
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error building yearly payroll report: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to build payroll report"
+        )
+
+@router.get("/reports/payroll/ytd", response_model=List[EmployeeYtdReport])
+def get_year_to_date_payroll_report(
+    year: int = Query(..., ge=2020, le=2030),
+    month: int = Query(12, ge=1, le=12, description="Last month included"),
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Per-employee totals from January through the given month"""
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    try:
+        return [
+            EmployeeYtdReport(**row)
+            for row in payroll_reports.year_to_date(db, current_user.company_domain, year, month)
+        ]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error building year-to-date payroll report: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to build payroll report"
+        )
+
+@router.get("/reports/payroll/forecast", response_model=PayrollForecastResponse)
+def get_payroll_forecast(
+    months: int = Query(12, ge=1, le=24, description="Months to project"),
+    history_months: int = Query(36, ge=3, le=60, description="Months of history the trends are fitted on"),
+    raise_percent: float = Query(0, ge=-50, le=100, description="What-if raise applied to every employee"),
+    raise_from: int = Query(1, ge=1, le=24, description="First projected month the raise applies to"),
+    headcount_change: int = Query(0, ge=-10000, le=10000, description="What-if employees added or removed"),
+    include_employees: bool = Query(False, description="Add a per-employee projection"),
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Projected gross payroll cost per month, from each employee's salary trend"""
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    try:
+        return PayrollForecastResponse(**payroll_forecast.forecast(
+            db, current_user.company_domain, months, history_months,
+            raise_percent, raise_from, headcount_change, include_employees
+        ))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error building payroll forecast: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to build payroll forecast"
+        )
+
+def load_payslip_month(db: Session, company_domain: str, year: int, month: int) -> List[dict]:
+    try:
+        rows = payslips.load_month(db, company_domain, year, month)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error loading payslip data for %s/%s: %s", month, year, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to load salary records"
+        )
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No salary records for {month}/{year}"
+        )
+    return rows
+
+@router.post("/payslips/jobs", response_model=PayslipJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_payslip_job(
+    request: PayslipJobCreate,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Render the month's payslips in the background; poll the job for progress"""
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    rows = load_payslip_month(db, current_user.company_domain, request.due_year, request.due_month)
+    job = payslips.start(current_user.company_domain, request.due_year, request.due_month, request.output, rows)
+    return PayslipJobResponse(**job.as_dict())
+
+def get_own_payslip_job(company_domain: str, job_id: str) -> "payslips.PayslipJob":
+    job = payslips.jobs.get(company_domain, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payslip job not found"
+        )
+    return job
+
+@router.get("/payslips/jobs/{job_id}", response_model=PayslipJobResponse)
+def get_payslip_job(
+    job_id: str,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    return PayslipJobResponse(**get_own_payslip_job(current_user.company_domain, job_id).as_dict())
+
+@router.get("/payslips/jobs/{job_id}/download")
+def download_payslip_job(
+    job_id: str,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    job = get_own_payslip_job(current_user.company_domain, job_id)
+    if job.output != "zip":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only zip jobs can be downloaded"
+        )
+    if job.status != "done":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Payslip job is {job.status} ({job.done}/{job.total})"
+        )
+    
+    return FileResponse(
+        job.path,
+        media_type="application/zip",
+        filename=f"payslips-{job.year}-{job.month:02d}.zip"
+    )
+
+# after the /payslips/jobs routes, whose paths it would otherwise match
+@router.get("/payslips/{year}/{month}/download")
+def download_payslips(
+    year: int,
+    month: int,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Zip of the month's HTML payslips, streamed while they render. The
+    X-Payslip-Job header names a job whose progress can be polled.
+    """
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    if not (2020 <= year <= 2030) or not (1 <= month <= 12):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Year must be between 2020 and 2030 and month between 1 and 12"
+        )
+    
+    rows = load_payslip_month(db, current_user.company_domain, year, month)
+    job = payslips.start(current_user.company_domain, year, month, "stream", rows)
+    
+    return StreamingResponse(
+        payslips.stream_zip(job, rows),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="payslips-{year}-{month:02d}.zip"',
+            "X-Payslip-Job": job.job_id
+        }
+    )
+
+def deduction_config_response(config) -> DeductionConfigResponse:
+    # a PayrollDeductionConfig or a RETURNING row of payroll_deduction_config
+    return DeductionConfigResponse(
+        company_domain=config.company_domain,
+        tax_brackets=json.loads(config.tax_brackets),
+        insurance_rate=config.insurance_rate,
+        insurance_cap=config.insurance_cap,
+        tax_after_insurance=bool(config.tax_after_insurance),
+        date_updated=config.date_updated
+    )
+
+@router.get("/deductions/config", response_model=DeductionConfigResponse)
+def get_deduction_config(
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    config = db.query(PayrollDeductionConfig).filter(
+        PayrollDeductionConfig.company_domain == current_user.company_domain
+    ).first()
+    if not config:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No deduction configuration for this company"
+        )
+    
+    return deduction_config_response(config)
+
+@router.put("/deductions/config", response_model=DeductionConfigResponse)
+def put_deduction_config(
+    config_data: DeductionConfig,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Set the company's tax brackets and insurance rate. From then on a salary
+    written with only gross_salary gets insurance, taxes and net derived.
+    """
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'edit')
+    
+    company_domain = current_user.company_domain
+    values = {
+        'tax_brackets': json.dumps([
+            {"up_to": str(bracket.up_to) if bracket.up_to is not None else None, "rate": str(bracket.rate)}
+            for bracket in config_data.tax_brackets
+        ]),
+        'insurance_rate': config_data.insurance_rate,
+        'insurance_cap': config_data.insurance_cap,
+        'tax_after_insurance': config_data.tax_after_insurance,
+        'date_updated': datetime.now()
+    }
+    try:
+        # update in place; the first config of a company is an insert
+        row = db.execute(
+            update(DEDUCTION_CONFIGS).where(
+                DEDUCTION_CONFIGS.c.company_domain == company_domain
+            ).values(values).returning(*DEDUCTION_CONFIGS.c)
+        ).fetchone()
+        if not row:
+            row = db.execute(
+                insert(DEDUCTION_CONFIGS).values(company_domain=company_domain, **values).returning(*DEDUCTION_CONFIGS.c)
+            ).fetchone()
+        
+        db.commit()
+        deductions.config_changed(company_domain)
+        
+        return deduction_config_response(row)
+        
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.exception("Error saving deduction config: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to save deduction configuration"
+        )
+
+@router.post("/deductions/preview", response_model=List[SalaryDeductions])
+def preview_deductions(
+    request: DeductionPreviewRequest,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Insurance, taxes and net the company's configuration gives for each gross"""
+    require_permission(db, current_user.id, Modules.HR, Features.SALARIES, 'read')
+    
+    engine = deductions.for_company(db, current_user.company_domain)
+    if engine is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No deduction configuration for this company"
+        )
+    
+    try:
+        return [SalaryDeductions(**amounts) for amounts in engine.compute(request.gross_salaries)]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
 @router.put("/employees/{employee_id}/salaries/{year}/{month}", response_model=SalaryResponse)
 def update_salary_record(
     employee_id: int,
@@ -584,40 +1388,6 @@ def update_salary_record(
         )
     
     try:
-        employee_check = db.execute(text("""
-            SELECT contact_name FROM employees_info 
-            WHERE company_domain = :company_domain AND employee_id = :employee_id
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id
-        })
-        
-        employee_row = employee_check.fetchone()
-        if not employee_row:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Employee not found"
-            )
-        
-        salary_check = db.execute(text("""
-            SELECT gross_salary FROM employees_salaries 
-            WHERE company_domain = :company_domain 
-            AND employee_id = :employee_id 
-            AND due_year = :due_year 
-            AND due_month = :due_month
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id,
-            'due_year': year,
-            'due_month': month
-        })
-        
-        if not salary_check.fetchone():
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Salary record not found for {month}/{year}"
-            )
-        
         update_data = salary_update.dict(exclude_unset=True)
         if not update_data:
             raise HTTPException(
@@ -625,60 +1395,35 @@ def update_salary_record(
                 detail="No fields provided for update"
             )
         
-        set_clauses = []
-        params = {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id,
-            'due_year': year,
-            'due_month': month
-        }
-        
-        for field, value in update_data.items():
-            if value is not None:
-                set_clauses.append(f"{field} = :{field}")
-                params[field] = value
+        values = {field: value for field, value in update_data.items() if value is not None}
         
-        if not set_clauses:
+        if not values:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No valid fields provided for update"
             )
         
-        update_query = f"""
-            UPDATE employees_salaries 
-            SET {', '.join(set_clauses)}
-            WHERE company_domain = :company_domain 
-            AND employee_id = :employee_id 
-            AND due_year = :due_year 
-            AND due_month = :due_month
-        """
+        # a new gross alone re-derives the deductions
+        derive_deductions(db, current_user.company_domain, values)
         
-        result = db.execute(text(update_query), params)
+        row = db.execute(
+            update(SALARIES).where(and_(
+                SALARIES.c.company_domain == current_user.company_domain,
+                SALARIES.c.employee_id == employee_id,
+                SALARIES.c.due_year == year,
+                SALARIES.c.due_month == month
+            )).values(values).returning(*SALARIES.c)
+        ).fetchone()
         
-        if result.rowcount == 0:
+        if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail="Salary record not found or no changes made"
+                detail=f"Salary record not found for {month}/{year}"
             )
         
         db.commit()
+        payroll_reports.salary_changed(row.company_domain, year, month)
         
-        updated_result = db.execute(text("""
-            SELECT company_domain, employee_id, gross_salary, insurance, taxes, 
-                   net_salary, due_year, due_month, due_date, date_added
-            FROM employees_salaries 
-            WHERE company_domain = :company_domain 
-            AND employee_id = :employee_id 
-            AND due_year = :due_year 
-            AND due_month = :due_month
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id,
-            'due_year': year,
-            'due_month': month
-        })
-        
-        row = updated_result.fetchone()
         return SalaryResponse(
             employee_id=row.employee_id,
             company_domain=row.company_domain,
@@ -693,10 +1438,11 @@ def update_salary_record(
         )
         
     except HTTPException:
+        db.rollback()
         raise
     except Exception as e:
         db.rollback()
-        print(f"Error updating salary record: {e}")
+        logger.exception("Error updating salary record: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update salary record"
@@ -725,56 +1471,23 @@ def delete_salary_record(
         )
     
     try:
-        info_result = db.execute(text("""
-            SELECT e.contact_name, s.gross_salary, s.net_salary
-            FROM employees_info e
-            LEFT JOIN employees_salaries s ON e.company_domain = s.company_domain 
-                AND e.employee_id = s.employee_id 
-                AND s.due_year = :due_year 
-                AND s.due_month = :due_month
-            WHERE e.company_domain = :company_domain AND e.employee_id = :employee_id
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id,
-            'due_year': year,
-            'due_month': month
-        })
-        
-        info_row = info_result.fetchone()
-        if not info_row or not info_row.contact_name:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Employee not found"
-            )
-        
-        if not info_row.gross_salary and not info_row.net_salary:
+        deleted = db.execute(
+            delete(SALARIES).where(and_(
+                SALARIES.c.company_domain == current_user.company_domain,
+                SALARIES.c.employee_id == employee_id,
+                SALARIES.c.due_year == year,
+                SALARIES.c.due_month == month
+            )).returning(SALARIES.c.company_domain)
+        ).fetchone()
+        
+        if not deleted:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Salary record not found for {month}/{year}"
             )
         
-        employee_name = info_row.contact_name
-        
-        delete_result = db.execute(text("""
-            DELETE FROM employees_salaries 
-            WHERE company_domain = :company_domain 
-            AND employee_id = :employee_id 
-            AND due_year = :due_year 
-            AND due_month = :due_month
-        """), {
-            'company_domain': current_user.company_domain,
-            'employee_id': employee_id,
-            'due_year': year,
-            'due_month': month
-        })
-        
-        if delete_result.rowcount == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Salary record not found"
-            )
-        
         db.commit()
+        payroll_reports.salary_changed(deleted.company_domain, year, month)
         
         month_names = [
             '', 'January', 'February', 'March', 'April', 'May', 'June',
@@ -783,14 +1496,15 @@ def delete_salary_record(
         month_name = month_names[month] if 1 <= month <= 12 else str(month)
         
         return SuccessResponse(
-            message=f"Salary record for {employee_name} ({month_name} {year}) deleted successfully"
+            message=f"Salary record for employee {employee_id} ({month_name} {year}) deleted successfully"
         )
         
     except HTTPException:
+        db.rollback()
         raise
     except Exception as e:
         db.rollback()
-        print(f"Error deleting salary record: {e}")
+        logger.exception("Error deleting salary record: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete salary record"
@@ -1,25 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session, aliased, contains_eager, joinedload
+from sqlalchemy import and_, delete, insert, literal, or_, select, update
+from typing import List, Optional
 from typing import Dict
+from datetime import date, datetime, timedelta
 
 
 from database import get_db
 from auth import get_current_user
 from permissions import Modules, Features, require_permission
+from profiler import ProfiledRoute
+import activity
+import dedup
+import meeting_index
+import reminders
 from schemas import (
     LeadCreate, LeadUpdate, LeadResponse,
+    DuplicateCandidateResponse, LeadMergeRequest,
     CallCreate, CallResponse, MeetingCreate, MeetingResponse,
+    TimeSlot, FreeSlotsResponse,
     LookupResponse, SuccessResponse
 )
 from models import (
-    UserInfo, LeadsInfo, ClientCall, ClientMeeting,
+    UserInfo, LeadsInfo, LeadActivitySummary, LeadDuplicateCandidate, ClientCall, ClientMeeting,
     LeadsStage, LeadsStatus, LeadsType, CallStatus, MeetingStatus
 )
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
+# write paths use Core statements with RETURNING (OUTPUT on SQL Server), so the
+# existence check, the change and the result come back in one round-trip
+LEADS = LeadsInfo.__table__
+CALLS = ClientCall.__table__
+MEETINGS = ClientMeeting.__table__
+
+
+def insert_for_lead(table, values: dict, lead_id: int, company_domain: str, *conditions):
+    """INSERT ... SELECT that only produces a row when the lead belongs to the company (and conditions hold)"""
+    return insert(table).from_select(
+        list(values),
+        select(*(literal(value, table.c[name].type) for name, value in values.items())).where(
+            LEADS.c.lead_id == lead_id,
+            LEADS.c.company_domain == company_domain,
+            *conditions
+        )
+    ).returning(*table.c)
+
+
+def meeting_conflict(clash_start: datetime, clash_end: datetime, clash_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"You already have a meeting from {clash_start:%Y-%m-%d %H:%M} to {clash_end:%H:%M} (meeting {clash_id})"
+    )
+
+ACTIVITY_SORT_COLUMNS = {
+    "last_call_at": LeadActivitySummary.last_call_at,
+    "next_meeting_at": LeadActivitySummary.next_meeting_at,
+    "call_count": LeadActivitySummary.call_count,
+    "meeting_count": LeadActivitySummary.meeting_count,
+    "date_added": LeadsInfo.date_added,
+}
 
 
 @router.get("/lookup/stages", response_model=List[LookupResponse])
@@ -132,17 +172,19 @@ def create_lead(
 ):
     require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.LEADS, 'write')
     
-    # Create new lead with user's company domain
-    lead = LeadsInfo(
-        **lead_data.dict(),
-        company_domain=current_user.company_domain
-    )
-    
     try:
-        db.add(lead)
+        # Create new lead with user's company domain
+        row = db.execute(
+            insert(LEADS).values(
+                **lead_data.dict(),
+                company_domain=current_user.company_domain
+            ).returning(*LEADS.c)
+        ).mappings().one()
         db.commit()
-        db.refresh(lead)
-        return lead
+        return LeadResponse(**row)
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         if "UNIQUE constraint failed" in str(e) or "duplicate key" in str(e).lower():
@@ -157,18 +199,157 @@ def create_lead(
 
 @router.get("/leads", response_model=List[LeadResponse])
 def get_all_leads(
+    not_contacted_days: Optional[int] = Query(None, ge=0, description="Only leads with no call in this many days"),
+    has_upcoming_meeting: Optional[bool] = Query(None, description="Filter on whether a future meeting is booked"),
+    sort_by: Optional[str] = Query(None, description="last_call_at, next_meeting_at, call_count, meeting_count or date_added"),
+    sort_order: str = Query("desc", pattern="^(asc|desc)$"),
     current_user: UserInfo = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
   
     require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.LEADS, 'read')
     
-    leads = db.query(LeadsInfo).filter(
+    if sort_by is not None and sort_by not in ACTIVITY_SORT_COLUMNS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort_by must be one of: {', '.join(ACTIVITY_SORT_COLUMNS)}"
+        )
+    
+    # one joined query; leads without a summary row yet come back with activity=None
+    query = db.query(LeadsInfo).outerjoin(LeadsInfo.activity).options(
+        contains_eager(LeadsInfo.activity)
+    ).filter(
         LeadsInfo.company_domain == current_user.company_domain
-    ).all()
+    )
+    
+    if not_contacted_days is not None:
+        cutoff = datetime.now() - timedelta(days=not_contacted_days)
+        query = query.filter(or_(
+            LeadActivitySummary.last_call_at.is_(None),
+            LeadActivitySummary.last_call_at < cutoff
+        ))
+    
+    # the stored next meeting may have passed since it was written
+    next_meeting_at = activity.next_meeting_at(datetime.now())
+    
+    if has_upcoming_meeting is not None:
+        query = query.filter(
+            next_meeting_at.isnot(None) if has_upcoming_meeting else next_meeting_at.is_(None)
+        )
+    
+    if sort_by:
+        column = next_meeting_at if sort_by == "next_meeting_at" else ACTIVITY_SORT_COLUMNS[sort_by]
+        query = query.order_by(column.asc() if sort_order == "asc" else column.desc(), LeadsInfo.lead_id)
+    
+    leads = query.all()
+    activity.roll_forward(db, (lead.activity for lead in leads))
     
     return leads
 
+# duplicate review - registered before /leads/{lead_id} so the paths don't collide
+
+@router.post("/leads/duplicates/scan", response_model=SuccessResponse)
+def scan_for_duplicate_leads(
+    background_tasks: BackgroundTasks,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.LEADS, 'edit')
+    
+    background_tasks.add_task(dedup.run_scan, current_user.company_domain)
+    return SuccessResponse(message="Duplicate scan started")
+
+@router.get("/leads/duplicates", response_model=List[DuplicateCandidateResponse])
+def get_duplicate_candidates(
+    min_score: int = Query(dedup.MIN_SCORE, ge=0, le=100),
+    candidate_status: str = Query("pending", alias="status", pattern="^(pending|dismissed)$"),
+    limit: int = Query(100, ge=1, le=500),
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.LEADS, 'read')
+    
+    lead_a = aliased(LeadsInfo)
+    lead_b = aliased(LeadsInfo)
+    rows = db.query(LeadDuplicateCandidate, lead_a, lead_b).options(
+        joinedload(lead_a.activity), joinedload(lead_b.activity)
+    ).join(
+        lead_a, lead_a.lead_id == LeadDuplicateCandidate.lead_id_a
+    ).join(
+        lead_b, lead_b.lead_id == LeadDuplicateCandidate.lead_id_b
+    ).filter(
+        and_(
+            LeadDuplicateCandidate.company_domain == current_user.company_domain,
+            LeadDuplicateCandidate.status == candidate_status,
+            LeadDuplicateCandidate.score >= min_score
+        )
+    ).order_by(
+        LeadDuplicateCandidate.score.desc(), LeadDuplicateCandidate.candidate_id
+    ).limit(limit).all()
+    activity.roll_forward(db, (lead.activity for _, first, second in rows for lead in (first, second)))
+    
+    return [
+        DuplicateCandidateResponse(
+            candidate_id=candidate.candidate_id,
+            score=candidate.score,
+            reasons=candidate.reasons,
+            status=candidate.status,
+            lead_a=LeadResponse.model_validate(first),
+            lead_b=LeadResponse.model_validate(second),
+            date_added=candidate.date_added
+        )
+        for candidate, first, second in rows
+    ]
+
+@router.post("/leads/duplicates/{candidate_id}/dismiss", response_model=SuccessResponse)
+def dismiss_duplicate_candidate(
+    candidate_id: int,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.LEADS, 'edit')
+    
+    updated = db.query(LeadDuplicateCandidate).filter(
+        and_(
+            LeadDuplicateCandidate.candidate_id == candidate_id,
+            LeadDuplicateCandidate.company_domain == current_user.company_domain
+        )
+    ).update({LeadDuplicateCandidate.status: "dismissed"}, synchronize_session=False)
+    
+    if not updated:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Duplicate candidate not found"
+        )
+    
+    db.commit()
+    return SuccessResponse(message="Duplicate candidate dismissed")
+
+@router.post("/leads/merge", response_model=LeadResponse)
+def merge_leads(
+    merge_data: LeadMergeRequest,
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.LEADS, 'delete')
+    
+    try:
+        survivor = dedup.merge_leads(
+            db, current_user.company_domain, merge_data.survivor_id, merge_data.duplicate_id
+        )
+        db.commit()
+        db.refresh(survivor)
+        return survivor
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to merge leads"
+        )
+
 @router.get("/leads/{lead_id}", response_model=LeadResponse)
 def get_lead_by_id(
     lead_id: int,
@@ -177,7 +358,7 @@ def get_lead_by_id(
 ):
     require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.LEADS, 'read')
     
-    lead = db.query(LeadsInfo).filter(
+    lead = db.query(LeadsInfo).options(joinedload(LeadsInfo.activity)).filter(
         and_(
             LeadsInfo.lead_id == lead_id,
             LeadsInfo.company_domain == current_user.company_domain
@@ -190,6 +371,7 @@ def get_lead_by_id(
             detail="Lead not found"
         )
     
+    activity.roll_forward(db, [lead.activity])
     return lead
 
 @router.put("/leads/{lead_id}", response_model=LeadResponse)
@@ -201,28 +383,30 @@ def update_lead(
 ):
     require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.LEADS, 'edit')
     
-    # Find lead with security check
-    lead = db.query(LeadsInfo).filter(
-        and_(
-            LeadsInfo.lead_id == lead_id,
-            LeadsInfo.company_domain == current_user.company_domain
-        )
-    ).first()
-    
-    if not lead:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Lead not found"
-        )
-    
     update_data = lead_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(lead, field, value)
+    if not update_data:
+        return get_lead_by_id(lead_id, current_user, db)
     
     try:
+        # the company_domain filter is the security check
+        row = db.execute(
+            update(LEADS).where(and_(
+                LEADS.c.lead_id == lead_id,
+                LEADS.c.company_domain == current_user.company_domain
+            )).values(**update_data).returning(*LEADS.c)
+        ).mappings().first()
+        
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Lead not found"
+            )
+        
         db.commit()
-        db.refresh(lead)
-        return lead
+        return LeadResponse(**row)
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -238,28 +422,60 @@ def delete_lead(
 ):
     require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.LEADS, 'delete')
     
-    lead = db.query(LeadsInfo).filter(
-        and_(
-            LeadsInfo.lead_id == lead_id,
-            LeadsInfo.company_domain == current_user.company_domain
-        )
-    ).first()
-    
-    if not lead:
+    try:
+        # rows that reference the lead go first
+        db.execute(delete(LeadActivitySummary).where(and_(
+            LeadActivitySummary.lead_id == lead_id,
+            LeadActivitySummary.company_domain == current_user.company_domain
+        )))
+        db.execute(delete(LeadDuplicateCandidate).where(and_(
+            LeadDuplicateCandidate.company_domain == current_user.company_domain,
+            or_(LeadDuplicateCandidate.lead_id_a == lead_id, LeadDuplicateCandidate.lead_id_b == lead_id)
+        )))
+        deleted = db.execute(
+            delete(LEADS).where(and_(
+                LEADS.c.lead_id == lead_id,
+                LEADS.c.company_domain == current_user.company_domain
+            )).returning(LEADS.c.lead_id)
+        ).first()
+        
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Lead not found"
+            )
+        
+        db.commit()
+        return SuccessResponse(message="Lead deleted successfully")
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Lead not found"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to delete lead"
         )
+
+@router.post("/leads/activity/reconcile", response_model=SuccessResponse)
+def reconcile_lead_activity(
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.LEADS, 'edit')
     
     try:
-        db.delete(lead)
+        count = activity.reconcile(db, current_user.company_domain)
         db.commit()
-        return SuccessResponse(message="Lead deleted successfully")
+        return SuccessResponse(message=f"Activity summary rebuilt for {count} leads")
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete lead"
+            detail="Failed to rebuild activity summary"
         )
 
 # calls/meetings ops
@@ -273,31 +489,30 @@ def add_call_to_lead(
 ):
     require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.ACTIONS, 'write')
     
-    lead = db.query(LeadsInfo).filter(
-        and_(
-            LeadsInfo.lead_id == lead_id,
-            LeadsInfo.company_domain == current_user.company_domain
-        )
-    ).first()
-    
-    if not lead:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Lead not found"
-        )
-    
-    call = ClientCall(
+    values = {
         **call_data.dict(),
-        lead_id=lead_id,
-        assigned_to=current_user.id,
-        company_domain=current_user.company_domain
-    )
+        "lead_id": lead_id,
+        "assigned_to": current_user.id,
+        "company_domain": current_user.company_domain
+    }
     
     try:
-        db.add(call)
+        call = db.execute(insert_for_lead(CALLS, values, lead_id, current_user.company_domain)).first()
+        if not call:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Lead not found"
+            )
+        
+        activity.record_call(db, call)
         db.commit()
-        db.refresh(call)
-        return call
+        reminders.scheduler.schedule(
+            "call", call.call_id, call.call_date, call.company_domain, call.assigned_to, call.lead_id
+        )
+        return CallResponse(**call._mapping)
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -314,37 +529,65 @@ def add_meeting_to_lead(
 ):
     require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.ACTIONS, 'write')
     
-    lead = db.query(LeadsInfo).filter(
-        and_(
-            LeadsInfo.lead_id == lead_id,
-            LeadsInfo.company_domain == current_user.company_domain
-        )
-    ).first()
-    
-    if not lead:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Lead not found"
-        )
-    
-    meeting = ClientMeeting(
-        **meeting_data.dict(),
-        lead_id=lead_id,
-        assigned_to=current_user.id,
-        company_domain=current_user.company_domain
-    )
-    
-    try:
-        db.add(meeting)
-        db.commit()
-        db.refresh(meeting)
-        return meeting
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to create meeting record"
-        )
+    schedule = meeting_index.get_index(db, current_user.company_domain)
+    start, end = meeting_index.meeting_interval(meeting_data.meeting_date, meeting_data.duration_minutes)
+    
+    # the lock keeps two bookings from this worker passing the check together
+    with schedule.lock:
+        clashes = schedule.conflicts(current_user.id, start, end)
+        if clashes:
+            clash_start, clash_id, clash_end = clashes[0]
+            raise meeting_conflict(clash_start, clash_end, clash_id)
+        
+        # the index only knows what it has loaded; the INSERT re-checks against the table,
+        # range-locking the agent's meetings on SQL Server so a concurrent booking waits
+        existing = MEETINGS.alias("existing")
+        no_overlap = ~select(existing.c.meeting_id).where(
+            meeting_index.overlap_condition(existing, current_user.company_domain, current_user.id, start, end)
+        ).with_hint(existing, "WITH (UPDLOCK, HOLDLOCK)", "mssql").exists()
+        
+        values = {
+            **meeting_data.dict(),
+            "lead_id": lead_id,
+            "assigned_to": current_user.id,
+            "company_domain": current_user.company_domain
+        }
+        
+        try:
+            meeting = db.execute(insert_for_lead(
+                MEETINGS, values, lead_id, current_user.company_domain, no_overlap
+            )).first()
+            if not meeting:
+                clash = db.execute(
+                    select(MEETINGS.c.meeting_id, MEETINGS.c.meeting_date, MEETINGS.c.duration_minutes).where(
+                        meeting_index.overlap_condition(MEETINGS, current_user.company_domain, current_user.id, start, end)
+                    ).order_by(MEETINGS.c.meeting_date).limit(1)
+                ).first()
+                if clash:
+                    clash_start, clash_end = meeting_index.meeting_interval(clash.meeting_date, clash.duration_minutes)
+                    raise meeting_conflict(clash_start, clash_end, clash.meeting_id)
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Lead not found"
+                )
+            
+            activity.record_meeting(db, meeting)
+            db.commit()
+            meeting_index.record_meeting(meeting.company_domain, meeting)
+            reminders.scheduler.schedule(
+                "meeting", meeting.meeting_id, meeting.meeting_date,
+                meeting.company_domain, meeting.assigned_to, meeting.lead_id
+            )
+            return MeetingResponse(**meeting._mapping)
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to create meeting record"
+            )
 
 @router.get("/leads/{lead_id}/calls", response_model=List[Dict])
 def get_lead_calls(
@@ -432,6 +675,7 @@ def get_lead_meetings(
             "meeting_date": meeting.meeting_date,
             "meeting_status": meeting.meeting_status,
             "meeting_status_name": status_map.get(meeting.meeting_status, "Unknown"),
+            "duration_minutes": meeting.duration_minutes or meeting_index.DEFAULT_DURATION_MINUTES,
             "assigned_to": meeting.assigned_to,
             "lead_id": meeting.lead_id,
             "company_domain": meeting.company_domain,
@@ -450,37 +694,28 @@ def delete_call(
 ):
     require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.ACTIONS, 'delete')
     
-    lead_exists = db.query(LeadsInfo).filter(
-        and_(
-            LeadsInfo.lead_id == lead_id,
-            LeadsInfo.company_domain == current_user.company_domain
-        )
-    ).first()
-    
-    if not lead_exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Lead not found"
-        )
-    
-    call = db.query(ClientCall).filter(
-        and_(
-            ClientCall.call_id == call_id,
-            ClientCall.lead_id == lead_id,
-            ClientCall.company_domain == current_user.company_domain
-        )
-    ).first()
-    
-    if not call:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Call not found"
-        )
-    
     try:
-        db.delete(call)
+        deleted = db.execute(
+            delete(CALLS).where(and_(
+                CALLS.c.call_id == call_id,
+                CALLS.c.lead_id == lead_id,
+                CALLS.c.company_domain == current_user.company_domain
+            )).returning(CALLS.c.call_id)
+        ).first()
+        
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Call not found"
+            )
+        
+        activity.refresh_lead(db, current_user.company_domain, lead_id)
         db.commit()
+        reminders.scheduler.cancel("call", call_id)
         return SuccessResponse(message="Call deleted successfully")
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -497,40 +732,64 @@ def delete_meeting(
 ):
     require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.ACTIONS, 'delete')
     
-    lead_exists = db.query(LeadsInfo).filter(
-        and_(
-            LeadsInfo.lead_id == lead_id,
-            LeadsInfo.company_domain == current_user.company_domain
-        )
-    ).first()
-    
-    if not lead_exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Lead not found"
-        )
-    
-    meeting = db.query(ClientMeeting).filter(
-        and_(
-            ClientMeeting.meeting_id == meeting_id,
-            ClientMeeting.lead_id == lead_id,
-            ClientMeeting.company_domain == current_user.company_domain
-        )
-    ).first()
-    
-    if not meeting:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Meeting not found"
-        )
-    
     try:
-        db.delete(meeting)
+        meeting = db.execute(
+            delete(MEETINGS).where(and_(
+                MEETINGS.c.meeting_id == meeting_id,
+                MEETINGS.c.lead_id == lead_id,
+                MEETINGS.c.company_domain == current_user.company_domain
+            )).returning(MEETINGS.c.meeting_id, MEETINGS.c.assigned_to, MEETINGS.c.company_domain)
+        ).first()
+        
+        if not meeting:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Meeting not found"
+            )
+        
+        activity.refresh_lead(db, current_user.company_domain, lead_id)
         db.commit()
+        meeting_index.forget_meeting(meeting.company_domain, meeting.assigned_to, meeting_id)
+        reminders.scheduler.cancel("meeting", meeting_id)
         return SuccessResponse(message="Meeting deleted successfully")
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete meeting"
-        )
\ No newline at end of file
+        )
+
+@router.get("/meetings/free-slots", response_model=FreeSlotsResponse)
+def get_free_meeting_slots(
+    day: date,
+    user: Optional[int] = Query(None, description="User ID, defaults to the current user"),
+    min_minutes: int = Query(30, ge=5, le=600),
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.ACTIONS, 'read')
+    
+    user_id = user if user is not None else current_user.id
+    schedule = meeting_index.get_index(db, current_user.company_domain)
+    
+    return FreeSlotsResponse(
+        user_id=user_id,
+        day=day,
+        slots=[
+            TimeSlot(start=start, end=end)
+            for start, end in schedule.free_slots(user_id, day, min_minutes)
+        ]
+    )
+
+@router.get("/reminders", response_model=List[Dict])
+def get_my_reminders(
+    clear: bool = Query(False, description="Empty the inbox after reading"),
+    current_user: UserInfo = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    require_permission(db, current_user.id, Modules.REAL_ESTATE, Features.ACTIONS, 'read')
+    
+    return reminders.inbox.read(current_user.id, clear=clear)
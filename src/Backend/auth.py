@@ -13,15 +13,23 @@ DESIGN PRINCIPLE:
 - But for learning, this demonstrates the concepts clearly
 """
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlalchemy.orm import Session
+from typing import Optional
+import os
+import secrets
 from database import get_db
-from models import UserInfo
+from models import EmployeeInfo, UserInfo
+import metrics
 
 # HTTP Basic Auth dependency
 security = HTTPBasic()
 
+# Operator credential for the process-wide diagnostics (api/admin.py); unset disables them
+OPS_TOKEN = os.getenv("OPS_TOKEN")
+OPS_TOKEN_HEADER = "X-Ops-Token"
+
 def get_current_user(
     credentials: HTTPBasicCredentials = Depends(security), 
     db: Session = Depends(get_db)
@@ -53,6 +61,9 @@ def get_current_user(
             headers={"WWW-Authenticate": "Basic"},
         )
     
+    # per-tenant request metrics
+    metrics.set_tenant(user.company_domain)
+
     # Return user object for use in the route
     return user
 
@@ -69,4 +80,49 @@ def verify_credentials(username: str, password: str, db: Session) -> UserInfo:
     
     if user and user.password_hash == password:
         return user
-    return None
\ No newline at end of file
+    return None
+
+def is_company_admin(db: Session, user: UserInfo) -> bool:
+    """
+    True when the user's employee record in their company is flagged
+    is_company_admin (employees_info.user_uid links the two)
+    """
+    if user.uid is None:
+        return False
+    return db.query(EmployeeInfo.employee_id).filter(
+        EmployeeInfo.company_domain == user.company_domain,
+        EmployeeInfo.user_uid == user.uid,
+        EmployeeInfo.is_company_admin == True
+    ).first() is not None
+
+def is_operator(token: Optional[str]) -> bool:
+    """True when token is this server's OPS_TOKEN"""
+    if not OPS_TOKEN or not token:
+        return False
+    return secrets.compare_digest(token.encode("utf-8"), OPS_TOKEN.encode("utf-8"))
+
+def get_operator_user(
+    current_user: UserInfo = Depends(get_current_user),
+    ops_token: Optional[str] = Header(None, alias=OPS_TOKEN_HEADER)
+) -> UserInfo:
+    """
+    Like get_current_user, but only with the operator token (X-Ops-Token)
+
+    WHY THIS FUNCTION:
+    - tracemalloc, the rolling sampler and profiling act on the whole worker
+      process and see every tenant's requests, so a company admin of one
+      tenant must not reach them
+    - OPS_TOKEN is configured per deployment and held by whoever runs the
+      servers; without it set, these endpoints answer 403 for everyone
+    """
+    if not OPS_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operator diagnostics are disabled on this server (OPS_TOKEN)"
+        )
+    if not is_operator(ops_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Operator token required ({OPS_TOKEN_HEADER})"
+        )
+    return current_user
@@ -0,0 +1,25 @@
+"""
+Load Benchmarks
+
+WHY THIS PACKAGE EXISTS:
+- The backend only ran against a live SQL Server and nothing measured it,
+  so a slow endpoint was found by users
+- Generates a reproducible dataset on the SQLite stand-in and drives the
+  real FastAPI app over HTTP with page-load scenarios
+
+HOW TO RUN (from src/Backend):
+    python -m benchmarks generate --db /tmp/bench.db --scale small
+    python -m benchmarks run --db /tmp/bench.db --save baseline.json
+    python -m benchmarks run --db /tmp/bench.db --compare baseline.json
+    python -m benchmarks micro --save micro.json      # then --compare micro.json
+
+- datagen.py  deterministic data generator (same seed -> same rows)
+- loadtest.py uvicorn in a thread, http.client workers, p50/p95/p99 and
+  throughput per endpoint, JSON baselines and regression comparison
+- micro.py    per-request building blocks (permissions, auth, validation,
+  response serialisation) timed in isolation, same baseline workflow
+
+LIMITS:
+- SQLite numbers are for comparing commits with each other, not for
+  predicting SQL Server latency
+"""
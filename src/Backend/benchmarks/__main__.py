@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+
+from benchmarks import datagen
+
+parser = argparse.ArgumentParser(prog="python -m benchmarks")
+commands = parser.add_subparsers(dest="command", required=True)
+
+generate = commands.add_parser("generate", help="build a benchmark database")
+generate.add_argument("--db", required=True, help="SQLite file to (re)create")
+generate.add_argument("--scale", choices=sorted(datagen.SCALES), default="small")
+generate.add_argument("--seed", type=int, default=42)
+generate.add_argument("--leads", type=int, help="override the scale's lead count")
+generate.add_argument("--companies", type=int, help="override the scale's company count")
+
+run = commands.add_parser("run", help="load-test the app against a benchmark database")
+run.add_argument("--db", required=True, help="database built by `generate`")
+run.add_argument("--duration", type=float, default=20, help="seconds of measured load")
+run.add_argument("--concurrency", type=int, default=8, help="worker threads")
+run.add_argument("--seed", type=int, default=42)
+run.add_argument("--save", help="write the results to this JSON baseline")
+run.add_argument("--compare", help="baseline JSON to compare against; exit 1 on regressions")
+run.add_argument("--threshold", type=float, default=0.20, help="allowed p95 slowdown (0.20 = 20%%)")
+run.add_argument("--no-warmup", action="store_true", help="measure the first requests too")
+
+micro = commands.add_parser("micro", help="microbenchmarks of per-request hot functions")
+micro.add_argument("--filter", help="only benchmarks whose name contains this")
+micro.add_argument("--repeats", type=int, default=20)
+micro.add_argument("--min-time", type=float, default=0.05, help="seconds per repeat, at least")
+micro.add_argument("--save", help="write the results to this JSON baseline")
+micro.add_argument("--compare", help="baseline JSON to compare against; exit 1 on regressions")
+micro.add_argument("--threshold", type=float, default=0.10, help="allowed median slowdown (0.10 = 10%%)")
+
+args = parser.parse_args()
+
+# before anything imports database.py; .env would point it at SQL Server
+# and may turn on statement echo, which would dominate every timing
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}" if "db" in args else "sqlite://"
+os.environ["DEBUG"] = "false"
+# the served app logs every request; keep the report readable
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+if args.command == "generate":
+    datagen.main(args)
+elif args.command == "micro":
+    from benchmarks import micro
+    sys.exit(micro.main(args))
+else:
+    from benchmarks import loadtest
+    sys.exit(loadtest.main(args))
@@ -0,0 +1,312 @@
+"""
+Synthetic Data Generator
+
+Fills a SQLite stand-in database with companies, users, roles, lookup
+tables, leads (with calls, meetings and activity summaries), employees and
+salary history. Everything comes from one random.Random(seed), so the same
+scale and seed always produce the same rows.
+
+Rows are written with executemany on the raw sqlite3 connection in chunks
+of CHUNK_SIZE, with journaling and fsync off for the load; the 1M-lead
+"large" scale takes a few minutes.
+
+Every company gets a login bench-<n> / BENCH_PASSWORD with full access to
+both modules; its first employee is that user's company-admin record.
+"""
+
+import os
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List
+
+from sqlite_standin import create_standin_engine
+
+CHUNK_SIZE = 10_000
+BENCH_PASSWORD = "bench"
+
+# (module_id, feature_id) pairs every benchmark role is granted
+PERMISSIONS = [(1, 1), (1, 2), (2, 1), (2, 2)]
+
+LOOKUPS = {
+    "leads_stage": ("lead_stage", ["New", "Contacted", "Qualified", "Proposal", "Won", "Lost"]),
+    "leads_status": ("lead_status", ["Hot", "Warm", "Cold"]),
+    "leads_types": ("lead_type", ["Buyer", "Seller", "Investor", "Tenant"]),
+    "calls_status": ("call_status", ["Answered", "No answer", "Busy", "Call back"]),
+    "meetings_status": ("meeting_status", ["Scheduled", "Done", "Cancelled"]),
+}
+
+FIRST_NAMES = ["Ahmed", "Mona", "Omar", "Sara", "Youssef", "Nour", "Karim", "Laila", "Hassan", "Dina",
+               "Ali", "Mariam", "Tarek", "Salma", "Khaled", "Hana", "Mostafa", "Yasmin", "Amr", "Rana"]
+LAST_NAMES = ["Hassan", "Ibrahim", "Mahmoud", "Said", "Farouk", "Kamal", "Nasser", "Adel", "Fawzy", "Samir"]
+JOB_TITLES = ["Engineer", "Doctor", "Accountant", "Teacher", "Manager", "Pharmacist", "Lawyer", None]
+
+
+class Scale:
+
+    def __init__(self, companies: int, users_per_company: int, leads: int, calls_per_lead: float,
+                 meetings_per_lead: float, employees_per_company: int, salary_months: int):
+        self.companies = companies
+        self.users_per_company = users_per_company
+        self.leads = leads
+        self.calls_per_lead = calls_per_lead
+        self.meetings_per_lead = meetings_per_lead
+        self.employees_per_company = employees_per_company
+        self.salary_months = salary_months
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+SCALES = {
+    "tiny": Scale(companies=2, users_per_company=3, leads=2_000, calls_per_lead=2, meetings_per_lead=0.5,
+                  employees_per_company=50, salary_months=12),
+    "small": Scale(companies=4, users_per_company=10, leads=20_000, calls_per_lead=2, meetings_per_lead=0.5,
+                   employees_per_company=250, salary_months=24),
+    "medium": Scale(companies=10, users_per_company=20, leads=200_000, calls_per_lead=2, meetings_per_lead=0.5,
+                    employees_per_company=1_000, salary_months=36),
+    "large": Scale(companies=20, users_per_company=25, leads=1_000_000, calls_per_lead=2, meetings_per_lead=0.5,
+                   employees_per_company=2_500, salary_months=36),
+}
+
+
+def company_domain(index: int) -> str:
+    return f"bench{index}.example.com"
+
+
+def username(index: int) -> str:
+    return f"bench-{index}"
+
+
+def timestamp(value: datetime) -> str:
+    # the format SQLAlchemy's SQLite DateTime type reads and writes
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def chunked(rows: Iterable[tuple], size: int = CHUNK_SIZE) -> Iterator[List[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def insert(cursor, table: str, columns: str, rows: Iterable[tuple]) -> int:
+    placeholders = ", ".join("?" for _ in columns.split(","))
+    sql = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+    count = 0
+    for chunk in chunked(rows):
+        cursor.executemany(sql, chunk)
+        count += len(chunk)
+    return count
+
+
+class Generator:
+
+    def __init__(self, scale: Scale, seed: int = 42, now: datetime = None):
+        self.scale = scale
+        self.rng = random.Random(seed)
+        # a fixed "now" keeps dates reproducible; callers pass the real time for live runs
+        self.now = now or datetime(2025, 6, 15, 12, 0, 0)
+        self.users: Dict[int, List[int]] = {}
+
+    def uuid(self) -> str:
+        # 32 hex digits: how SQLAlchemy binds a UUID on a non-native backend like the stand-in
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4).hex
+
+    def name(self) -> str:
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def moment(self, days_back: int, days_ahead: int = 0) -> datetime:
+        seconds = self.rng.randrange(-days_back * 86400, days_ahead * 86400 + 1)
+        return (self.now + timedelta(seconds=seconds)).replace(microsecond=0)
+
+    def companies(self, cursor) -> None:
+        scale = self.scale
+        insert(cursor, "company_info", "company_domain, name, telephone_number, date_added", (
+            (company_domain(c), f"Bench {c}", f"+2010{c:08d}", timestamp(self.now))
+            for c in range(1, scale.companies + 1)
+        ))
+
+        user_id = 0
+        role_id = 0
+        users, roles, mappings, permissions, lookups = [], [], [], [], {table: [] for table in LOOKUPS}
+        for c in range(1, scale.companies + 1):
+            domain = company_domain(c)
+            role_id += 1
+            roles.append((role_id, domain, 1, "Benchmark"))
+            for permission_id, (module_id, feature_id) in enumerate(PERMISSIONS, start=1):
+                permissions.append((role_id, permission_id, module_id, feature_id, 1, 1, 1, 1))
+
+            self.users[c] = []
+            for u in range(scale.users_per_company):
+                user_id += 1
+                self.users[c].append(user_id)
+                login = username(c) if u == 0 else f"bench-{c}-{u}"
+                first, last = self.name().split()
+                users.append((user_id, self.uuid(), domain, first, last, f"{login}@{domain}", login,
+                               BENCH_PASSWORD, timestamp(self.now)))
+                mappings.append((user_id, role_id))
+
+            for table, (column, values) in LOOKUPS.items():
+                lookups[table].extend((domain, i, value, timestamp(self.now)) for i, value in enumerate(values, start=1))
+
+        insert(cursor, "user_info", "id, uid, company_domain, first_name, last_name, email, username, "
+                                    "password_hash, date_added", users)
+        insert(cursor, "user_roles", "id, company_domain, module_id, name", roles)
+        insert(cursor, "user_role_mapping", "user_id, role_id", mappings)
+        insert(cursor, "user_role_permissions", "role_id, permission_id, module_id, feature_id, "
+                                                "d_read, d_write, d_edit, d_delete", permissions)
+        for table, (column, values) in LOOKUPS.items():
+            insert(cursor, table, f"company_domain, id, {column}, date_added", lookups[table])
+
+    def leads(self, cursor) -> Dict[str, int]:
+        scale = self.scale
+        rng = self.rng
+        calls, meetings, summaries = [], [], []
+        counts = {"leads": 0, "calls": 0, "meetings": 0}
+        call_id = 0
+        meeting_id = 0
+
+        def lead_rows():
+            nonlocal call_id, meeting_id
+            for lead_id in range(1, scale.leads + 1):
+                c = (lead_id - 1) % scale.companies + 1
+                domain = company_domain(c)
+                assigned = rng.choice(self.users[c])
+                name = self.name()
+
+                lead_calls = int(rng.expovariate(1 / scale.calls_per_lead)) if scale.calls_per_lead else 0
+                last_call, last_status = None, None
+                for _ in range(lead_calls):
+                    call_id += 1
+                    when = self.moment(365)
+                    status = rng.randint(1, len(LOOKUPS["calls_status"][1]))
+                    calls.append((call_id, assigned, domain, lead_id, timestamp(when), status, timestamp(when)))
+                    if last_call is None or when >= last_call:
+                        last_call, last_status = when, status
+
+                lead_meetings = int(rng.expovariate(1 / scale.meetings_per_lead)) if scale.meetings_per_lead else 0
+                next_meeting = None
+                for _ in range(lead_meetings):
+                    meeting_id += 1
+                    when = self.moment(180, 60)
+                    meetings.append((meeting_id, assigned, domain, lead_id, timestamp(when),
+                                     rng.randint(1, len(LOOKUPS["meetings_status"][1])),
+                                     rng.choice((30, 45, 60, 90)), timestamp(when)))
+                    if when >= self.now and (next_meeting is None or when < next_meeting):
+                        next_meeting = when
+
+                summaries.append((lead_id, domain, lead_calls, lead_meetings,
+                                  timestamp(last_call) if last_call else None,
+                                  timestamp(next_meeting) if next_meeting else None,
+                                  last_status, timestamp(self.now)))
+
+                yield (lead_id, domain, f"+201{lead_id:09d}", name,
+                       assigned, f"{name.split()[0].lower()}.{lead_id}@mail.example.com",
+                       rng.choice(("male", "female")), rng.choice(JOB_TITLES),
+                       rng.randint(1, len(LOOKUPS["leads_stage"][1])),
+                       rng.randint(1, len(LOOKUPS["leads_types"][1])),
+                       rng.randint(1, len(LOOKUPS["leads_status"][1])),
+                       timestamp(self.moment(730)))
+
+        lead_sql = ("leads_info", "lead_id, company_domain, lead_phone, name, assigned_to, email, gender, "
+                                  "job_title, lead_stage, lead_type, lead_status, date_added")
+        # the dependants are flushed with each lead chunk so memory stays flat
+        for chunk in chunked(lead_rows()):
+            counts["leads"] += insert(cursor, *lead_sql, chunk)
+            counts["calls"] += insert(cursor, "client_calls", "call_id, assigned_to, company_domain, lead_id, "
+                                                              "call_date, call_status, date_added", calls)
+            counts["meetings"] += insert(cursor, "client_meetings", "meeting_id, assigned_to, company_domain, "
+                                                                    "lead_id, meeting_date, meeting_status, "
+                                                                    "duration_minutes, date_added", meetings)
+            insert(cursor, "leads_activity_summary", "lead_id, company_domain, call_count, meeting_count, "
+                                                     "last_call_at, next_meeting_at, last_status, date_updated",
+                   summaries)
+            calls.clear()
+            meetings.clear()
+            summaries.clear()
+        return counts
+
+    def employees(self, cursor) -> Dict[str, int]:
+        scale = self.scale
+        rng = self.rng
+        counts = {"employees": 0, "salaries": 0}
+        latest = self.now.year * 12 + self.now.month - 1
+
+        for c in range(1, scale.companies + 1):
+            domain = company_domain(c)
+            admin_uid = cursor.execute("SELECT uid FROM user_info WHERE id = ?", (self.users[c][0],)).fetchone()[0]
+            employees, salaries = [], []
+            for employee_id in range(1, scale.employees_per_company + 1):
+                name = self.name()
+                email = f"{name.split()[0].lower()}.{employee_id}@{domain}"
+                admin = employee_id == 1
+                employees.append((domain, employee_id, name, f"+2011{c:03d}{employee_id:06d}", email,
+                                  rng.choice(("male", "female")), 1 if admin else 0,
+                                  admin_uid if admin else None, timestamp(self.now)))
+
+                # a hire date inside the window, then a monthly salary with yearly raises
+                months = rng.randint(1, scale.salary_months)
+                gross = rng.randrange(8_000, 60_000, 50)
+                for period in range(latest - months + 1, latest + 1):
+                    if period % 12 == 0 and period != latest - months + 1:
+                        gross = int(gross * rng.uniform(1.03, 1.15)) // 50 * 50
+                    insurance = round(gross * 0.11, 2)
+                    taxes = round((gross - insurance) * 0.15, 2)
+                    year, month = divmod(period, 12)
+                    salaries.append((domain, employee_id, year, month + 1, str(gross), str(insurance), str(taxes),
+                                     str(round(gross - insurance - taxes, 2)),
+                                     date(year, month + 1, 25).isoformat(), timestamp(self.now)))
+
+            counts["employees"] += insert(cursor, "employees_info", "company_domain, employee_id, contact_name, "
+                                                                    "business_phone, business_email, gender, "
+                                                                    "is_company_admin, user_uid, date_added",
+                                          employees)
+            counts["salaries"] += insert(cursor, "employees_salaries", "company_domain, employee_id, due_year, "
+                                                                       "due_month, gross_salary, insurance, taxes, "
+                                                                       "net_salary, due_date, date_added", salaries)
+        return counts
+
+
+def generate(path: str, scale: Scale, seed: int = 42, now: datetime = None) -> Dict[str, int]:
+    """Create path from scratch and fill it; returns row counts per kind"""
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_standin_engine(f"sqlite:///{path}")
+    generator = Generator(scale, seed, now)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("PRAGMA journal_mode = OFF")
+        cursor.execute("PRAGMA synchronous = OFF")
+        generator.companies(cursor)
+        counts = {"companies": scale.companies, "users": scale.companies * scale.users_per_company}
+        counts.update(generator.leads(cursor))
+        counts.update(generator.employees(cursor))
+        raw.commit()
+        cursor.execute("ANALYZE")
+    finally:
+        raw.close()
+        engine.dispose()
+    return counts
+
+
+def main(args) -> None:
+    scale = SCALES[args.scale]
+    if args.leads:
+        scale.leads = args.leads
+    if args.companies:
+        scale.companies = args.companies
+
+    started = time.perf_counter()
+    counts = generate(args.db, scale, args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"Generated {args.db} ({args.scale}, seed {args.seed}) in {elapsed:.1f}s")
+    for kind, count in counts.items():
+        print(f"  {kind:10} {count:>10,}")
@@ -0,0 +1,312 @@
+"""
+HTTP Load Test
+
+Serves main.app with uvicorn in a background thread against a database
+built by datagen.py, then runs page-load scenarios from CONCURRENCY worker
+threads over keep-alive http.client connections for a fixed duration.
+
+Each scenario is the set of requests the frontend makes for one page;
+results are grouped by route template (/api/real-estate/leads/{lead_id}),
+so they line up with the /metrics labels. A worker logs in as one
+company's benchmark user and picks scenarios by weight from its own
+random.Random, so a run with the same seed and concurrency sends the same
+request mix.
+
+Reported per endpoint: requests, errors (non-2xx), p50/p95/p99 and mean
+latency in ms, and requests per second; --save writes that as JSON and
+--compare fails when an endpoint's p95 is more than --threshold slower
+than the baseline (endpoints with fewer than MIN_SAMPLES requests are
+shown but never fail the run).
+"""
+
+import base64
+import http.client
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks import datagen
+
+REGRESSION_THRESHOLD = 0.20
+# fewer requests than this on either side and p95 is noise, not a regression
+MIN_SAMPLES = 30
+
+
+class Dataset:
+    """What the scenarios need to know about the generated database"""
+
+    def __init__(self, path: str):
+        with sqlite3.connect(path) as conn:
+            self.companies = conn.execute("SELECT COUNT(*) FROM company_info").fetchone()[0]
+            self.max_lead_id = conn.execute("SELECT MAX(lead_id) FROM leads_info").fetchone()[0] or 0
+            self.employees = conn.execute(
+                "SELECT MAX(employee_id) FROM employees_info WHERE company_domain = ?", (datagen.company_domain(1),)
+            ).fetchone()[0] or 0
+            latest = conn.execute("SELECT MAX(due_year * 12 + due_month - 1) FROM employees_salaries").fetchone()[0]
+        if not self.companies:
+            raise SystemExit(f"{path} has no companies; run `python -m benchmarks generate` first")
+        self.year, month = divmod(latest or 0, 12)
+        self.month = month + 1
+
+    def lead_id(self, rng: random.Random, company: int) -> int:
+        # datagen deals leads round-robin: company c owns c, c + companies, ...
+        return company + self.companies * rng.randrange(max((self.max_lead_id - company) // self.companies + 1, 1))
+
+
+# (name, weight, [(label, path)]); paths are formatted with the worker's values
+SCENARIOS = [
+    ("leads page", 4, [
+        ("/api/auth/me", "/api/auth/me"),
+        ("/api/auth/permissions", "/api/auth/permissions"),
+        ("/api/real-estate/lookup/stages", "/api/real-estate/lookup/stages"),
+        ("/api/real-estate/lookup/statuses", "/api/real-estate/lookup/statuses"),
+        ("/api/real-estate/lookup/types", "/api/real-estate/lookup/types"),
+        ("/api/real-estate/leads", "/api/real-estate/leads?sort_by=last_call_at"),
+    ]),
+    ("lead detail", 10, [
+        ("/api/real-estate/leads/{lead_id}", "/api/real-estate/leads/{lead_id}"),
+        ("/api/real-estate/leads/{lead_id}/calls", "/api/real-estate/leads/{lead_id}/calls"),
+        ("/api/real-estate/leads/{lead_id}/meetings", "/api/real-estate/leads/{lead_id}/meetings"),
+        ("/api/real-estate/lookup/call-statuses", "/api/real-estate/lookup/call-statuses"),
+        ("/api/real-estate/lookup/meeting-statuses", "/api/real-estate/lookup/meeting-statuses"),
+    ]),
+    ("follow-ups", 3, [
+        ("/api/real-estate/leads", "/api/real-estate/leads?not_contacted_days=30&sort_by=next_meeting_at"),
+        ("/api/real-estate/reminders", "/api/real-estate/reminders"),
+    ]),
+    ("employees page", 3, [
+        ("/api/hr/employees", "/api/hr/employees"),
+        ("/api/hr/employees/summary", "/api/hr/employees/summary?limit=100"),
+    ]),
+    ("employee detail", 6, [
+        ("/api/hr/employees/{employee_id}", "/api/hr/employees/{employee_id}"),
+        ("/api/hr/employees/{employee_id}/salaries", "/api/hr/employees/{employee_id}/salaries"),
+    ]),
+    ("salaries page", 3, [
+        ("/api/hr/salaries", "/api/hr/salaries?limit=500"),
+    ]),
+    ("payroll reports", 1, [
+        ("/api/hr/reports/payroll/monthly", "/api/hr/reports/payroll/monthly?year={year}"),
+        ("/api/hr/reports/payroll/ytd", "/api/hr/reports/payroll/ytd?year={year}&month={month}"),
+        ("/api/hr/reports/payroll/forecast", "/api/hr/reports/payroll/forecast"),
+    ]),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """uvicorn serving main.app in a daemon thread"""
+
+    def __init__(self):
+        import uvicorn
+        import main
+
+        self.port = free_port()
+        self.server = uvicorn.Server(uvicorn.Config(
+            main.app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False
+        ))
+        # signals belong to the benchmark process, not the server thread
+        self.server.install_signal_handlers = lambda: None
+        self.thread = threading.Thread(target=self.server.run, name="benchmark-server", daemon=True)
+
+    def __enter__(self) -> "Server":
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join(10)
+
+
+class Worker(threading.Thread):
+
+    def __init__(self, index: int, port: int, dataset: Dataset, seed: int, deadline: float):
+        super().__init__(name=f"benchmark-worker-{index}", daemon=True)
+        self.port = port
+        self.dataset = dataset
+        self.rng = random.Random(seed * 1000 + index)
+        self.company = index % dataset.companies + 1
+        self.deadline = deadline
+        login = f"{datagen.username(self.company)}:{datagen.BENCH_PASSWORD}"
+        self.headers = {"Authorization": "Basic " + base64.b64encode(login.encode()).decode()}
+        self.samples: List[Tuple[str, float, int]] = []
+        self.failure: Optional[BaseException] = None
+
+    def values(self) -> dict:
+        return {
+            "lead_id": self.dataset.lead_id(self.rng, self.company),
+            "employee_id": self.rng.randint(1, max(self.dataset.employees, 1)),
+            "year": self.dataset.year,
+            "month": self.dataset.month,
+        }
+
+    def request(self, conn: http.client.HTTPConnection, path: str) -> Tuple[float, int]:
+        started = time.perf_counter()
+        conn.request("GET", path, headers=self.headers)
+        response = conn.getresponse()
+        response.read()
+        return time.perf_counter() - started, response.status
+
+    def page(self, conn: http.client.HTTPConnection, scenario, record: bool = True) -> None:
+        values = self.values()
+        for label, path in scenario[2]:
+            seconds, status = self.request(conn, path.format(**values))
+            if record:
+                self.samples.append((label, seconds, status))
+
+    def run(self) -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+        weights = [scenario[1] for scenario in SCENARIOS]
+        try:
+            while time.monotonic() < self.deadline:
+                self.page(conn, self.rng.choices(SCENARIOS, weights)[0])
+        except BaseException as e:
+            self.failure = e
+        finally:
+            conn.close()
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(int(round(fraction * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(samples: List[Tuple[str, float, int]], elapsed: float) -> Dict[str, dict]:
+    grouped = defaultdict(list)
+    errors = defaultdict(int)
+    for label, seconds, status in samples:
+        grouped[label].append(seconds)
+        if status >= 300:
+            errors[label] += 1
+
+    def stats(latencies: List[float], error_count: int) -> dict:
+        ordered = sorted(latencies)
+        return {
+            "requests": len(ordered),
+            "errors": error_count,
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+            "rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        }
+
+    result = {label: stats(grouped[label], errors[label]) for label in sorted(grouped)}
+    result["TOTAL"] = stats([seconds for _, seconds, _ in samples], sum(errors.values()))
+    return result
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(db: str, duration: float, concurrency: int, seed: int, warmup: bool = True) -> dict:
+    dataset = Dataset(db)
+
+    with Server() as server:
+        if warmup:
+            # one pass of every page, unrecorded: first-hit caches and lazy imports
+            worker = Worker(0, server.port, dataset, seed, 0)
+            conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=120)
+            for scenario in SCENARIOS:
+                worker.page(conn, scenario, record=False)
+            conn.close()
+
+        started = time.monotonic()
+        workers = [Worker(i, server.port, dataset, seed, started + duration) for i in range(concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+
+    for worker in workers:
+        if worker.failure is not None:
+            raise RuntimeError(f"{worker.name} failed: {worker.failure!r}") from worker.failure
+
+    samples = [sample for worker in workers for sample in worker.samples]
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "database": os.path.basename(db),
+            "duration_s": round(elapsed, 2),
+            "concurrency": concurrency,
+            "seed": seed,
+        },
+        "endpoints": summarize(samples, elapsed),
+    }
+
+
+def print_report(result: dict) -> None:
+    meta = result["meta"]
+    print(f"\n{meta['database']}  {meta['concurrency']} workers  {meta['duration_s']}s  rev {meta['revision']}\n")
+    print(f"{'endpoint':48} {'reqs':>7} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>8}")
+    for label, stats in result["endpoints"].items():
+        print(f"{label:48} {stats['requests']:>7} {stats['errors']:>5} {stats['p50_ms']:>9.2f} "
+              f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['rps']:>8.1f}")
+
+
+def compare(result: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Endpoints whose p95 got more than threshold slower than in baseline"""
+    regressions = []
+    print(f"\nvs baseline rev {baseline['meta'].get('revision')} (p95, threshold +{threshold:.0%})")
+    for label, stats in result["endpoints"].items():
+        before = baseline["endpoints"].get(label)
+        if not before or not before["p95_ms"]:
+            print(f"  {label:48} new")
+            continue
+        change = stats["p95_ms"] / before["p95_ms"] - 1
+        enough = min(stats["requests"], before["requests"]) >= MIN_SAMPLES
+        regressed = enough and change > threshold
+        if regressed:
+            regressions.append(label)
+        note = "  REGRESSION" if regressed else "" if enough else "  (too few samples)"
+        print(f"  {label:48} {before['p95_ms']:>9.2f} -> {stats['p95_ms']:>9.2f}  {change:+7.1%}{note}")
+    return regressions
+
+
+def main(args) -> int:
+    os.environ.setdefault("REMINDERS_ENABLED", "false")
+    result = run(args.db, args.duration, args.concurrency, args.seed, warmup=not args.no_warmup)
+    print_report(result)
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(result, handle, indent=2)
+        print(f"\nSaved {args.save}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(result, json.load(handle), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} endpoint(s) regressed")
+            return 1
+    return 0
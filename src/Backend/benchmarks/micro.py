@@ -0,0 +1,255 @@
+"""
+Microbenchmarks
+
+Times the per-request building blocks on their own, against an in-memory
+stand-in database filled by datagen.Generator:
+
+- permissions.get_user_permissions / has_permission (user with two roles,
+  so the merge loop does real work)
+- auth.get_current_user
+- LeadCreate / SalaryCreate validation
+- serialising 10k LeadResponse / SalaryResponse rows the way FastAPI does
+  (the route's response field, then JSONResponse rendering)
+- get_lead_calls / get_lead_meetings on a lead with HOT_LEAD_ROWS of each
+
+Each benchmark is calibrated to at least MIN_REPEAT_SECONDS per repeat,
+then repeated REPEATS times with the garbage collector off (as timeit
+does); per-call min, median, quartiles and stdev are reported. --save
+writes them as JSON; --compare flags a benchmark whose median is more than
+--threshold slower AND whose first quartile is above the baseline's third,
+so a noisy run does not count as a regression.
+"""
+
+import asyncio
+import gc
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.security import HTTPBasicCredentials
+from sqlalchemy.orm import Session, contains_eager
+
+from benchmarks import datagen
+from benchmarks.loadtest import git_revision
+
+REPEATS = 20
+MIN_REPEAT_SECONDS = 0.05
+REGRESSION_THRESHOLD = 0.10
+
+SERIALIZED_ROWS = 10_000
+HOT_LEAD_ROWS = 500
+
+SCALE = datagen.Scale(companies=1, users_per_company=3, leads=SERIALIZED_ROWS, calls_per_lead=1,
+                      meetings_per_lead=0.5, employees_per_company=900, salary_months=24)
+
+
+class Benchmark:
+
+    def __init__(self, name: str, func: Callable[[], object]):
+        self.name = name
+        self.func = func
+
+    def calibrate(self, min_seconds: float) -> int:
+        number = 1
+        while True:
+            started = time.perf_counter()
+            for _ in range(number):
+                self.func()
+            if time.perf_counter() - started >= min_seconds:
+                return number
+            number *= 2 if number < 1024 else 10
+
+    def run(self, repeats: int, min_seconds: float) -> dict:
+        self.func()
+        number = self.calibrate(min_seconds)
+        timings = []
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(repeats):
+                started = time.perf_counter()
+                for _ in range(number):
+                    self.func()
+                timings.append((time.perf_counter() - started) / number * 1e6)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        q1, median, q3 = statistics.quantiles(timings, n=4, method="inclusive")
+        return {
+            "number": number,
+            "repeats": repeats,
+            "min_us": round(min(timings), 3),
+            "q1_us": round(q1, 3),
+            "median_us": round(median, 3),
+            "q3_us": round(q3, 3),
+            "stdev_us": round(statistics.stdev(timings), 3) if repeats > 1 else 0.0,
+        }
+
+
+def build_database():
+    """In-memory stand-in with one company, a second partial role and a busy lead"""
+    from sqlite_standin import create_standin_engine
+
+    engine = create_standin_engine()
+    generator = datagen.Generator(SCALE)
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        generator.companies(cursor)
+        generator.leads(cursor)
+        generator.employees(cursor)
+        domain = datagen.company_domain(1)
+
+        # the benchmark user also holds a read-only role on leads: two rows to merge
+        cursor.execute("INSERT INTO user_roles (id, company_domain, module_id, name) VALUES (99, ?, 1, 'Viewer')",
+                       (domain,))
+        cursor.execute("INSERT INTO user_role_permissions (role_id, permission_id, module_id, feature_id, "
+                       "d_read, d_write, d_edit, d_delete) VALUES (99, 1, 1, 1, 1, 0, 0, 0)")
+        cursor.execute("INSERT INTO user_role_mapping (user_id, role_id) VALUES (1, 99)")
+
+        cursor.execute("DELETE FROM client_calls WHERE lead_id = 1")
+        cursor.execute("DELETE FROM client_meetings WHERE lead_id = 1")
+        when = datagen.timestamp(generator.now)
+        cursor.executemany(
+            "INSERT INTO client_calls (assigned_to, company_domain, lead_id, call_date, call_status, date_added) "
+            "VALUES (1, ?, 1, ?, ?, ?)",
+            [(domain, when, i % 4 + 1, when) for i in range(HOT_LEAD_ROWS)]
+        )
+        cursor.executemany(
+            "INSERT INTO client_meetings (assigned_to, company_domain, lead_id, meeting_date, meeting_status, "
+            "duration_minutes, date_added) VALUES (1, ?, 1, ?, ?, 60, ?)",
+            [(domain, when, i % 3 + 1, when) for i in range(HOT_LEAD_ROWS)]
+        )
+        raw.commit()
+    finally:
+        raw.close()
+    return engine
+
+
+def response_field(app, path: str):
+    for route in app.routes:
+        if getattr(route, "path", None) == path and "GET" in getattr(route, "methods", ()):
+            return route.response_field
+    raise LookupError(path)
+
+
+def benchmarks(db: Session) -> List[Benchmark]:
+    import auth
+    import permissions
+    from api import hr, leads
+    from fastapi import FastAPI
+    from models import EmployeeSalary, LeadsInfo, UserInfo
+    from schemas import LeadCreate, SalaryCreate
+
+    # the routers' own response fields; prefixes don't matter here
+    app = FastAPI()
+    app.include_router(leads.router)
+    app.include_router(hr.router)
+    loop = asyncio.new_event_loop()
+
+    user = db.query(UserInfo).filter(UserInfo.id == 1).one()
+    credentials = HTTPBasicCredentials(username=user.username, password=datagen.BENCH_PASSWORD)
+
+    lead_rows = db.query(LeadsInfo).outerjoin(LeadsInfo.activity).options(
+        contains_eager(LeadsInfo.activity)
+    ).filter(LeadsInfo.company_domain == user.company_domain).limit(SERIALIZED_ROWS).all()
+    salary_rows = db.query(EmployeeSalary).limit(SERIALIZED_ROWS).all()
+    lead_field = response_field(app, "/leads")
+    salary_field = response_field(app, "/salaries")
+
+    def serialize(field, rows):
+        content = loop.run_until_complete(serialize_response(field=field, response_content=rows))
+        return JSONResponse(content).body
+
+    lead_payload = {"lead_phone": "+201234567890", "name": "Mona Said", "email": "mona@example.com",
+                    "gender": "Female", "job_title": "Engineer", "assigned_to": 1, "lead_stage": 1,
+                    "lead_type": 2, "lead_status": 1}
+    salary_payload = {"due_year": 2025, "due_month": 6, "gross_salary": "25000.00", "insurance": "2750.00",
+                      "taxes": "3337.50", "net_salary": "18912.50", "due_date": "2025-06-25"}
+
+    return [
+        Benchmark("permissions.get_user_permissions", lambda: permissions.get_user_permissions(db, user.id)),
+        Benchmark("permissions.has_permission", lambda: permissions.has_permission(db, user.id, 2, 2, "delete")),
+        Benchmark("auth.get_current_user", lambda: auth.get_current_user(credentials, db)),
+        Benchmark("schemas.LeadCreate", lambda: LeadCreate(**lead_payload)),
+        Benchmark("schemas.SalaryCreate", lambda: SalaryCreate(**salary_payload)),
+        Benchmark(f"serialize {SERIALIZED_ROWS} LeadResponse", lambda: serialize(lead_field, lead_rows)),
+        Benchmark(f"serialize {SERIALIZED_ROWS} SalaryResponse", lambda: serialize(salary_field, salary_rows)),
+        Benchmark(f"leads.get_lead_calls ({HOT_LEAD_ROWS} rows)", lambda: leads.get_lead_calls(1, user, db)),
+        Benchmark(f"leads.get_lead_meetings ({HOT_LEAD_ROWS} rows)", lambda: leads.get_lead_meetings(1, user, db)),
+    ]
+
+
+def unit(us: float) -> str:
+    if us >= 1e6:
+        return f"{us / 1e6:.2f} s"
+    if us >= 1e3:
+        return f"{us / 1e3:.2f} ms"
+    return f"{us:.2f} us"
+
+
+def run(pattern: Optional[str], repeats: int, min_seconds: float) -> dict:
+    engine = build_database()
+    results: Dict[str, dict] = {}
+    with Session(engine) as db:
+        for benchmark in benchmarks(db):
+            if pattern and pattern not in benchmark.name:
+                continue
+            stats = benchmark.run(repeats, min_seconds)
+            results[benchmark.name] = stats
+            print(f"{benchmark.name:44} median {unit(stats['median_us']):>10}  min {unit(stats['min_us']):>10}"
+                  f"  iqr {unit(stats['q3_us'] - stats['q1_us']):>10}  x{stats['number']}")
+            # identity-map growth from one benchmark must not slow down the next
+            db.expunge_all()
+    engine.dispose()
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "date": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "repeats": repeats,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare(result: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Benchmarks that are slower than baseline beyond threshold and noise"""
+    regressions = []
+    print(f"\nvs baseline rev {baseline['meta'].get('revision')} (median, threshold +{threshold:.0%})")
+    for name, stats in result["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if not before:
+            print(f"  {name:44} new")
+            continue
+        change = stats["median_us"] / before["median_us"] - 1
+        regressed = change > threshold and stats["q1_us"] > before["q3_us"]
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:44} {unit(before['median_us']):>10} -> {unit(stats['median_us']):>10}  {change:+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(args) -> int:
+    result = run(args.filter, args.repeats, args.min_time)
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(result, handle, indent=2)
+        print(f"\nSaved {args.save}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(result, json.load(handle), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed")
+            return 1
+    return 0
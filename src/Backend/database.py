@@ -1,11 +1,23 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base  
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import List, Optional
+import logging
 import os
+import re
+import sys
+import time
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Get database URL from environment variables
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -13,14 +25,203 @@ if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is required")
 
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=os.getenv("DEBUG", "false").lower() == "true",
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_size=5,
-    max_overflow=10
-)
+if DATABASE_URL.startswith("sqlite"):
+    # local stand-in for tooling and benchmarks, see sqlite_standin.py
+    from sqlite_standin import install
+
+    engine = install(create_engine(
+        DATABASE_URL,
+        echo=os.getenv("DEBUG", "false").lower() == "true",
+        connect_args={"check_same_thread": False}
+    ))
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        echo=os.getenv("DEBUG", "false").lower() == "true",
+        pool_pre_ping=True,
+        pool_recycle=300,
+        pool_size=5,
+        max_overflow=10
+    )
+
+
+# Query tracing
+#
+# Every statement on a traced engine is timed; statements slower than
+# SLOW_QUERY_MS are logged with the line of our code that ran them. Inside
+# a trace (one per HTTP request via QueryTraceMiddleware, or max_queries()
+# in tooling) each statement is also kept as (normalised SQL, duration,
+# call site), and a request that runs the same normalised statement more
+# than N_PLUS_ONE_THRESHOLD times is reported as a likely N+1 loop.
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+QUERY_TRACE_ENABLED = os.getenv("QUERY_TRACE_ENABLED", "true").lower() == "true"
+
+THIS_FILE = os.path.abspath(__file__)
+BACKEND_DIR = os.path.dirname(THIS_FILE) + os.sep
+
+_STRING_LITERAL = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_BIND_PARAMETER = re.compile(r"%\(\w+\)s|:\w+|\?")
+_PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    """One shape per statement: literals and bind markers become ?, IN lists (?+)"""
+    sql = " ".join(statement.split())
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _BIND_PARAMETER.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _PARAMETER_LIST.sub("(?+)", sql)
+
+
+def call_site() -> str:
+    """file:line of the innermost backend frame outside this module"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(BACKEND_DIR) and filename != THIS_FILE
+                and "site-packages" not in filename):
+            return f"{filename[len(BACKEND_DIR):]}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class TracedStatement:
+
+    __slots__ = ("sql", "seconds", "site")
+
+    def __init__(self, sql: str, seconds: float, site: str):
+        self.sql = sql
+        self.seconds = seconds
+        self.site = site
+
+    def __repr__(self) -> str:
+        return f"{self.seconds * 1000:7.2f} ms  {self.site}  {self.sql}"
+
+
+class QueryTrace:
+
+    def __init__(self, label: str, parent: Optional["QueryTrace"] = None):
+        self.label = label
+        self.parent = parent
+        self.statements: List[TracedStatement] = []
+
+    def record(self, statement: TracedStatement) -> None:
+        trace = self
+        while trace is not None:
+            trace.statements.append(statement)
+            trace = trace.parent
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        """(normalised SQL, count, first call site) run more than threshold times"""
+        counts = Counter(statement.sql for statement in self.statements)
+        sites = {}
+        for statement in self.statements:
+            sites.setdefault(statement.sql, statement.site)
+        return [(sql, count, sites[sql]) for sql, count in counts.most_common() if count > threshold]
+
+    def report(self) -> None:
+        for sql, count, site in self.repeated():
+            logger.warning("Possible N+1 in %s: %sx from %s: %s", self.label, count, site, sql,
+                           extra={"route": self.label, "count": count, "site": site, "sql": sql})
+
+    def summary(self) -> str:
+        return "\n".join(f"  {statement!r}" for statement in self.statements)
+
+
+current_trace: ContextVar[Optional[QueryTrace]] = ContextVar("query_trace", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def tracing(label: str):
+    """Collect the statements run in this context (and its worker threads)"""
+    trace = QueryTrace(label, current_trace.get())
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+
+
+@contextmanager
+def max_queries(limit: int, label: str = "block"):
+    """Raise QueryBudgetExceeded if the block runs more than limit statements
+
+    Usage:
+        with max_queries(2, "hr.update_employee"):
+            hr.update_employee(...)
+    """
+    with tracing(label) as trace:
+        yield trace
+    if len(trace.statements) > limit:
+        raise QueryBudgetExceeded(
+            f"{label}: {len(trace.statements)} statement(s), budget {limit}\n{trace.summary()}"
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("trace_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["trace_started"].pop()
+    trace = current_trace.get()
+    slow = seconds * 1000 >= SLOW_QUERY_MS
+    if trace is None and not slow:
+        return
+
+    traced = TracedStatement(normalize_sql(statement), seconds, call_site())
+    if trace is not None:
+        trace.record(traced)
+    if slow:
+        logger.warning("Slow query (%.0f ms) at %s: %s", seconds * 1000, traced.site, traced.sql,
+                       extra={"duration_ms": round(seconds * 1000, 2), "site": traced.site, "sql": traced.sql})
+
+
+def _handle_error(exception_context):
+    if exception_context.connection is not None:
+        started = exception_context.connection.info.get("trace_started")
+        if started:
+            started.pop()
+
+
+def trace_engine(target: Engine) -> Engine:
+    """Attach the tracing listeners to an engine (once)"""
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+        event.listen(target, "handle_error", _handle_error)
+    return target
+
+
+class QueryTraceMiddleware:
+    """One QueryTrace per HTTP request, checked for N+1 patterns at the end"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with tracing(f"{scope['method']} {scope['path']}") as trace:
+            await self.app(scope, receive, send)
+        route = scope.get("route")
+        if route is not None:
+            trace.label = f"{scope['method']} {route.path}"
+        trace.report()
+
+
+if QUERY_TRACE_ENABLED:
+    trace_engine(engine)
 
 # Create sessionmaker - this creates database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -39,12 +240,11 @@ def test_connection():
 
     try:
         db = SessionLocal()
-        # Try to execute a simple query
-        result = db.execute("SELECT 1 as test")
+        # Try to execute a simple query (SQLAlchemy 2 needs raw SQL wrapped in text())
+        db.execute(text("SELECT 1"))
         db.close()
-        print("✓ Database connection successful")
+        logger.info("Database connection successful")
         return True
     except Exception as e:
-        print(f"✗ Database connection failed: {e}")
-        print("Check your DATABASE_URL in .env file")
+        logger.error("Database connection failed: %s. Check your DATABASE_URL in .env file", e)
         return False
\ No newline at end of file
@@ -0,0 +1,247 @@
+"""
+Lead Deduplication and Merge
+
+WHY THIS FILE EXISTS:
+- lead_phone is unique, but tenants still collect near-duplicates with
+  slightly different phones, names and emails
+- Finds candidate pairs, scores them and stores them for review
+- Merges a confirmed duplicate into the surviving lead
+
+HOW CANDIDATES ARE FOUND:
+- Each lead gets a few blocking keys: phone suffix, email local part and
+  the Soundex code of its name
+- Only leads sharing a key are compared, so the job is near-linear in the
+  number of leads instead of comparing every pair
+- Very large blocks (e.g. "info@" addresses) carry no signal and are skipped
+"""
+
+import logging
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Dict, Iterable, List, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.orm import Session
+
+import activity
+from models import ClientCall, ClientMeeting, LeadDuplicateCandidate, LeadsInfo
+
+logger = logging.getLogger(__name__)
+
+PHONE_SUFFIX_DIGITS = 8
+MAX_BLOCK_SIZE = 50
+MIN_SCORE = 50
+
+# lead fields copied from the duplicate when the survivor has no value
+MERGE_FIELDS = ("name", "email", "gender", "job_title", "assigned_to", "lead_stage", "lead_type", "lead_status")
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"), "l": "4", **dict.fromkeys("mn", "5"), "r": "6"
+}
+
+
+def normalise_phone(phone: str) -> str:
+    return re.sub(r"\D", "", phone or "")
+
+
+def normalise_email(email: str) -> Tuple[str, str]:
+    """(local part without dots or +tag, domain), both lower-cased"""
+    email = (email or "").strip().lower()
+    if "@" not in email:
+        return "", ""
+    local, _, domain = email.partition("@")
+    return local.split("+", 1)[0].replace(".", ""), domain
+
+
+def normalise_name(name: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", (name or "").lower()).split())
+
+
+def soundex(word: str) -> str:
+    letters = [c for c in word.lower() if "a" <= c <= "z"]
+    if not letters:
+        return ""
+
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+        if letter not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def blocking_keys(lead) -> Set[str]:
+    keys = set()
+
+    phone = normalise_phone(lead.lead_phone)
+    if len(phone) >= PHONE_SUFFIX_DIGITS:
+        keys.add("p:" + phone[-PHONE_SUFFIX_DIGITS:])
+
+    local, _ = normalise_email(lead.email)
+    if local:
+        keys.add("e:" + local)
+
+    tokens = normalise_name(lead.name).split()
+    if tokens:
+        codes = [soundex(tokens[0]), soundex(tokens[-1])]
+        if all(codes):
+            keys.add("n:" + "|".join(codes))
+
+    return keys
+
+
+def score_pair(a, b) -> Tuple[int, List[str]]:
+    """Similarity score 0-100 and the reasons behind it"""
+    score = 0
+    reasons = []
+
+    phone_a, phone_b = normalise_phone(a.lead_phone), normalise_phone(b.lead_phone)
+    if phone_a and phone_a == phone_b:
+        score += 45
+        reasons.append("same phone")
+    elif len(phone_a) >= PHONE_SUFFIX_DIGITS and phone_a[-PHONE_SUFFIX_DIGITS:] == phone_b[-PHONE_SUFFIX_DIGITS:]:
+        score += 35
+        reasons.append("phone suffix")
+
+    local_a, domain_a = normalise_email(a.email)
+    local_b, domain_b = normalise_email(b.email)
+    if local_a and local_a == local_b:
+        score += 30 if domain_a == domain_b else 20
+        reasons.append("same email" if domain_a == domain_b else "email local part")
+
+    name_a, name_b = normalise_name(a.name), normalise_name(b.name)
+    if name_a and name_b:
+        ratio = SequenceMatcher(None, name_a, name_b).ratio()
+        if ratio >= 0.6:
+            score += int(round(ratio * 30))
+            reasons.append("similar name" if ratio < 1 else "same name")
+
+    return min(score, 100), reasons
+
+
+def find_candidates(leads: Iterable) -> Dict[Tuple[int, int], Tuple[int, List[str]]]:
+    """Blocked pair generation + scoring; returns {(lead_a, lead_b): (score, reasons)}"""
+    blocks = defaultdict(list)
+    by_id = {}
+    for lead in leads:
+        by_id[lead.lead_id] = lead
+        for key in blocking_keys(lead):
+            blocks[key].append(lead.lead_id)
+
+    pairs = set()
+    for members in blocks.values():
+        if 1 < len(members) <= MAX_BLOCK_SIZE:
+            pairs.update(combinations(sorted(members), 2))
+
+    candidates = {}
+    for lead_a, lead_b in pairs:
+        score, reasons = score_pair(by_id[lead_a], by_id[lead_b])
+        if score >= MIN_SCORE:
+            candidates[(lead_a, lead_b)] = (score, reasons)
+    return candidates
+
+
+def scan_company(db: Session, company_domain: str) -> int:
+    """Refresh the pending review queue for a company; returns pending pair count"""
+    leads = db.query(
+        LeadsInfo.lead_id, LeadsInfo.lead_phone, LeadsInfo.name, LeadsInfo.email
+    ).filter(LeadsInfo.company_domain == company_domain).yield_per(5000)
+
+    candidates = find_candidates(leads)
+
+    # dismissed pairs stay dismissed; pending ones are rebuilt from scratch
+    dismissed = {
+        (row.lead_id_a, row.lead_id_b)
+        for row in db.query(LeadDuplicateCandidate.lead_id_a, LeadDuplicateCandidate.lead_id_b).filter(
+            LeadDuplicateCandidate.company_domain == company_domain,
+            LeadDuplicateCandidate.status != "pending"
+        )
+    }
+    db.execute(delete(LeadDuplicateCandidate).where(and_(
+        LeadDuplicateCandidate.company_domain == company_domain,
+        LeadDuplicateCandidate.status == "pending"
+    )))
+
+    rows = [
+        {
+            "company_domain": company_domain,
+            "lead_id_a": lead_a,
+            "lead_id_b": lead_b,
+            "score": score,
+            "reasons": ", ".join(reasons)[:200],
+            "status": "pending"
+        }
+        for (lead_a, lead_b), (score, reasons) in candidates.items()
+        if (lead_a, lead_b) not in dismissed
+    ]
+    if rows:
+        db.bulk_insert_mappings(LeadDuplicateCandidate, rows)
+
+    db.commit()
+    return len(rows)
+
+
+def run_scan(company_domain: str) -> None:
+    """Background-task entry point - owns its own session"""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        scan_company(db, company_domain)
+    except Exception as e:
+        db.rollback()
+        logger.exception("Duplicate scan failed for %s: %s", company_domain, e)
+    finally:
+        db.close()
+
+
+def merge_leads(db: Session, company_domain: str, survivor_id: int, duplicate_id: int) -> LeadsInfo:
+    """
+    Fold duplicate_id into survivor_id: re-point calls and meetings, fill
+    the survivor's empty fields and delete the duplicate. The caller commits,
+    so the whole merge is one transaction.
+    """
+    if survivor_id == duplicate_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A lead cannot be merged into itself"
+        )
+
+    leads = {
+        lead.lead_id: lead
+        for lead in db.query(LeadsInfo).filter(and_(
+            LeadsInfo.lead_id.in_([survivor_id, duplicate_id]),
+            LeadsInfo.company_domain == company_domain
+        )).with_for_update()
+    }
+    if len(leads) != 2:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Lead not found"
+        )
+    survivor, duplicate = leads[survivor_id], leads[duplicate_id]
+
+    db.execute(update(ClientCall).where(ClientCall.lead_id == duplicate_id).values(lead_id=survivor_id))
+    db.execute(update(ClientMeeting).where(ClientMeeting.lead_id == duplicate_id).values(lead_id=survivor_id))
+
+    for field in MERGE_FIELDS:
+        if getattr(survivor, field) is None and getattr(duplicate, field) is not None:
+            setattr(survivor, field, getattr(duplicate, field))
+
+    # the duplicate's review rows go with it (they reference it by FK)
+    db.execute(delete(LeadDuplicateCandidate).where(and_(
+        LeadDuplicateCandidate.company_domain == company_domain,
+        or_(LeadDuplicateCandidate.lead_id_a == duplicate_id, LeadDuplicateCandidate.lead_id_b == duplicate_id)
+    )))
+
+    db.delete(duplicate)
+    db.flush()
+    activity.refresh_lead(db, company_domain, survivor_id)
+    return survivor
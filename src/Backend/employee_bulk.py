@@ -0,0 +1,153 @@
+"""
+Bulk Employee Operations
+
+WHY THIS FILE EXISTS:
+- Onboarding a department, offboarding a team or moving the company to a
+  new email domain meant one request per employee
+- Deletes, updates and creates many employees with a fixed number of
+  set-based statements per chunk, all in one transaction
+
+HOW IT WORKS:
+- Employee ids are processed in chunks of CHUNK_SIZE (an IN list per
+  statement stays well below SQL Server's 2100-parameter limit)
+- Delete: per chunk, one DELETE of the salaries and one DELETE of the
+  employees with RETURNING (OUTPUT) so ids that did not exist are reported
+- Update: per chunk, one UPDATE; a business email domain change is a
+  REPLACE of "@old" with "@new" on the matching rows
+- Create: the file is read like a salary import (CSV or NDJSON); invalid
+  rows are reported per line and skipped, valid rows go in with one
+  executemany INSERT per chunk
+- Nothing is committed until every chunk succeeded; a database error rolls
+  the whole operation back and is re-raised for the endpoint to map
+
+LIMITS:
+- The domain match is a LIKE on the stored email; SQL Server's default
+  collation makes it case-insensitive, the SQLite stand-in does not
+"""
+
+from typing import Dict, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import and_, delete, func, insert, literal, update
+from sqlalchemy.orm import Session
+
+from models import EmployeeInfo, EmployeeSalary
+from salary_import import MAX_REPORTED_ERRORS, chunks, read_csv, read_ndjson, validation_message
+from schemas import EmployeeCreate
+
+CHUNK_SIZE = 1000
+
+EMPLOYEES = EmployeeInfo.__table__
+SALARIES = EmployeeSalary.__table__
+
+EMPLOYEE_FIELDS = (
+    "contact_name", "business_phone", "personal_phone", "business_email",
+    "personal_email", "gender", "is_company_admin"
+)
+
+
+def id_chunks(employee_ids: List[int], size: int = CHUNK_SIZE) -> List[List[int]]:
+    ids = sorted(set(employee_ids))
+    return [ids[start:start + size] for start in range(0, len(ids), size)]
+
+
+def delete_employees(db: Session, company_domain: str, employee_ids: List[int]) -> Dict[str, object]:
+    """Delete employees and their salaries; the caller commits"""
+    deleted: List[int] = []
+    salaries = 0
+    for ids in id_chunks(employee_ids):
+        salaries += db.execute(
+            delete(SALARIES).where(and_(
+                SALARIES.c.company_domain == company_domain,
+                SALARIES.c.employee_id.in_(ids)
+            ))
+        ).rowcount or 0
+        deleted.extend(
+            row.employee_id for row in db.execute(
+                delete(EMPLOYEES).where(and_(
+                    EMPLOYEES.c.company_domain == company_domain,
+                    EMPLOYEES.c.employee_id.in_(ids)
+                )).returning(EMPLOYEES.c.employee_id)
+            )
+        )
+
+    return {
+        "employees": len(deleted),
+        "salaries": salaries,
+        "not_found": sorted(set(employee_ids) - set(deleted))
+    }
+
+
+def update_employees(db: Session, company_domain: str, employee_ids: Optional[List[int]],
+                     values: dict, email_domain: Optional[tuple] = None) -> Dict[str, object]:
+    """
+    Apply the same values to many employees; employee_ids None means the whole
+    company. email_domain is (old, new) without the "@". The caller commits.
+    """
+    if email_domain:
+        old, new = email_domain
+        values = {
+            **values,
+            "business_email": func.replace(EMPLOYEES.c.business_email, literal(f"@{old}"), literal(f"@{new}"))
+        }
+
+    def conditions(ids):
+        clauses = [EMPLOYEES.c.company_domain == company_domain]
+        if ids is not None:
+            clauses.append(EMPLOYEES.c.employee_id.in_(ids))
+        if email_domain:
+            # only rows actually on the old domain are touched and counted
+            clauses.append(EMPLOYEES.c.business_email.like(f"%@{email_domain[0]}"))
+        return and_(*clauses)
+
+    updated: List[int] = []
+    for ids in (id_chunks(employee_ids) if employee_ids is not None else [None]):
+        updated.extend(
+            row.employee_id for row in db.execute(
+                update(EMPLOYEES).where(conditions(ids)).values(values).returning(EMPLOYEES.c.employee_id)
+            )
+        )
+
+    return {
+        "employees": len(updated),
+        "not_matched": sorted(set(employee_ids) - set(updated)) if employee_ids is not None else []
+    }
+
+
+def create_employees(db: Session, company_domain: str, stream, file_format: str,
+                     chunk_size: int = CHUNK_SIZE) -> Dict[str, object]:
+    """Insert the valid rows of a CSV or NDJSON file; the caller commits"""
+    records = read_ndjson(stream) if file_format == "ndjson" else read_csv(stream)
+    result = {"rows": 0, "created": 0, "failed": 0, "errors": []}
+
+    def error(line: int, message: str) -> None:
+        result["failed"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append({"line": line, "employee_id": None, "message": message})
+
+    for chunk in chunks(records, chunk_size):
+        rows = []
+        for line, record in chunk:
+            result["rows"] += 1
+            if record is None:
+                error(line, "Row is not a JSON object")
+                continue
+            try:
+                employee = EmployeeCreate(**{
+                    key: record.get(key) for key in EMPLOYEE_FIELDS if record.get(key) is not None
+                })
+            except ValidationError as e:
+                error(line, validation_message(e))
+                continue
+
+            rows.append({
+                "company_domain": company_domain,
+                **{field: getattr(employee, field) for field in EMPLOYEE_FIELDS},
+                "is_company_admin": 1 if employee.is_company_admin else 0
+            })
+
+        if rows:
+            db.execute(insert(EMPLOYEES), rows)
+            result["created"] += len(rows)
+
+    return result
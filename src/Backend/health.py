@@ -0,0 +1,234 @@
+"""
+Health Checks
+
+WHY THIS FILE EXISTS:
+- /health and /api/auth/health answered a constant string, so a worker
+  with a dead database or a dead background thread still looked healthy
+- /api/auth/db-info ran COUNT(*) over employees_info and user_info on
+  every call, without authentication - a health poller could load the
+  database by itself
+
+HOW IT WORKS:
+- A prober thread checks the dependencies every HEALTH_PROBE_INTERVAL
+  seconds and keeps the last result; the health endpoints only read it,
+  so polling them costs no database work however often it happens
+- Checks, each "ok", "degraded" or "down":
+    database -> SELECT 1 round-trip on a pooled connection (degraded above
+                HEALTH_DB_SLOW_MS); database name and approximate row
+                counts from the catalog (sys.partitions on SQL Server,
+                sqlite_stat1 on the stand-in), never a table scan
+    pool     -> checked-out connections against pool_size + max_overflow
+                (degraded from HEALTH_POOL_SATURATION)
+    caches   -> entries in the per-worker caches and the warm-up state
+                (degraded while warming)
+    workers  -> reminder scheduler, log listener and rolling sampler
+                threads; a thread that should run but died is down
+- Overall status is the worst check, except that only the database makes
+  the worker "down"; a result older than HEALTH_STALE_SECONDS (the prober
+  itself stopped) is reported as down
+- /health is unauthenticated, so it only gets summary(): the overall and
+  per-check statuses. The details (database name, row counts, pool
+  numbers) are for GET /api/admin/health (operators) and, for the
+  database figures, /api/auth/db-info; a failing check's exception is
+  logged, never returned
+
+LIMITS:
+- Results are per worker process and up to one interval old
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+import deductions
+import logging_config
+import meeting_index
+import payroll_forecast
+import payroll_reports
+import profiler
+import reminders
+from database import engine
+from warmup import warmup
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "10"))
+HEALTH_DB_SLOW_MS = float(os.getenv("HEALTH_DB_SLOW_MS", "250"))
+HEALTH_POOL_SATURATION = float(os.getenv("HEALTH_POOL_SATURATION", "0.9"))
+HEALTH_STALE_SECONDS = float(os.getenv("HEALTH_STALE_SECONDS", str(HEALTH_PROBE_INTERVAL * 3)))
+
+# tables whose sizes /api/auth/db-info reports, by response key
+COUNTED_TABLES = {"employees": "employees_info", "users": "user_info"}
+
+STATUSES = ("ok", "degraded", "down")
+
+
+def worst(statuses: List[str]) -> str:
+    return max(statuses, key=STATUSES.index, default="ok")
+
+
+def approximate_counts(conn) -> Dict[str, Optional[int]]:
+    """Row counts the database already keeps, per COUNTED_TABLES key"""
+    tables = list(COUNTED_TABLES.values())
+    if conn.dialect.name == "sqlite":
+        # the first number of each index's stat is the table's row count (after ANALYZE)
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first()
+        rows = conn.execute(text("SELECT tbl, stat FROM sqlite_stat1")).all() if exists else []
+        counts: Dict[str, int] = {}
+        for table, stat in rows:
+            if table in tables:
+                counts[table] = max(counts.get(table, 0), int(stat.split()[0]))
+    else:
+        rows = conn.execute(text(
+            "SELECT t.name, SUM(p.rows) FROM sys.tables t "
+            "JOIN sys.partitions p ON p.object_id = t.object_id AND p.index_id IN (0, 1) "
+            "WHERE t.name IN ('employees_info', 'user_info') GROUP BY t.name"
+        )).all()
+        counts = {table: int(count) for table, count in rows}
+    return {key: counts.get(table) for key, table in COUNTED_TABLES.items()}
+
+
+def check_database() -> dict:
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            latency_ms = (time.perf_counter() - started) * 1000
+            database_name = conn.execute(text("SELECT DB_NAME()")).scalar()
+            counts = approximate_counts(conn)
+    except Exception:
+        # driver messages can name the server, instance or login
+        logger.exception("Database health check failed")
+        return {"status": "down", "error": "Database is unreachable"}
+    return {
+        "status": "degraded" if latency_ms >= HEALTH_DB_SLOW_MS else "ok",
+        "latency_ms": round(latency_ms, 2),
+        "database_name": database_name,
+        "record_counts": counts,
+    }
+
+
+def check_pool() -> dict:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        return {"status": "ok", "pool": type(pool).__name__}
+    checked_out = pool.checkedout()
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    saturation = checked_out / capacity if capacity else 0.0
+    return {
+        "status": "degraded" if saturation >= HEALTH_POOL_SATURATION else "ok",
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": pool.overflow(),
+        "capacity": capacity,
+        "saturation": round(saturation, 3),
+    }
+
+
+def check_caches() -> dict:
+    return {
+        "status": "ok" if warmup.ready else "degraded",
+        "warmup": warmup.state,
+        "deduction_tables": len(deductions.cache.entries),
+        "meeting_indexes": len(meeting_index._indexes),
+        "payroll_reports": len(payroll_reports.cache.entries),
+        "payroll_forecasts": len(payroll_forecast.cache.entries),
+    }
+
+
+def thread_state(thread: Optional[threading.Thread], expected: bool) -> str:
+    if not expected:
+        return "off"
+    return "running" if thread is not None and thread.is_alive() else "dead"
+
+
+def check_workers() -> dict:
+    workers = {
+        "reminders": thread_state(reminders.scheduler.thread, reminders.scheduler.running),
+        "log_listener": "running" if logging_config.status()["running"] else "off",
+        "rolling_sampler": "running" if profiler.sampler.running else "off",
+    }
+    return {"status": "down" if "dead" in workers.values() else "ok", **workers}
+
+
+CHECKS = {
+    "database": check_database,
+    "pool": check_pool,
+    "caches": check_caches,
+    "workers": check_workers,
+}
+
+
+class HealthProber:
+
+    def __init__(self, interval: float = HEALTH_PROBE_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.result: Optional[dict] = None
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def probe(self) -> dict:
+        checks = {}
+        for name, check in CHECKS.items():
+            try:
+                checks[name] = check()
+            except Exception:
+                logger.exception("Health check %s failed", name)
+                checks[name] = {"status": "down", "error": "Check failed"}
+        # only an unreachable database takes the worker out
+        overall = worst([checks["database"]["status"]] + [
+            "degraded" if check["status"] != "ok" else "ok" for name, check in checks.items() if name != "database"
+        ])
+        result = {"status": overall, "checked_at": datetime.now(), "checks": checks}
+        with self.lock:
+            previous, self.result = self.result, result
+        if previous is None or previous["status"] != overall:
+            log = logger.info if overall == "ok" else logger.warning
+            log("Health is %s: %s", overall,
+                {name: check["status"] for name, check in checks.items()})
+        return result
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            self.probe()
+            self.stopped.wait(self.interval)
+
+    def start(self) -> None:
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="health-prober", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def latest(self) -> dict:
+        """The last result, marked down when the prober has stopped producing them"""
+        with self.lock:
+            result = self.result
+        if result is None:
+            return {"status": "down", "checked_at": None, "age_seconds": None, "checks": {},
+                    "error": "No probe has run yet"}
+        age = (datetime.now() - result["checked_at"]).total_seconds()
+        if age > HEALTH_STALE_SECONDS:
+            return {**result, "status": "down", "age_seconds": round(age, 1), "error": "Health probe is stale"}
+        return {**result, "age_seconds": round(age, 1)}
+
+
+prober = HealthProber()
+
+
+def summary(health: dict) -> dict:
+    """What unauthenticated callers see: statuses only"""
+    return {
+        "status": health["status"],
+        "checked_at": health["checked_at"],
+        "checks": {name: check["status"] for name, check in health["checks"].items()},
+    }
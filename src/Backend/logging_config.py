@@ -0,0 +1,312 @@
+"""
+Structured Logging
+
+WHY THIS FILE EXISTS:
+- Error paths used print(): synchronous writes from request threads,
+  no level, no timestamp, and lines from concurrent requests could not be
+  told apart
+- Sets up one logging pipeline for the backend: JSON lines, a request id
+  on every record logged while serving a request, and log I/O kept off
+  the request threads
+
+HOW IT WORKS:
+- Modules log through logging.getLogger(__name__) as reminders.py always
+  has; configure() (called once from main.py) replaces the root handlers
+  with one QueueHandler
+- The QueueHandler runs in the calling thread and only does the cheap
+  part: it stamps the record with the request id, renders the message and
+  puts it on a bounded queue. A QueueListener thread formats the records
+  and writes them to the sinks
+- The queue never blocks: when it is full the record is dropped and
+  counted, and the count is logged when the pipeline shuts down
+- RequestContextMiddleware takes the request id from X-Request-ID (or
+  makes one), echoes it on the response and keeps it in a contextvar;
+  contextvars follow the request into the threadpool, so records from
+  sync endpoints carry it too. It also writes one "access" record per
+  request
+- High-volume INFO records (loggers in LOG_SAMPLED_LOGGERS, the access log
+  by default) are kept at LOG_INFO_SAMPLE_RATE. The decision is made per
+  request id, so a request's records are all kept or all dropped; WARNING
+  and above are never sampled, and a 5xx access record is a WARNING
+
+SETTINGS (environment):
+- LOG_LEVEL            root level (INFO)
+- LOG_FORMAT           json (default) or text
+- LOG_SINKS            comma-separated: stdout, file (stdout)
+- LOG_FILE             file sink path (logs/backend.log), rotated at
+                       LOG_FILE_MAX_BYTES with LOG_FILE_BACKUPS kept
+- LOG_QUEUE_SIZE       records buffered before dropping (10000)
+- LOG_INFO_SAMPLE_RATE 0..1 share of sampled INFO records kept (1.0)
+- LOG_SAMPLED_LOGGERS  loggers sampled (access,uvicorn.access)
+
+LIMITS:
+- Records still in the queue when the process is killed are lost;
+  shutdown() (on app shutdown and at exit) drains it
+- uvicorn's own access log is turned down to WARNING; the access logger
+  here has the request id and matched route instead
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import List, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SINKS = [sink.strip() for sink in os.getenv("LOG_SINKS", "stdout").split(",") if sink.strip()]
+LOG_FILE = os.getenv("LOG_FILE", os.path.join("logs", "backend.log"))
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_FILE_BACKUPS = int(os.getenv("LOG_FILE_BACKUPS", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_INFO_SAMPLE_RATE = float(os.getenv("LOG_INFO_SAMPLE_RATE", "1.0"))
+LOG_SAMPLED_LOGGERS = frozenset(
+    name.strip() for name in os.getenv("LOG_SAMPLED_LOGGERS", "access,uvicorn.access").split(",") if name.strip()
+)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# ids from clients are echoed into logs and headers; anything else is replaced
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# LogRecord attributes that are not "extra" fields
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+access_logger = logging.getLogger("access")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra= fields become top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s"
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the request id; handler filters run in the caller's thread, where the contextvar is"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps rate of the INFO-and-below records from the sampled loggers"""
+
+    def __init__(self, rate: float, loggers=LOG_SAMPLED_LOGGERS):
+        super().__init__()
+        self.threshold = int(max(0.0, min(rate, 1.0)) * 10000)
+        self.loggers = loggers
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.threshold >= 10000 or record.levelno > logging.INFO or record.name not in self.loggers:
+            return True
+        rid = getattr(record, "request_id", None)
+        # by request id, so one request's records are kept or dropped together
+        bucket = zlib.crc32(rid.encode()) % 10000 if rid else random.randrange(10000)
+        if bucket < self.threshold:
+            return True
+        self.dropped += 1
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Drops (and counts) records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # render the message here (args may be mutated later) but leave
+        # formatting, the expensive part, to the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+_sampler: Optional[SamplingFilter] = None
+
+
+def sinks(names: List[str]) -> List[logging.Handler]:
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers: List[logging.Handler] = []
+    for name in names:
+        if name == "stdout":
+            handler = logging.StreamHandler(sys.stdout)
+        elif name == "file":
+            directory = os.path.dirname(LOG_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8"
+            )
+        else:
+            raise ValueError(f"Unknown log sink {name!r} in LOG_SINKS (use stdout, file)")
+        handler.setFormatter(formatter)
+        handlers.append(handler)
+    return handlers
+
+
+def configure() -> None:
+    """Route every logger through the queue to the configured sinks (once per process)"""
+    global _listener, _handler, _sampler
+    with _lock:
+        if _listener is not None:
+            return
+
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _handler = NonBlockingQueueHandler(log_queue)
+        _sampler = SamplingFilter(LOG_INFO_SAMPLE_RATE)
+        _handler.addFilter(ContextFilter())
+        _handler.addFilter(_sampler)
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(_handler)
+        root.setLevel(LOG_LEVEL)
+
+        # uvicorn configures its own stream handlers before importing the app
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+            uvicorn_logger = logging.getLogger(name)
+            uvicorn_logger.handlers.clear()
+            uvicorn_logger.propagate = True
+        logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+
+        _listener = logging.handlers.QueueListener(log_queue, *sinks(LOG_SINKS), respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown)
+
+
+def shutdown() -> None:
+    """Drain the queue and stop the listener thread"""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+    if _handler.dropped or _sampler.dropped:
+        logging.getLogger(__name__).warning(
+            "Log records dropped: %s (queue full), %s (sampled out)", _handler.dropped, _sampler.dropped
+        )
+    listener.stop()
+
+
+def status() -> dict:
+    """Listener thread and queue state, for the health probe"""
+    with _lock:
+        listener = _listener
+    if listener is None:
+        return {"running": False}
+    thread = getattr(listener, "_thread", None)
+    return {
+        "running": thread is not None and thread.is_alive(),
+        "queued": listener.queue.qsize(),
+        "dropped": _handler.dropped,
+        "sampled_out": _sampler.dropped,
+    }
+
+
+def new_request_id(supplied: Optional[str]) -> str:
+    if supplied and _VALID_REQUEST_ID.match(supplied):
+        return supplied
+    return secrets.token_hex(16)
+
+
+class RequestContextMiddleware:
+    """Request id per request (X-Request-ID in and out) and one access record"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                supplied = value.decode("latin-1")
+                break
+        rid = new_request_id(supplied)
+        token = request_id.set(rid)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", rid.encode("latin-1"))
+                ]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            # left set: the app's exception handler runs outside this middleware
+            # and should log with the request id (each request is its own task)
+            status_code = 500
+            raise
+        finally:
+            route = scope.get("route")
+            access_logger.log(
+                logging.WARNING if status_code >= 500 else logging.INFO,
+                "%s %s %s", scope["method"], scope["path"], status_code,
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(route, "path", None),
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                },
+            )
+        request_id.reset(token)
@@ -16,17 +16,31 @@ DESIGN PRINCIPLE:
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse
+import logging
 import os
 from dotenv import load_dotenv
 
 # Import database and route modules
-from database import test_connection
-from api import auth, leads, hr
+from database import QueryTraceMiddleware, engine, test_connection
+from api import admin, auth, leads, hr
+from health import prober, summary
+import logging_config
+import metrics
+import payslips
+import profiler
+import reminders
+import timeouts
+from warmup import warmup
 
 # Load environment variables
 load_dotenv()
 
+# JSON logs through a background queue, see logging_config.py
+logging_config.configure()
+logger = logging.getLogger(__name__)
+
 # Create FastAPI application instance
 app = FastAPI(
     title="Technia ERP System",
@@ -44,7 +58,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # Explicitly allow OPTIONS
     allow_headers=["*"],
+    # keyset pagination on /api/hr/salaries, page totals, payslip downloads, request profiles, log correlation
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Payslip-Job", "Content-Disposition", "X-Profile-Id",
+                    logging_config.REQUEST_ID_HEADER],
 )
+# per-route statement timeouts, cancelled on client disconnect, see timeouts.py
+app.add_middleware(timeouts.StatementTimeoutMiddleware)
+# slow-query log and N+1 detection per request, see database.py
+app.add_middleware(QueryTraceMiddleware)
+# request id for every log record of a request, plus the access log
+app.add_middleware(logging_config.RequestContextMiddleware)
+# outermost, so latency includes CORS and error handling
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument(engine)
+# after the trace and metrics listeners: its handle_error raises
+timeouts.install(engine)
+
 app.include_router(
     auth.router, 
     prefix="/api/auth", 
@@ -63,6 +92,12 @@ app.include_router(
     tags=["HR"]
 )
 
+app.include_router(
+    admin.router,
+    prefix="/api/admin",
+    tags=["Admin"]
+)
+
 # Root endpoint
 @app.get("/")
 def read_root():
@@ -74,19 +109,50 @@ def read_root():
         "message": "Technia ERP System API",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "live": "/live",
+        "ready": "/ready"
     }
 
 @app.get("/health")
 def health_check():
     """
     Health check endpoint
-    WHY: Monitoring and deployment verification
+    WHY: Monitoring and deployment verification; served from the background
+    prober's last result (health.py), 503 when the database or the prober is down.
+    Statuses only - the details are at GET /api/admin/health (operators)
     """
-    return {
-        "status": "healthy",
-        "message": "API is running"
-    }
+    health = summary(prober.latest())
+    if health["status"] == "down":
+        return JSONResponse(status_code=503, content=jsonable_encoder(health))
+    return health
+
+@app.get("/live")
+def liveness():
+    """
+    Liveness probe
+    WHY: The process is up and its event loop answers; restart it if not
+    """
+    return {"status": "alive"}
+
+@app.get("/ready")
+def readiness():
+    """
+    Readiness probe
+    WHY: Route traffic here only once warm-up (warmup.py) has finished
+    """
+    body = warmup.status()
+    if not warmup.ready:
+        return JSONResponse(status_code=503, content=jsonable_encoder({"status": "warming", "warmup": body}))
+    return {"status": "ready", "warmup": body}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """
+    Prometheus scrape endpoint
+    WHY: Per-route latency, status and DB/pool usage (see metrics.py)
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -95,7 +161,7 @@ async def global_exception_handler(request, exc):
     Catch-all exception handler
     WHY: Prevents server crashes and provides consistent error format
     """
-    print(f"Global exception: {exc}")
+    logger.error("Global exception: %s", exc, exc_info=exc)
     return JSONResponse(
         status_code=500,
         content={
@@ -110,21 +176,40 @@ async def global_exception_handler(request, exc):
 async def startup_event():
     """
     Run when application starts
-    WHY: Verify database connection and print startup info
+    WHY: Verify database connection and log startup info
     """
-    print("🚀 Starting Technia ERP System...")
-    print(f"📊 API Documentation: http://localhost:8000/docs")
-    print(f"🔍 Alternative Docs: http://localhost:8000/redoc")
+    logger.info("Starting Technia ERP System...")
+    logger.info("API Documentation: http://localhost:8000/docs")
+    logger.info("Alternative Docs: http://localhost:8000/redoc")
     
     # Test database connection
     if test_connection():
-        print("✓ Database connection verified")
+        logger.info("Database connection verified")
     else:
-        print("✗ Database connection failed - check your .env file")
-        print("  Make sure SQL Server is running")
-        print("  Verify DATABASE_URL is correct")
+        logger.error("Database connection failed - check your .env file: make sure SQL Server is running "
+                     "and DATABASE_URL is correct")
+    
+    if os.getenv("REMINDERS_ENABLED", "true").lower() == "true":
+        reminders.scheduler.start()
+        logger.info("Reminder scheduler started")
     
-    print("🎯 API is ready for requests")
+    # /ready turns 200 when this finishes
+    warmup.start()
+    prober.start()
+    logger.info("API is accepting requests; warm-up running")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Run when application stops
+    WHY: Let background workers finish cleanly
+    """
+    warmup.stop()
+    prober.stop()
+    reminders.scheduler.stop()
+    payslips.shutdown()
+    profiler.shutdown()
+    logging_config.shutdown()
 
 # Run the application
 if __name__ == "__main__":
@@ -135,7 +220,7 @@ if __name__ == "__main__":
     port = int(os.getenv("API_PORT", "8000"))
     debug = os.getenv("DEBUG", "false").lower() == "true"
     
-    print(f"🏃‍♂️ Running on http://{host}:{port}")
+    logger.info("Running on http://%s:%s", host, port)
     
     # Start the server
     uvicorn.run(
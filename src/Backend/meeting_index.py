@@ -0,0 +1,250 @@
+"""
+Per-Agent Meeting Index
+
+WHY THIS FILE EXISTS:
+- add_meeting_to_lead used to accept any meeting_date, so agents got
+  double-booked
+- Conflict checks and free-slot lookups would otherwise scan client_meetings
+  on every request
+
+HOW IT WORKS:
+- One in-memory index per company_domain, built lazily with a single query
+  the first time that company books or looks up a meeting
+- Per agent, meetings are kept sorted by start time. A new [start, end)
+  can only overlap meetings starting in (start - longest_duration, end), so
+  a conflict check is two bisects plus the few meetings in that window
+- The create/delete endpoints keep it in sync after they commit
+- The index holds exactly the company's meetings since HISTORY_DAYS ago, so
+  (count, highest meeting_id) of those rows is its version: get_index()
+  drops meetings that fell out of the window, reads that pair in one
+  query and rebuilds when it differs - another worker booked or deleted
+- The index is only the fast path: add_meeting_to_lead's INSERT ... SELECT
+  carries overlap_condition() as NOT EXISTS (UPDLOCK, HOLDLOCK on SQL
+  Server), so two workers can't book the same slot between their checks
+
+LIMITS:
+- One version query per lookup; a company's index is rebuilt whole when
+  another worker wrote to it
+- The version can't see a meeting being moved; meetings have no update path
+"""
+
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, and_, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+
+from models import ClientMeeting
+
+DEFAULT_DURATION_MINUTES = 60
+WORKDAY_START_HOUR = int(os.getenv("WORKDAY_START_HOUR", "9"))
+WORKDAY_END_HOUR = int(os.getenv("WORKDAY_END_HOUR", "18"))
+
+# past meetings can't conflict with new bookings, so the index starts here
+HISTORY_DAYS = 1
+# longest meeting MeetingCreate accepts; bounds the overlap search window
+MAX_DURATION_MINUTES = 1440
+
+
+def meeting_interval(meeting_date: datetime, duration_minutes: Optional[int]) -> Tuple[datetime, datetime]:
+    # client_meetings.meeting_date is a naive DATETIME
+    meeting_date = meeting_date.replace(tzinfo=None)
+    return meeting_date, meeting_date + timedelta(minutes=duration_minutes or DEFAULT_DURATION_MINUTES)
+
+
+def window_start() -> datetime:
+    return datetime.combine(date.today() - timedelta(days=HISTORY_DAYS), time.min)
+
+
+class meeting_end(FunctionElement):
+    """meeting_date + duration_minutes (DEFAULT_DURATION_MINUTES when NULL), in SQL"""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(meeting_end)
+def _compile_meeting_end(element, compiler, **kw):
+    meeting_date, duration = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"DATEADD(minute, COALESCE({duration}, {DEFAULT_DURATION_MINUTES}), {meeting_date})"
+
+
+@compiles(meeting_end, "sqlite")
+def _compile_meeting_end_sqlite(element, compiler, **kw):
+    # the stand-in (sqlite_standin.py) keeps DATETIME as ISO text
+    meeting_date, duration = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"datetime({meeting_date}, '+' || COALESCE({duration}, {DEFAULT_DURATION_MINUTES}) || ' minutes')"
+
+
+def overlap_condition(meetings, company_domain: str, user_id: int, start: datetime, end: datetime):
+    """SQL twin of AgentSchedule.overlapping over client_meetings (or an alias of it)"""
+    return and_(
+        meetings.c.company_domain == company_domain,
+        meetings.c.assigned_to == user_id,
+        meetings.c.meeting_date < end,
+        meetings.c.meeting_date > start - timedelta(minutes=MAX_DURATION_MINUTES),
+        meeting_end(meetings.c.meeting_date, meetings.c.duration_minutes) > start
+    )
+
+
+class AgentSchedule:
+    """One agent's meetings, sorted by start time"""
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.entries: List[Tuple[datetime, int, datetime]] = []  # (start, meeting_id, end)
+        self.by_id: Dict[int, Tuple[datetime, int, datetime]] = {}
+        self.longest = timedelta(0)
+
+    def add(self, meeting_id: int, start: datetime, end: datetime) -> None:
+        if meeting_id in self.by_id:
+            self.remove(meeting_id)
+
+        entry = (start, meeting_id, end)
+        position = bisect_right(self.entries, entry)
+        self.entries.insert(position, entry)
+        self.starts.insert(position, start)
+        self.by_id[meeting_id] = entry
+        self.longest = max(self.longest, end - start)
+
+    def remove(self, meeting_id: int) -> None:
+        entry = self.by_id.pop(meeting_id, None)
+        if entry is None:
+            return
+
+        position = bisect_left(self.entries, entry)
+        del self.entries[position]
+        del self.starts[position]
+
+    def prune(self, before: datetime) -> List[int]:
+        """Drop meetings starting before `before`; returns their ids"""
+        position = bisect_left(self.starts, before)
+        dropped = [meeting_id for _, meeting_id, _ in self.entries[:position]]
+        del self.entries[:position]
+        del self.starts[:position]
+        for meeting_id in dropped:
+            del self.by_id[meeting_id]
+        return dropped
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Tuple[datetime, int, datetime]]:
+        low = bisect_right(self.starts, start - self.longest)
+        high = bisect_left(self.starts, end)
+        return [entry for entry in self.entries[low:high] if entry[2] > start]
+
+
+class CompanyMeetingIndex:
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.agents: Dict[int, AgentSchedule] = {}
+        self.meeting_ids = set()
+
+    def version(self, since: datetime) -> Tuple[int, Optional[int]]:
+        """(count, highest meeting_id) after dropping meetings before since"""
+        with self.lock:
+            for agent in self.agents.values():
+                self.meeting_ids.difference_update(agent.prune(since))
+            return len(self.meeting_ids), max(self.meeting_ids, default=None)
+
+    def schedule(self, user_id: int) -> AgentSchedule:
+        if user_id not in self.agents:
+            self.agents[user_id] = AgentSchedule()
+        return self.agents[user_id]
+
+    def conflicts(self, user_id: int, start: datetime, end: datetime) -> List[Tuple[datetime, int, datetime]]:
+        with self.lock:
+            agent = self.agents.get(user_id)
+            return agent.overlapping(start, end) if agent else []
+
+    def add(self, user_id: int, meeting_id: int, start: datetime, end: datetime) -> None:
+        with self.lock:
+            self.schedule(user_id).add(meeting_id, start, end)
+            self.meeting_ids.add(meeting_id)
+
+    def remove(self, user_id: int, meeting_id: int) -> None:
+        with self.lock:
+            agent = self.agents.get(user_id)
+            if agent:
+                agent.remove(meeting_id)
+            self.meeting_ids.discard(meeting_id)
+
+    def free_slots(self, user_id: int, day: date, min_minutes: int = 30) -> List[Tuple[datetime, datetime]]:
+        """Gaps of at least min_minutes inside the working day"""
+        day_start = datetime.combine(day, time(WORKDAY_START_HOUR))
+        day_end = datetime.combine(day, time(WORKDAY_END_HOUR))
+        minimum = timedelta(minutes=min_minutes)
+
+        with self.lock:
+            agent = self.agents.get(user_id)
+            busy = agent.overlapping(day_start, day_end) if agent else []
+
+        slots = []
+        cursor = day_start
+        for start, _, end in busy:
+            if start - cursor >= minimum:
+                slots.append((cursor, start))
+            cursor = max(cursor, end)
+        if day_end - cursor >= minimum:
+            slots.append((cursor, day_end))
+        return slots
+
+
+_indexes: Dict[str, CompanyMeetingIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def stored_version(db: Session, company_domain: str, since: datetime) -> Tuple[int, Optional[int]]:
+    count, highest = db.query(func.count(ClientMeeting.meeting_id), func.max(ClientMeeting.meeting_id)).filter(
+        ClientMeeting.company_domain == company_domain,
+        ClientMeeting.meeting_date >= since
+    ).one()
+    return count, highest
+
+
+def get_index(db: Session, company_domain: str) -> CompanyMeetingIndex:
+    """The company's index, (re)loaded from client_meetings when it is missing or out of date"""
+    since = window_start()
+    version = stored_version(db, company_domain, since)
+    index = _indexes.get(company_domain)
+    if index is not None and index.version(since) == version:
+        return index
+
+    with _indexes_lock:
+        index = _indexes.get(company_domain)
+        if index is not None and index.version(since) == version:
+            return index
+
+        index = CompanyMeetingIndex()
+        rows = db.query(
+            ClientMeeting.meeting_id, ClientMeeting.assigned_to,
+            ClientMeeting.meeting_date, ClientMeeting.duration_minutes
+        ).filter(
+            ClientMeeting.company_domain == company_domain,
+            ClientMeeting.meeting_date >= since
+        ).all()
+
+        for row in rows:
+            start, end = meeting_interval(row.meeting_date, row.duration_minutes)
+            index.add(row.assigned_to, row.meeting_id, start, end)
+
+        _indexes[company_domain] = index
+        return index
+
+
+def record_meeting(company_domain: str, meeting: ClientMeeting) -> None:
+    """Add a committed meeting; a company whose index isn't loaded yet picks it up on load"""
+    index = _indexes.get(company_domain)
+    if index is not None and meeting.meeting_date is not None:
+        start, end = meeting_interval(meeting.meeting_date, meeting.duration_minutes)
+        index.add(meeting.assigned_to, meeting.meeting_id, start, end)
+
+
+def forget_meeting(company_domain: str, user_id: int, meeting_id: int) -> None:
+    index = _indexes.get(company_domain)
+    if index is not None:
+        index.remove(user_id, meeting_id)
+
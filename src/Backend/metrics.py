@@ -0,0 +1,349 @@
+"""
+Request and Database Metrics
+
+WHY THIS FILE EXISTS:
+- The only observability was print() and a constant /health, so nobody
+  could tell which endpoints hold database connections the longest
+- Records per-route HTTP and database metrics and serves them at /metrics
+  in the Prometheus text format
+
+HOW IT WORKS:
+- MetricsMiddleware is plain ASGI (no BaseHTTPMiddleware buffering); per
+  request it tracks in-flight count, latency and status
+- Labels are router (auth, real-estate, hr, admin or other, from the path
+  prefix) and route, the matched route template FastAPI leaves in
+  scope["route"]
+  (e.g. /api/hr/employees/{employee_id}); unmatched paths share one label
+  so scanners can't blow up the series count
+- A RequestStats object is put in a contextvar for the request; FastAPI
+  copies the context into the threadpool running sync endpoints, so the
+  engine events below update the same object:
+    before/after_cursor_execute -> queries and DB time
+    fetch on the DBAPI cursor   -> rows returned (CountingCursor)
+    rowcount after DML          -> rows written
+    pool checkout/checkin       -> time a connection was held
+- A connection checked in after the response went out (the session closes
+  after the response in this FastAPI version) still books its hold time
+  on the request that checked it out
+- While tracemalloc is on (allocations.py) each request's peak allocation
+  is recorded per route, and per tenant: get_current_user names the tenant
+  (company_domain) through set_tenant(). /metrics has no authentication,
+  so the per-tenant figures are not in it; the operator-only
+  GET /api/admin/memory serves them (Registry.tenant_peaks_summary())
+
+LIMITS:
+- Counters are per worker process; Prometheus sums them across workers
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import allocations
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+ALLOCATION_BUCKETS = tuple(float(2 ** power) for power in range(16, 31, 2))      # 64 KiB .. 1 GiB
+
+ROUTERS = (
+    ("/api/auth", "auth"),
+    ("/api/real-estate", "real-estate"),
+    ("/api/hr", "hr"),
+    ("/api/admin", "admin"),
+)
+UNMATCHED = "unmatched"
+
+
+def router_for(path: str) -> str:
+    for prefix, name in ROUTERS:
+        if path == prefix or path.startswith(prefix + "/"):
+            return name
+    return "other"
+
+
+class Histogram:
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: Dict[tuple, int] = defaultdict(int)                  # router, route, method, status
+        self.latency: Dict[tuple, Histogram] = {}                           # router, route, method
+        self.in_flight: Dict[str, int] = defaultdict(int)                   # router
+        self.db_queries: Dict[tuple, int] = defaultdict(int)                # router, route
+        self.db_rows: Dict[tuple, int] = defaultdict(int)
+        self.db_seconds: Dict[tuple, float] = defaultdict(float)
+        self.pool_seconds: Dict[tuple, float] = defaultdict(float)
+        self.queries_per_request: Dict[tuple, Histogram] = {}
+        self.counters: Dict[tuple, int] = defaultdict(int)                  # name, router, route
+        self.peak_bytes: Dict[tuple, Histogram] = {}                        # router, route
+        self.tenant_peaks: Dict[str, list] = {}                             # tenant -> requests, bytes, max
+
+    def started(self, router: str) -> None:
+        with self.lock:
+            self.in_flight[router] += 1
+
+    def finished(self, stats: "RequestStats", method: str, status: int, seconds: float) -> None:
+        labels = (stats.router, stats.route)
+        with self.lock:
+            self.in_flight[stats.router] -= 1
+            self.requests[labels + (method, str(status))] += 1
+            self.latency.setdefault(labels + (method,), Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.db_queries[labels] += stats.queries
+            self.db_rows[labels] += stats.rows
+            self.db_seconds[labels] += stats.db_seconds
+            self.pool_seconds[labels] += stats.pool_seconds
+            self.queries_per_request.setdefault(labels, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            if stats.peak_bytes is not None:
+                self.peak_bytes.setdefault(labels, Histogram(ALLOCATION_BUCKETS)).observe(stats.peak_bytes)
+                if stats.tenant is not None:
+                    peaks = self.tenant_peaks.setdefault(stats.tenant, [0, 0, 0])
+                    peaks[0] += 1
+                    peaks[1] += stats.peak_bytes
+                    peaks[2] = max(peaks[2], stats.peak_bytes)
+
+    def add_pool_time(self, labels: tuple, seconds: float) -> None:
+        with self.lock:
+            self.pool_seconds[labels] += seconds
+
+    def tenant_peaks_summary(self) -> list:
+        """Per-tenant request peaks, largest first; not exported on /metrics"""
+        with self.lock:
+            peaks = [(tenant, list(values)) for tenant, values in self.tenant_peaks.items()]
+        return sorted((
+            {"tenant": tenant, "requests": requests, "mean_bytes": total // requests, "max_bytes": largest}
+            for tenant, (requests, total, largest) in peaks
+        ), key=lambda row: row["max_bytes"], reverse=True)
+
+    def increment(self, name: str, router: str, route: str) -> None:
+        """Ad-hoc per-route counters, e.g. statement timeouts"""
+        with self.lock:
+            self.counters[(name, router, route)] += 1
+
+    def render(self) -> str:
+        lines = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def labels(names: Tuple[str, ...], values: tuple) -> str:
+            pairs = ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+            return "{" + pairs + "}"
+
+        def histogram(name: str, names: Tuple[str, ...], series: Dict[tuple, Histogram]) -> None:
+            for key, value in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(value.buckets + (float("inf"),), value.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{name}_bucket{labels(names + ('le',), key + (le,))} {cumulative}")
+                lines.append(f"{name}_sum{labels(names, key)} {value.total}")
+                lines.append(f"{name}_count{labels(names, key)} {value.count}")
+
+        def simple(name: str, names: Tuple[str, ...], series: dict) -> None:
+            for key, value in sorted(series.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                lines.append(f"{name}{labels(names, key)} {value}")
+
+        route = ("router", "route")
+        with self.lock:
+            family("http_requests_total", "counter", "HTTP requests by route and status")
+            simple("http_requests_total", route + ("method", "status"), self.requests)
+            family("http_request_duration_seconds", "histogram", "HTTP request latency")
+            histogram("http_request_duration_seconds", route + ("method",), self.latency)
+            family("http_requests_in_progress", "gauge", "HTTP requests being served")
+            simple("http_requests_in_progress", ("router",), self.in_flight)
+            family("db_queries_total", "counter", "SQL statements executed")
+            simple("db_queries_total", route, self.db_queries)
+            family("db_rows_total", "counter", "Rows fetched or written")
+            simple("db_rows_total", route, self.db_rows)
+            family("db_query_seconds_total", "counter", "Time spent executing SQL statements")
+            simple("db_query_seconds_total", route, self.db_seconds)
+            family("db_pool_hold_seconds_total", "counter", "Time pooled connections were checked out")
+            simple("db_pool_hold_seconds_total", route, self.pool_seconds)
+            family("db_queries_per_request", "histogram", "SQL statements per request")
+            histogram("db_queries_per_request", route, self.queries_per_request)
+            family("http_request_peak_allocated_bytes", "histogram",
+                   "Peak memory allocated by a request while tracemalloc is on")
+            histogram("http_request_peak_allocated_bytes", route, self.peak_bytes)
+            names = sorted({key[0] for key in self.counters})
+            for name in names:
+                family(name, "counter", name.replace("_", " "))
+                simple(name, route, {key[1:]: value for key, value in self.counters.items() if key[0] == name})
+
+        return "\n".join(lines) + "\n"
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+class RequestStats:
+    """Mutable per-request totals; shared by reference with worker threads"""
+
+    def __init__(self, router: str):
+        self.router = router
+        self.route = UNMATCHED
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+        self.pool_seconds = 0.0
+        self.tenant: Optional[str] = None
+        self.peak_bytes: Optional[int] = None
+        self.done = False
+        self.lock = threading.Lock()
+
+    def add_pool_time(self, seconds: float) -> None:
+        with self.lock:
+            if not self.done:
+                self.pool_seconds += seconds
+                return
+        registry.add_pool_time((self.router, self.route), seconds)
+
+    def close(self) -> None:
+        with self.lock:
+            self.done = True
+
+
+current: ContextVar[Optional[RequestStats]] = ContextVar("request_metrics", default=None)
+
+
+def set_tenant(company_domain: str) -> None:
+    """Label the current request's metrics with the caller's company"""
+    stats = current.get()
+    if stats is not None:
+        stats.tenant = company_domain
+
+
+class MetricsMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(router_for(scope["path"]))
+        token = current.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry.started(stats.router)
+        baseline = allocations.request_started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stats.peak_bytes = allocations.request_finished(baseline)
+            route = scope.get("route")
+            if route is not None:
+                stats.route = getattr(route, "path_format", None) or getattr(route, "path", UNMATCHED)
+            stats.close()
+            registry.finished(stats, scope["method"], status_code, time.perf_counter() - start)
+            current.reset(token)
+
+
+class CountingCursor:
+    """DBAPI cursor proxy that counts fetched rows into the request's stats"""
+
+    def __init__(self, cursor, stats: RequestStats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def _count(self, rows):
+        self._stats.rows += len(rows)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        return self._count(self._cursor.fetchmany(*args))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_started"].pop()
+    stats = current.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_seconds += time.perf_counter() - started
+    if cursor.description is not None:
+        # CursorResult fetches through context.cursor
+        if context is not None:
+            context.cursor = CountingCursor(cursor, stats)
+    elif cursor.rowcount and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+
+
+def handle_error(exception_context):
+    if exception_context.connection is not None:
+        started = exception_context.connection.info.get("metrics_started")
+        if started:
+            started.pop()
+
+
+def checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["metrics_checkout"] = (time.perf_counter(), current.get())
+
+
+def checkin(dbapi_connection, connection_record):
+    checked_out = connection_record.info.pop("metrics_checkout", None)
+    if checked_out and checked_out[1] is not None:
+        checked_out[1].add_pool_time(time.perf_counter() - checked_out[0])
+
+
+def instrument(engine: Engine) -> None:
+    """Attach the query and pool listeners to an engine (once)"""
+    if event.contains(engine, "before_cursor_execute", before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+    event.listen(engine.pool, "checkout", checkout)
+    event.listen(engine.pool, "checkin", checkin)
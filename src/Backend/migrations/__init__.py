@@ -0,0 +1,98 @@
+"""
+Schema Migrations
+
+WHY THIS FILE EXISTS:
+- The production schema lives in SQL Server and was created by hand
+- Schema changes (indexes, new tables, new columns) need to be applied
+  the same way on every environment, exactly once
+- Keeps a schema_migrations table recording which versions ran
+
+HOW IT WORKS:
+- Every module in migrations/versions defines VERSION, DESCRIPTION and
+  upgrade(conn)
+- upgrade() runs the pending ones in order, each in its own transaction
+- Run with: python -m migrations [upgrade|status]
+- pending() answers "is this database behind the code" without writing;
+  warmup.py keeps a worker out of /ready until it returns nothing
+"""
+
+import importlib
+import pkgutil
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+from sqlalchemy.engine import Engine
+
+from migrations import versions
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200)),
+    Column("applied_at", DateTime)
+)
+
+
+def load_migrations() -> List:
+    """Import every migration module, sorted by VERSION"""
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+    ]
+    modules.sort(key=lambda module: module.VERSION)
+
+    seen = set()
+    for module in modules:
+        if module.VERSION in seen:
+            raise ValueError(f"Duplicate migration version {module.VERSION}")
+        seen.add(module.VERSION)
+
+    return modules
+
+
+def applied_versions(engine: Engine) -> set:
+    schema_migrations.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return {row.version for row in conn.execute(select(schema_migrations.c.version))}
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to target (default: latest)"""
+    done = applied_versions(engine)
+    applied = []
+
+    for module in load_migrations():
+        if module.VERSION in done or (target is not None and module.VERSION > target):
+            continue
+
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=module.VERSION,
+                description=module.DESCRIPTION,
+                applied_at=datetime.now()
+            ))
+        applied.append(module.VERSION)
+
+    return applied
+
+
+def pending(engine: Engine) -> List[int]:
+    """Versions not applied yet; read-only, so no schema_migrations table means all of them"""
+    known = [module.VERSION for module in load_migrations()]
+    if not inspect(engine).has_table(schema_migrations.name):
+        return known
+    with engine.connect() as conn:
+        done = {row.version for row in conn.execute(select(schema_migrations.c.version))}
+    return [version for version in known if version not in done]
+
+
+def status(engine: Engine) -> List[dict]:
+    done = applied_versions(engine)
+    return [
+        {"version": module.VERSION, "description": module.DESCRIPTION, "applied": module.VERSION in done}
+        for module in load_migrations()
+    ]
@@ -0,0 +1,16 @@
+import sys
+
+from database import engine
+from migrations import status, upgrade
+
+command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+if command == "upgrade":
+    applied = upgrade(engine)
+    print(f"Applied migrations: {applied}" if applied else "Database is up to date")
+elif command == "status":
+    for row in status(engine):
+        print(f"{row['version']:04d}  {'applied' if row['applied'] else 'pending':8}  {row['description']}")
+else:
+    print("Usage: python -m migrations [upgrade|status]")
+    sys.exit(1)
@@ -0,0 +1,48 @@
+"""Helpers shared by migration modules - all of them are idempotent"""
+
+from typing import List, Optional
+
+from sqlalchemy import Column, Index, MetaData, Table, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+
+def has_table(conn, table_name: str) -> bool:
+    return inspect(conn).has_table(table_name)
+
+
+def has_index(conn, table_name: str, index_name: str) -> bool:
+    return any(index["name"] == index_name for index in inspect(conn).get_indexes(table_name))
+
+
+def create_index(conn, table_name: str, index_name: str, columns: List[str],
+                 include: Optional[List[str]] = None, unique: bool = False) -> None:
+    """
+    Create an index (with INCLUDE columns on SQL Server) unless it already
+    exists. A column written as "name DESC" is indexed descending.
+    """
+    if has_index(conn, table_name, index_name):
+        return
+
+    table = Table(table_name, MetaData(), autoload_with=conn, resolve_fks=False)
+    expressions = []
+    for column in columns:
+        name, _, direction = column.partition(" ")
+        expressions.append(table.c[name].desc() if direction.upper() == "DESC" else table.c[name])
+
+    kwargs = {"mssql_include": include} if include else {}
+    Index(index_name, *expressions, unique=unique, **kwargs).create(conn)
+
+
+
+def has_column(conn, table_name: str, column_name: str) -> bool:
+    return any(column["name"] == column_name for column in inspect(conn).get_columns(table_name))
+
+
+def add_column(conn, table_name: str, column: Column) -> None:
+    """ALTER TABLE ... ADD <column> unless it already exists"""
+    if has_column(conn, table_name, column.name):
+        return
+
+    Table(table_name, MetaData(), column)
+    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table_name} ADD {ddl}"))
@@ -0,0 +1,2 @@
+# migrations/versions/__init__.py
+# One module per schema version: VERSION, DESCRIPTION, upgrade(conn)
@@ -0,0 +1,50 @@
+"""
+Covering indexes for the tenant-scoped access paths in api/leads.py,
+permissions.py and auth.py, plus the leads_activity_summary table.
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, func
+
+from migrations.ops import create_index, has_table
+
+VERSION = 1
+DESCRIPTION = "Lead access-path indexes and leads_activity_summary"
+
+
+def upgrade(conn):
+    if not has_table(conn, "leads_activity_summary"):
+        metadata = MetaData()
+        Table("leads_info", metadata, Column("lead_id", BigInteger, primary_key=True))
+        Table(
+            "leads_activity_summary", metadata,
+            Column("lead_id", BigInteger, ForeignKey("leads_info.lead_id"), primary_key=True),
+            Column("company_domain", String(100), nullable=False),
+            Column("call_count", Integer, nullable=False, server_default="0"),
+            Column("meeting_count", Integer, nullable=False, server_default="0"),
+            Column("last_call_at", DateTime),
+            Column("next_meeting_at", DateTime),
+            Column("last_status", Integer),
+            Column("date_updated", DateTime, server_default=func.getdate())
+        ).create(conn)
+
+    create_index(conn, "leads_activity_summary", "ix_leads_activity_summary_last_call",
+                 ["company_domain", "last_call_at"])
+    create_index(conn, "leads_activity_summary", "ix_leads_activity_summary_next_meeting",
+                 ["company_domain", "next_meeting_at"])
+
+    create_index(conn, "leads_info", "ix_leads_info_company", ["company_domain", "lead_id"])
+    create_index(conn, "leads_info", "ix_leads_info_company_assigned", ["company_domain", "assigned_to"])
+
+    create_index(conn, "client_calls", "ix_client_calls_lead", ["lead_id", "call_date"],
+                 include=["call_status", "assigned_to", "company_domain", "date_added"])
+    create_index(conn, "client_calls", "ix_client_calls_company_assigned",
+                 ["company_domain", "assigned_to", "call_date"])
+
+    create_index(conn, "client_meetings", "ix_client_meetings_lead", ["lead_id", "meeting_date"],
+                 include=["meeting_status", "assigned_to", "company_domain", "date_added"])
+    create_index(conn, "client_meetings", "ix_client_meetings_company_assigned",
+                 ["company_domain", "assigned_to", "meeting_date"])
+
+    create_index(conn, "user_role_permissions", "ix_user_role_permissions_role", ["role_id"],
+                 include=["module_id", "feature_id", "d_read", "d_write", "d_edit", "d_delete"])
+    create_index(conn, "user_info", "ix_user_info_company", ["company_domain"])
@@ -0,0 +1,30 @@
+"""Review queue for the lead deduplication job (dedup.py)"""
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, func
+
+from migrations.ops import create_index, has_table
+
+VERSION = 2
+DESCRIPTION = "leads_duplicate_candidates"
+
+
+def upgrade(conn):
+    if not has_table(conn, "leads_duplicate_candidates"):
+        metadata = MetaData()
+        Table("leads_info", metadata, Column("lead_id", BigInteger, primary_key=True))
+        Table(
+            "leads_duplicate_candidates", metadata,
+            Column("candidate_id", Integer, primary_key=True, autoincrement=True),
+            Column("company_domain", String(100), nullable=False),
+            Column("lead_id_a", BigInteger, ForeignKey("leads_info.lead_id"), nullable=False),
+            Column("lead_id_b", BigInteger, ForeignKey("leads_info.lead_id"), nullable=False),
+            Column("score", Integer, nullable=False),
+            Column("reasons", String(200)),
+            Column("status", String(20), nullable=False, server_default="pending"),
+            Column("date_added", DateTime, server_default=func.getdate())
+        ).create(conn)
+
+    create_index(conn, "leads_duplicate_candidates", "ix_leads_duplicate_candidates_review",
+                 ["company_domain", "status", "score"])
+    create_index(conn, "leads_duplicate_candidates", "ux_leads_duplicate_candidates_pair",
+                 ["company_domain", "lead_id_a", "lead_id_b"], unique=True)
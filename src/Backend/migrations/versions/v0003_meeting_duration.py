@@ -0,0 +1,12 @@
+"""Meetings get a duration so double-bookings can be detected (meeting_index.py)"""
+
+from sqlalchemy import Column, Integer
+
+from migrations.ops import add_column
+
+VERSION = 3
+DESCRIPTION = "client_meetings.duration_minutes"
+
+
+def upgrade(conn):
+    add_column(conn, "client_meetings", Column("duration_minutes", Integer, nullable=True))
@@ -0,0 +1,13 @@
+"""Range lookups on call_date / meeting_date for the reminder scheduler (reminders.py)"""
+
+from migrations.ops import create_index
+
+VERSION = 4
+DESCRIPTION = "client_calls / client_meetings date indexes"
+
+
+def upgrade(conn):
+    create_index(conn, "client_calls", "ix_client_calls_date", ["call_date"],
+                 include=["company_domain", "assigned_to", "lead_id"])
+    create_index(conn, "client_meetings", "ix_client_meetings_date", ["meeting_date"],
+                 include=["company_domain", "assigned_to", "lead_id"])
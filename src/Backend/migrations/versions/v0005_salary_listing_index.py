@@ -0,0 +1,12 @@
+"""Covering index in the order of the keyset-paginated GET /api/hr/salaries"""
+
+from migrations.ops import create_index
+
+VERSION = 5
+DESCRIPTION = "employees_salaries listing index"
+
+
+def upgrade(conn):
+    create_index(conn, "employees_salaries", "ix_employees_salaries_listing",
+                 ["company_domain", "due_year DESC", "due_month DESC", "employee_id"],
+                 include=["gross_salary", "insurance", "taxes", "net_salary", "due_date", "date_added"])
@@ -0,0 +1,26 @@
+"""Per-company tax brackets and insurance rate for the deduction engine (deductions.py)"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, MetaData, Numeric, String, Table, Text, func
+from sqlalchemy.dialects.mssql import BIT, MONEY
+
+from migrations.ops import has_table
+
+VERSION = 6
+DESCRIPTION = "payroll_deduction_config"
+
+
+def upgrade(conn):
+    if has_table(conn, "payroll_deduction_config"):
+        return
+
+    metadata = MetaData()
+    Table("company_info", metadata, Column("company_domain", String(100), primary_key=True))
+    Table(
+        "payroll_deduction_config", metadata,
+        Column("company_domain", String(100), ForeignKey("company_info.company_domain"), primary_key=True),
+        Column("tax_brackets", Text, nullable=False),
+        Column("insurance_rate", Numeric(7, 6), nullable=False),
+        Column("insurance_cap", MONEY),
+        Column("tax_after_insurance", BIT, nullable=False, server_default="1"),
+        Column("date_updated", DateTime, server_default=func.getdate())
+    ).create(conn)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, BigInteger, Date, ForeignKey, CheckConstraint, ForeignKeyConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, BigInteger, Date, ForeignKey, CheckConstraint, ForeignKeyConstraint, Identity, Index, Numeric
 from sqlalchemy.dialects.mssql import UNIQUEIDENTIFIER, BIT, MONEY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -54,6 +54,7 @@ class UserInfo(Base):
     
     __table_args__ = (
         CheckConstraint("gender IN ('Male', 'Female')", name="ck_gender"),
+        Index("ix_user_info_company", "company_domain"),
     )
 
 class UserRole(Base):
@@ -77,6 +78,13 @@ class UserRolePermission(Base):
     d_edit = Column(BIT, default=0)
     d_delete = Column(BIT, default=0)
 
+    __table_args__ = (
+        Index(
+            "ix_user_role_permissions_role", "role_id",
+            mssql_include=["module_id", "feature_id", "d_read", "d_write", "d_edit", "d_delete"]
+        ),
+    )
+
 class UserRoleMapping(Base):
     __tablename__ = "user_role_mapping"
     
@@ -146,6 +154,49 @@ class LeadsInfo(Base):
     lead_status = Column(Integer)
     date_added = Column(DateTime, default=func.getdate())
 
+    activity = relationship("LeadActivitySummary", uselist=False, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_leads_info_company", "company_domain", "lead_id"),
+        Index("ix_leads_info_company_assigned", "company_domain", "assigned_to"),
+    )
+
+class LeadActivitySummary(Base):
+    # denormalised per-lead counters, kept in sync by activity.py
+    __tablename__ = "leads_activity_summary"
+
+    lead_id = Column(BigInteger, ForeignKey("leads_info.lead_id"), primary_key=True)
+    company_domain = Column(String(100), nullable=False)
+    call_count = Column(Integer, nullable=False, default=0)
+    meeting_count = Column(Integer, nullable=False, default=0)
+    last_call_at = Column(DateTime)
+    next_meeting_at = Column(DateTime)
+    last_status = Column(Integer)  # call_status of the latest call
+    date_updated = Column(DateTime, default=func.getdate(), onupdate=func.getdate())
+
+    __table_args__ = (
+        Index("ix_leads_activity_summary_last_call", "company_domain", "last_call_at"),
+        Index("ix_leads_activity_summary_next_meeting", "company_domain", "next_meeting_at"),
+    )
+
+class LeadDuplicateCandidate(Base):
+    # scored near-duplicate pairs found by dedup.py, reviewed before merging
+    __tablename__ = "leads_duplicate_candidates"
+
+    candidate_id = Column(Integer, primary_key=True)  # IDENTITY(1,1)
+    company_domain = Column(String(100), nullable=False)
+    lead_id_a = Column(BigInteger, ForeignKey("leads_info.lead_id"), nullable=False)
+    lead_id_b = Column(BigInteger, ForeignKey("leads_info.lead_id"), nullable=False)
+    score = Column(Integer, nullable=False)
+    reasons = Column(String(200))
+    status = Column(String(20), nullable=False, default="pending")  # pending / dismissed
+    date_added = Column(DateTime, default=func.getdate())
+
+    __table_args__ = (
+        Index("ix_leads_duplicate_candidates_review", "company_domain", "status", "score"),
+        Index("ux_leads_duplicate_candidates_pair", "company_domain", "lead_id_a", "lead_id_b", unique=True),
+    )
+
 class ClientCall(Base):
     __tablename__ = "client_calls"
     
@@ -157,6 +208,15 @@ class ClientCall(Base):
     call_status = Column(Integer)
     date_added = Column(DateTime, default=func.getdate())
 
+    __table_args__ = (
+        Index(
+            "ix_client_calls_lead", "lead_id", "call_date",
+            mssql_include=["call_status", "assigned_to", "company_domain", "date_added"]
+        ),
+        Index("ix_client_calls_company_assigned", "company_domain", "assigned_to", "call_date"),
+        Index("ix_client_calls_date", "call_date", mssql_include=["company_domain", "assigned_to", "lead_id"]),
+    )
+
 class ClientMeeting(Base):
     __tablename__ = "client_meetings"
     
@@ -166,15 +226,25 @@ class ClientMeeting(Base):
     lead_id = Column(BigInteger, ForeignKey("leads_info.lead_id"))
     meeting_date = Column(DateTime)
     meeting_status = Column(Integer)
+    duration_minutes = Column(Integer, default=60)
     date_added = Column(DateTime, default=func.getdate())
 
+    __table_args__ = (
+        Index(
+            "ix_client_meetings_lead", "lead_id", "meeting_date",
+            mssql_include=["meeting_status", "assigned_to", "company_domain", "date_added"]
+        ),
+        Index("ix_client_meetings_company_assigned", "company_domain", "assigned_to", "meeting_date"),
+        Index("ix_client_meetings_date", "meeting_date", mssql_include=["company_domain", "assigned_to", "lead_id"]),
+    )
+
 # HR TABLES - FIXED FOR EXACT DATABASE SCHEMA
 
 class EmployeeInfo(Base):
     __tablename__ = "employees_info"
     
     company_domain = Column(String(100), ForeignKey("company_info.company_domain"), primary_key=True)
-    employee_id = Column(Integer, primary_key=True)  
+    employee_id = Column(Integer, Identity(), primary_key=True)
     
     contact_name = Column(String(50), nullable=False)  
     
@@ -211,4 +281,20 @@ class EmployeeSalary(Base):
             ['company_domain', 'employee_id'], 
             ['employees_info.company_domain', 'employees_info.employee_id']
         ),
-    )
\ No newline at end of file
+        Index(
+            "ix_employees_salaries_listing",
+            company_domain, due_year.desc(), due_month.desc(), employee_id,
+            mssql_include=["gross_salary", "insurance", "taxes", "net_salary", "due_date", "date_added"]
+        ),
+    )
+
+class PayrollDeductionConfig(Base):
+    # per-company tax brackets and insurance rate used by deductions.py
+    __tablename__ = "payroll_deduction_config"
+
+    company_domain = Column(String(100), ForeignKey("company_info.company_domain"), primary_key=True)
+    tax_brackets = Column(Text, nullable=False)  # JSON: [{"up_to": 2000, "rate": 0}, ..., {"up_to": null, "rate": 0.25}]
+    insurance_rate = Column(Numeric(7, 6), nullable=False)
+    insurance_cap = Column(MONEY)  # largest insurance deduction per salary row, NULL for none
+    tax_after_insurance = Column(BIT, nullable=False, default=True)  # tax is levied on gross minus insurance
+    date_updated = Column(DateTime, default=func.getdate())
@@ -0,0 +1,219 @@
+"""
+Payroll Cost Forecast
+
+WHY THIS FILE EXISTS:
+- Management wants next year's payroll cost per company and per employee,
+  projected from employees_salaries history
+- Fits every employee's gross trend in a few array operations instead of
+  a Python loop per employee
+
+HOW IT WORKS:
+- The history window is loaded in one query as columns (employee, period,
+  gross); periods are months counted from the company's latest period, so
+  the latest month is 0 and older months are negative
+- Per employee, a least-squares line gross = a + b * period comes from
+  np.bincount sums (n, sum x, sum y, sum x*x, sum x*y); employees with
+  fewer than MIN_TREND_POINTS months get a flat line at their mean
+- Employees whose last salary is more than ACTIVE_MONTHS before the
+  latest period are treated as gone and not projected
+- What-if: raise_percent multiplies every projection from raise_from
+  (1 = first projected month); headcount_change adds or removes that many
+  average employees for the whole horizon
+- Results are cached per (company, parameters, salary generation); the
+  generation comes from payroll_reports and moves on every salary write,
+  and entries expire after payroll_reports.REPORT_CACHE_TTL like the reports
+
+LIMITS:
+- A linear trend is a planning aid, not an actuarial model; projections
+  are floored at zero
+- The cache is per worker process and keeps the MAX_CACHED latest results
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import payroll_reports
+
+MIN_TREND_POINTS = 3
+ACTIVE_MONTHS = 2
+MAX_CACHED = 64
+
+
+def to_money(value: float) -> Decimal:
+    return payroll_reports.money(Decimal(repr(round(float(value), 2))))
+
+
+def load_history(db: Session, company_domain: str, history_months: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """(employee_ids, periods, gross, latest period) for the last history_months months"""
+    latest = db.execute(text("""
+        SELECT MAX(due_year * 12 + due_month - 1) FROM employees_salaries
+        WHERE company_domain = :company_domain
+    """), {'company_domain': company_domain}).scalar()
+    if latest is None:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float64), 0
+
+    first = latest - history_months + 1
+    rows = db.execute(text("""
+        SELECT employee_id, due_year * 12 + due_month - 1 AS period, gross_salary
+        FROM employees_salaries
+        WHERE company_domain = :company_domain
+        AND due_year >= :first_year
+        AND due_year * 12 + due_month - 1 >= :first
+        AND gross_salary IS NOT NULL
+    """), {
+        'company_domain': company_domain,
+        'first_year': first // 12,
+        'first': first
+    }).fetchall()
+
+    if not rows:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float64), latest
+
+    employee_ids, periods, gross = zip(*rows)
+    return (
+        np.array(employee_ids, dtype=np.int64),
+        np.array(periods, dtype=np.int64) - latest,
+        np.array(gross, dtype=np.float64),
+        latest
+    )
+
+
+def fit_trends(employee_ids: np.ndarray, periods: np.ndarray, gross: np.ndarray):
+    """(unique employee ids, intercept, slope, last period) per employee"""
+    employees, index = np.unique(employee_ids, return_inverse=True)
+    size = len(employees)
+    x = periods.astype(np.float64)
+
+    n = np.bincount(index, minlength=size).astype(np.float64)
+    sum_x = np.bincount(index, weights=x, minlength=size)
+    sum_y = np.bincount(index, weights=gross, minlength=size)
+    sum_xx = np.bincount(index, weights=x * x, minlength=size)
+    sum_xy = np.bincount(index, weights=x * gross, minlength=size)
+
+    denominator = n * sum_xx - sum_x * sum_x
+    fitted = (n >= MIN_TREND_POINTS) & (denominator > 0)
+    slope = np.zeros(size)
+    slope[fitted] = (n[fitted] * sum_xy[fitted] - sum_x[fitted] * sum_y[fitted]) / denominator[fitted]
+    intercept = (sum_y - slope * sum_x) / n
+
+    last = np.full(size, np.iinfo(np.int64).min)
+    np.maximum.at(last, index, periods)
+    return employees, intercept, slope, last
+
+
+def project(db: Session, company_domain: str, months: int, history_months: int,
+            raise_percent: float, raise_from: int, headcount_change: int,
+            include_employees: bool) -> dict:
+    employee_ids, periods, gross, latest = load_history(db, company_domain, history_months)
+    if not len(employee_ids):
+        return {
+            "base_year": None, "base_month": None, "employees": 0, "months": [],
+            "total_gross": to_money(0), "employee_forecasts": [] if include_employees else None
+        }
+
+    employees, intercept, slope, last = fit_trends(employee_ids, periods, gross)
+
+    active = last >= -ACTIVE_MONTHS
+    employees, intercept, slope = employees[active], intercept[active], slope[active]
+
+    # (employee, month) grid of projected gross for months 1..months ahead
+    ahead = np.arange(1, months + 1, dtype=np.float64)
+    grid = np.maximum(intercept[:, None] + slope[:, None] * ahead[None, :], 0.0)
+
+    factor = np.where(ahead >= raise_from, 1 + raise_percent / 100, 1.0)
+    grid *= factor[None, :]
+
+    headcount = len(employees)
+    per_month = grid.sum(axis=0)
+    average = per_month / headcount if headcount else np.zeros(months)
+    extra = max(headcount_change, -headcount)
+    per_month = per_month + average * extra
+
+    result = {
+        "base_year": latest // 12,
+        "base_month": latest % 12 + 1,
+        "employees": headcount + extra,
+        "months": [
+            {
+                "due_year": (latest + step) // 12,
+                "due_month": (latest + step) % 12 + 1,
+                "gross_salary": to_money(per_month[step - 1])
+            }
+            for step in range(1, months + 1)
+        ],
+        "total_gross": to_money(per_month.sum()),
+        "employee_forecasts": None
+    }
+
+    if include_employees:
+        totals = grid.sum(axis=1)
+        result["employee_forecasts"] = [
+            {
+                "employee_id": int(employee_id),
+                "monthly_trend": to_money(trend),
+                "next_month": to_money(next_month),
+                "total_gross": to_money(total)
+            }
+            for employee_id, trend, next_month, total in zip(
+                employees.tolist(), slope.tolist(), grid[:, 0].tolist(), totals.tolist()
+            )
+        ]
+
+    return result
+
+
+class ForecastCache:
+
+    def __init__(self, max_entries: int = MAX_CACHED, ttl: float = payroll_reports.REPORT_CACHE_TTL):
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (result, expires_at)
+        self.entries: "OrderedDict[tuple, Tuple[dict, float]]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[dict]:
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is None:
+                return None
+            # other workers' salary writes don't move this worker's generation
+            if cached[1] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return cached[0]
+
+    def put(self, key: tuple, value: dict) -> None:
+        with self.lock:
+            self.entries[key] = (value, payroll_reports.expires_at(self.ttl))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+cache = ForecastCache()
+
+
+def forecast(db: Session, company_domain: str, months: int = 12, history_months: int = 36,
+             raise_percent: float = 0.0, raise_from: int = 1, headcount_change: int = 0,
+             include_employees: bool = False) -> Dict[str, object]:
+    """Projected gross payroll for the next months, cached until a salary changes"""
+    key = (company_domain, months, history_months, raise_percent, raise_from, headcount_change,
+           include_employees, payroll_reports.generation(company_domain))
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = project(db, company_domain, months, history_months, raise_percent, raise_from,
+                     headcount_change, include_employees)
+    # a write during the computation moved the generation; don't keep a stale result
+    if payroll_reports.generation(company_domain) == key[-1]:
+        cache.put(key, result)
+    return result
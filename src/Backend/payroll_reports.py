@@ -0,0 +1,230 @@
+"""
+Payroll Aggregation Reports
+
+WHY THIS FILE EXISTS:
+- HR had no totals; summing gross/insurance/taxes/net per month or per
+  employee meant downloading every salary row
+- Runs the aggregation in SQL and caches the results, so closed months are
+  served without touching employees_salaries again
+
+HOW IT WORKS:
+- Results are cached per (company_domain, year, month):
+    "month" -> that month's totals
+    "ytd"   -> per-employee totals from January through that month
+- Yearly totals are summed from the cached months
+- A salary write for (company, year, month) drops that month's totals and
+  the year-to-date entries of that month and every later month of the year
+- Each company has a generation counter bumped by every invalidation; a
+  result computed under an older generation is not stored, so a report
+  racing a write can't cache stale totals
+- Entries expire after REPORT_CACHE_TTL seconds, which bounds how long a
+  write handled by another worker process goes unseen
+
+SETTINGS:
+- REPORT_CACHE_TTL (60 seconds; 0 = keep until invalidated, only safe with
+  a single worker process)
+
+LIMITS:
+- The cache is per worker process; invalidation only reaches the worker
+  that handled the write, other workers catch up when their entries expire
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+# MONEY has four decimal places
+MONEY_PLACES = Decimal("0.0001")
+AMOUNT_FIELDS = ("gross_salary", "insurance", "taxes", "net_salary")
+
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "60"))
+
+
+def expires_at(ttl: float = REPORT_CACHE_TTL) -> float:
+    """monotonic() deadline for an entry cached now; inf when expiry is off"""
+    return time.monotonic() + ttl if ttl > 0 else float("inf")
+
+
+def money(value) -> Decimal:
+    """Exact Decimal for a MONEY sum (drivers may hand back Decimal, int or float)"""
+    if value is None:
+        return Decimal("0").quantize(MONEY_PLACES)
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(MONEY_PLACES)
+
+
+def totals_from_row(row) -> dict:
+    return {
+        "records": row.records or 0,
+        **{field: money(getattr(row, field)) for field in AMOUNT_FIELDS}
+    }
+
+
+def add_totals(totals: Iterable[dict]) -> dict:
+    result = {"records": 0, **{field: money(0) for field in AMOUNT_FIELDS}}
+    for entry in totals:
+        result["records"] += entry["records"]
+        for field in AMOUNT_FIELDS:
+            result[field] += entry[field]
+    return result
+
+
+class ReportCache:
+
+    def __init__(self, ttl: float = REPORT_CACHE_TTL):
+        self.lock = threading.Lock()
+        self.ttl = ttl
+        # kind -> (value, expires_at)
+        self.entries: Dict[Tuple[str, int, int], Dict[str, Tuple[object, float]]] = defaultdict(dict)
+        self.generations: Dict[str, int] = defaultdict(int)
+
+    def generation(self, company_domain: str) -> int:
+        with self.lock:
+            return self.generations[company_domain]
+
+    def get(self, company_domain: str, year: int, month: int, kind: str):
+        with self.lock:
+            entry = self.entries.get((company_domain, year, month))
+            cached = entry.get(kind) if entry else None
+            if cached is None:
+                return None
+            if cached[1] <= time.monotonic():
+                del entry[kind]
+                return None
+            return cached[0]
+
+    def put(self, company_domain: str, year: int, month: int, kind: str, value, generation: int) -> None:
+        with self.lock:
+            if self.generations[company_domain] == generation:
+                self.entries[(company_domain, year, month)][kind] = (value, expires_at(self.ttl))
+
+    def invalidate(self, company_domain: str, year: int, month: int) -> None:
+        with self.lock:
+            self.generations[company_domain] += 1
+            self.entries.get((company_domain, year, month), {}).pop("month", None)
+            for later in range(month, 13):
+                self.entries.get((company_domain, year, later), {}).pop("ytd", None)
+
+    def invalidate_company(self, company_domain: Optional[str] = None) -> None:
+        with self.lock:
+            if company_domain is None:
+                for domain in self.generations:
+                    self.generations[domain] += 1
+                self.entries.clear()
+                return
+            self.generations[company_domain] += 1
+            for key in [key for key in self.entries if key[0] == company_domain]:
+                del self.entries[key]
+
+
+cache = ReportCache()
+
+
+def salary_changed(company_domain: str, year: int, month: int) -> None:
+    """Call after committing any insert, update or delete of a salary row"""
+    cache.invalidate(company_domain, year, month)
+
+
+def salaries_changed(company_domain: str, periods: Iterable[Tuple[int, int]] = None) -> None:
+    """Several periods at once; None means anything in the company may have changed"""
+    if periods is None:
+        cache.invalidate_company(company_domain)
+        return
+    for year, month in set(periods):
+        cache.invalidate(company_domain, year, month)
+
+
+def generation(company_domain: str) -> int:
+    """Bumped on every salary change; usable as a cache key by other reports"""
+    return cache.generation(company_domain)
+
+
+def monthly_totals(db: Session, company_domain: str, year: int) -> Dict[int, dict]:
+    """Totals for each month of a year; one GROUP BY for the months not cached"""
+    seen_generation = cache.generation(company_domain)
+    months = {}
+    missing = []
+    for month in range(1, 13):
+        cached = cache.get(company_domain, year, month, "month")
+        if cached is None:
+            missing.append(month)
+        else:
+            months[month] = cached
+
+    if missing:
+        rows = db.execute(text("""
+            SELECT due_month,
+                   COUNT(*) AS records,
+                   SUM(gross_salary) AS gross_salary,
+                   SUM(insurance) AS insurance,
+                   SUM(taxes) AS taxes,
+                   SUM(net_salary) AS net_salary
+            FROM employees_salaries
+            WHERE company_domain = :company_domain
+            AND due_year = :due_year
+            AND due_month IN :months
+            GROUP BY due_month
+        """).bindparams(bindparam('months', expanding=True)), {
+            'company_domain': company_domain,
+            'due_year': year,
+            'months': missing
+        }).fetchall()
+
+        found = {row.due_month: totals_from_row(row) for row in rows}
+        for month in missing:
+            # empty months are cached too, as zero totals
+            months[month] = found.get(month) or add_totals(())
+            cache.put(company_domain, year, month, "month", months[month], seen_generation)
+
+    return months
+
+
+def year_to_date(db: Session, company_domain: str, year: int, month: int) -> List[dict]:
+    """Per-employee totals from January through month"""
+    cached = cache.get(company_domain, year, month, "ytd")
+    if cached is not None:
+        return cached
+
+    seen_generation = cache.generation(company_domain)
+    rows = db.execute(text("""
+        SELECT s.employee_id,
+               e.contact_name,
+               COUNT(*) AS months,
+               MAX(s.due_month) AS last_month,
+               SUM(s.gross_salary) AS gross_salary,
+               SUM(s.insurance) AS insurance,
+               SUM(s.taxes) AS taxes,
+               SUM(s.net_salary) AS net_salary
+        FROM employees_salaries s
+        JOIN employees_info e ON e.company_domain = s.company_domain
+            AND e.employee_id = s.employee_id
+        WHERE s.company_domain = :company_domain
+        AND s.due_year = :due_year
+        AND s.due_month <= :due_month
+        GROUP BY s.employee_id, e.contact_name
+        ORDER BY s.employee_id
+    """), {
+        'company_domain': company_domain,
+        'due_year': year,
+        'due_month': month
+    }).fetchall()
+
+    result = [
+        {
+            "employee_id": row.employee_id,
+            "contact_name": row.contact_name,
+            "months": row.months,
+            "last_month": row.last_month,
+            **{field: money(getattr(row, field)) for field in AMOUNT_FIELDS}
+        }
+        for row in rows
+    ]
+    cache.put(company_domain, year, month, "ytd", result, seen_generation)
+    return result
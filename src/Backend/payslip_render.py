@@ -0,0 +1,68 @@
+"""
+Payslip Rendering (process-pool side)
+
+Runs inside the payslip worker processes, so it only imports the standard
+library - a spawned worker starts without loading FastAPI, SQLAlchemy or
+the database engine. Everything it gets is plain dicts of strings.
+"""
+
+import html
+import re
+from typing import List, Tuple
+
+TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Payslip {period} - {name}</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 40px; color: #1f2937; }}
+h1 {{ font-size: 20px; margin-bottom: 4px; }}
+.muted {{ color: #6b7280; font-size: 13px; }}
+table {{ border-collapse: collapse; margin-top: 24px; min-width: 420px; }}
+td {{ padding: 8px 12px; border-bottom: 1px solid #e5e7eb; }}
+td.amount {{ text-align: right; font-variant-numeric: tabular-nums; }}
+tr.total td {{ font-weight: bold; border-top: 2px solid #1f2937; }}
+</style>
+</head>
+<body>
+<h1>{company}</h1>
+<div class="muted">Payslip for {period}</div>
+<p><strong>{name}</strong><br><span class="muted">Employee #{employee_id}{email}</span></p>
+<table>
+<tr><td>Gross salary</td><td class="amount">{gross_salary}</td></tr>
+<tr><td>Insurance</td><td class="amount">-{insurance}</td></tr>
+<tr><td>Taxes</td><td class="amount">-{taxes}</td></tr>
+<tr class="total"><td>Net salary</td><td class="amount">{net_salary}</td></tr>
+</table>
+<p class="muted">{due_date}</p>
+</body>
+</html>
+"""
+
+UNSAFE = re.compile(r"[^A-Za-z0-9]+")
+
+
+def filename(row: dict) -> str:
+    name = UNSAFE.sub("-", row["contact_name"]).strip("-")[:40] or "employee"
+    return f"{row['employee_id']}-{name}-{row['due_year']}-{row['due_month']:02d}.html"
+
+
+def render(row: dict) -> str:
+    return TEMPLATE.format(
+        company=html.escape(row["company_name"]),
+        period=html.escape(row["period"]),
+        name=html.escape(row["contact_name"]),
+        employee_id=row["employee_id"],
+        email=f" &middot; {html.escape(row['business_email'])}" if row["business_email"] else "",
+        gross_salary=row["gross_salary"],
+        insurance=row["insurance"],
+        taxes=row["taxes"],
+        net_salary=row["net_salary"],
+        due_date=f"Paid on {html.escape(row['due_date'])}" if row["due_date"] else ""
+    )
+
+
+def render_chunk(rows: List[dict]) -> List[Tuple[str, bytes]]:
+    """(file name, HTML) for each salary row"""
+    return [(filename(row), render(row).encode("utf-8")) for row in rows]
@@ -0,0 +1,279 @@
+"""
+Payslip Generation
+
+WHY THIS FILE EXISTS:
+- There was no payslip output; HR screenshotted the salaries table
+- Renders one HTML payslip per salary row of a month, spread across a
+  process pool so a 5k-employee month uses every core
+
+HOW IT WORKS:
+- The month is loaded in one query (employees_salaries joined with
+  employees_info and company_info) and turned into plain dicts
+- Rows are cut into chunks of CHUNK_SIZE and rendered by
+  payslip_render.render_chunk in PAYSLIP_WORKERS processes (default: all
+  cores); chunks are collected as they finish
+- The workers are spawned, not forked: the API worker runs threads
+  (reminders, log listener, health prober, sampler) and holds pooled
+  database connections, and a fork would copy their locks and sockets.
+  A spawned worker only imports payslip_render
+- Output is either:
+    stream    -> a zip written straight into the HTTP response as chunks
+                 finish (zipfile on a write-only stream)
+    zip       -> a zip file under PAYSLIP_OUTPUT_DIR, downloadable later
+    directory -> one file per payslip under PAYSLIP_OUTPUT_DIR
+- Every run is a PayslipJob with done/total counters that
+  GET /api/hr/payslips/jobs/{job_id} reports while it runs
+
+LIMITS:
+- HTML only; there is no PDF renderer in the dependencies, and the pages
+  print cleanly from a browser
+- Jobs live in memory (the last MAX_JOBS); files under PAYSLIP_OUTPUT_DIR
+  stay until removed
+- A spawned worker re-imports the parent's __main__: under
+  `uvicorn main:app` that is uvicorn's entry point, under `python main.py`
+  it is main.py (the app is built there but never served)
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import payroll_reports
+import payslip_render
+
+logger = logging.getLogger(__name__)
+
+PAYSLIP_OUTPUT_DIR = os.getenv("PAYSLIP_OUTPUT_DIR", "payslips")
+PAYSLIP_WORKERS = int(os.getenv("PAYSLIP_WORKERS", "0")) or os.cpu_count() or 1
+CHUNK_SIZE = 100
+MAX_JOBS = 50
+
+MONTH_NAMES = ["", "January", "February", "March", "April", "May", "June",
+               "July", "August", "September", "October", "November", "December"]
+
+
+def amount(value) -> str:
+    return f"{payroll_reports.money(value):,.2f}"
+
+
+def load_month(db: Session, company_domain: str, year: int, month: int) -> List[dict]:
+    rows = db.execute(text("""
+        SELECT s.employee_id, e.contact_name, e.business_email, c.name AS company_name,
+               s.gross_salary, s.insurance, s.taxes, s.net_salary, s.due_date
+        FROM employees_salaries s
+        JOIN employees_info e ON e.company_domain = s.company_domain
+            AND e.employee_id = s.employee_id
+        JOIN company_info c ON c.company_domain = s.company_domain
+        WHERE s.company_domain = :company_domain
+        AND s.due_year = :due_year
+        AND s.due_month = :due_month
+        ORDER BY s.employee_id
+    """), {
+        'company_domain': company_domain,
+        'due_year': year,
+        'due_month': month
+    }).fetchall()
+
+    # plain strings only: these are pickled to the worker processes
+    return [
+        {
+            "employee_id": row.employee_id,
+            "contact_name": row.contact_name,
+            "business_email": row.business_email,
+            "company_name": row.company_name,
+            "due_year": year,
+            "due_month": month,
+            "period": f"{MONTH_NAMES[month]} {year}",
+            "gross_salary": amount(row.gross_salary),
+            "insurance": amount(row.insurance),
+            "taxes": amount(row.taxes),
+            "net_salary": amount(row.net_salary),
+            "due_date": str(row.due_date) if row.due_date else None
+        }
+        for row in rows
+    ]
+
+
+class PayslipJob:
+
+    def __init__(self, company_domain: str, year: int, month: int, output: str, total: int):
+        self.job_id = uuid.uuid4().hex
+        self.company_domain = company_domain
+        self.year = year
+        self.month = month
+        self.output = output
+        self.total = total
+        self.done = 0
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.path: Optional[str] = None
+        self.started_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "due_year": self.year,
+            "due_month": self.month,
+            "output": self.output,
+            "status": self.status,
+            "total": self.total,
+            "done": self.done,
+            "error": self.error,
+            "path": self.path if self.output == "directory" else None,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobRegistry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs: "OrderedDict[str, PayslipJob]" = OrderedDict()
+
+    def add(self, job: PayslipJob) -> None:
+        with self.lock:
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > MAX_JOBS:
+                self.jobs.popitem(last=False)
+
+    def get(self, company_domain: str, job_id: str) -> Optional[PayslipJob]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job if job and job.company_domain == company_domain else None
+
+    def progress(self, job: PayslipJob, count: int) -> None:
+        with self.lock:
+            job.done += count
+
+    def finish(self, job: PayslipJob, error: Optional[str] = None) -> None:
+        with self.lock:
+            job.status = "failed" if error else "done"
+            job.error = error
+            job.finished_at = datetime.now()
+
+
+jobs = JobRegistry()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PAYSLIP_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def rendered(job: PayslipJob, rows: List[dict]) -> Iterator[List[Tuple[str, bytes]]]:
+    """Rendered chunks in completion order, counting progress on the job"""
+    futures = [
+        pool().submit(payslip_render.render_chunk, rows[start:start + CHUNK_SIZE])
+        for start in range(0, len(rows), CHUNK_SIZE)
+    ]
+    try:
+        for future in as_completed(futures):
+            files = future.result()
+            jobs.progress(job, len(files))
+            yield files
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def output_dir(job: PayslipJob) -> str:
+    return os.path.join(PAYSLIP_OUTPUT_DIR, job.company_domain, f"{job.year}-{job.month:02d}")
+
+
+class StreamBuffer(io.RawIOBase):
+    """Write-only sink for zipfile; the response drains it after every chunk"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(job: PayslipJob, rows: List[dict]) -> Iterator[bytes]:
+    """Zip bytes for a StreamingResponse, produced while the pool renders"""
+    buffer = StreamBuffer()
+    try:
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for files in rendered(job, rows):
+                for name, content in files:
+                    archive.writestr(name, content)
+                yield buffer.drain()
+        yield buffer.drain()
+        jobs.finish(job)
+    except Exception as e:
+        jobs.finish(job, str(e))
+        raise
+    except GeneratorExit:
+        jobs.finish(job, "Download cancelled")
+        raise
+
+
+def write_output(job: PayslipJob, rows: List[dict]) -> None:
+    """Background-thread body for the zip and directory outputs"""
+    try:
+        directory = output_dir(job)
+        os.makedirs(directory, exist_ok=True)
+
+        if job.output == "zip":
+            path = os.path.join(directory, f"payslips-{job.job_id}.zip")
+            with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                for files in rendered(job, rows):
+                    for name, content in files:
+                        archive.writestr(name, content)
+        else:
+            path = directory
+            for files in rendered(job, rows):
+                for name, content in files:
+                    with open(os.path.join(directory, name), "wb") as handle:
+                        handle.write(content)
+
+        job.path = path
+        jobs.finish(job)
+    except Exception as e:
+        logger.exception("Payslip job %s failed: %s", job.job_id, e)
+        jobs.finish(job, str(e))
+
+
+def start(company_domain: str, year: int, month: int, output: str, rows: List[dict]) -> PayslipJob:
+    job = PayslipJob(company_domain, year, month, output, len(rows))
+    jobs.add(job)
+    if output != "stream":
+        threading.Thread(target=write_output, args=(job, rows), name=f"payslips-{job.job_id}", daemon=True).start()
+    return job
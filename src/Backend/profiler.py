@@ -0,0 +1,418 @@
+"""
+On-Demand Request Profiler
+
+WHY THIS FILE EXISTS:
+- When one call (say /api/hr/salaries for one tenant) is slow there was no
+  way to see where the time goes
+- A company admin can profile a single request on demand, and a rolling
+  background sampler can aggregate hot stacks across every request
+
+HOW IT WORKS:
+- The api routers use ProfiledRoute. A request asks for a profile with
+  the X-Profile header or the _profile query parameter, set to:
+    cprofile -> deterministic cProfile of the endpoint body: per-function
+                calls, own and cumulative time, and top callers
+    sample   -> a sampler thread reads the endpoint thread's stack every
+                PROFILE_SAMPLE_INTERVAL_MS; stacks are kept collapsed
+                ("a;b;c count"), ready for flamegraph.pl or speedscope
+- Only operators (Basic auth plus the X-Ops-Token operator credential,
+  auth.get_operator_user) may profile; anyone else gets 403. The profile
+  is stored under the caller's company in a ring buffer of the last
+  PROFILES_KEPT, and its id comes back in the X-Profile-Id header; the
+  admin API (api/admin.py) lists and returns them, per company
+- The endpoint runs in the threadpool, and both profilers must run in that
+  thread: ProfiledRoute wraps the endpoint, and the wrapper profiles only
+  when the request's contextvar says so (contextvars follow the request
+  into the threadpool)
+- RollingSampler samples every thread's stack every SAMPLER_INTERVAL_MS
+  and counts collapsed stacks, skipping threads that are just waiting
+
+OVERHEAD:
+- Not requested: one header lookup per request and one contextvar read
+  per endpoint call
+- The rolling sampler is a thread that only exists while it is switched
+  on; at the default 10 ms interval it costs well under 1% of one core
+
+LIMITS:
+- Dependencies (get_current_user, get_db) and response serialisation run
+  outside the endpoint body and are not in the profile; the total request
+  time is recorded next to it
+- Profiles and the sampler are per worker process and in memory only
+- PROFILING_ENABLED=false turns all of it off
+"""
+
+import base64
+import cProfile
+import functools
+import inspect
+import os
+import pstats
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "true").lower() == "true"
+PROFILES_KEPT = int(os.getenv("PROFILES_KEPT", "50"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+SAMPLER_INTERVAL_MS = float(os.getenv("SAMPLER_INTERVAL_MS", "10"))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAM = "_profile"
+MODES = ("cprofile", "sample")
+
+TOP_FUNCTIONS = 60
+TOP_CALLERS = 5
+# distinct stacks kept by the rolling sampler; the rest are counted as "[other]"
+MAX_STACKS = 5000
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+# leaf frames of threads that are parked, not working
+IDLE_FRAMES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"), ("queue.py", "get"), ("thread.py", "_worker"),
+}
+
+
+def frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(BACKEND_DIR) and "site-packages" not in filename:
+        filename = filename[len(BACKEND_DIR):]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse(frame, stop_code=None) -> str:
+    """Root-first "a;b;c" for a stack, cut below stop_code when given"""
+    labels = []
+    while frame is not None and frame.f_code is not stop_code:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+def is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class ThreadSampler:
+    """Samples one thread's stack until stopped"""
+
+    def __init__(self, thread_id: int, interval: float, stop_code=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stop_code = stop_code
+        self.stacks: Counter = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profile-sampler", daemon=True)
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame, self.stop_code)] += 1
+
+    def __enter__(self) -> "ThreadSampler":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+
+def function_stats(profiler: cProfile.Profile) -> List[dict]:
+    stats = pstats.Stats(profiler).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    result = []
+    for (filename, line, name), (primitive, calls, own, cumulative, callers) in ranked:
+        top_callers = sorted(callers.items(), key=lambda item: item[1][3], reverse=True)[:TOP_CALLERS]
+        result.append({
+            "function": name,
+            "file": filename[len(BACKEND_DIR):] if filename.startswith(BACKEND_DIR) else filename,
+            "line": line,
+            "calls": calls,
+            "primitive_calls": primitive,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+            "callers": [f"{caller[2]} ({os.path.basename(caller[0])}:{caller[1]})" for caller, _ in top_callers]
+        })
+    return result
+
+
+class Profile:
+
+    def __init__(self, mode: str, company_domain: str, user_id: int, method: str, path: str):
+        self.profile_id = secrets.token_hex(8)
+        self.mode = mode
+        self.company_domain = company_domain
+        self.user_id = user_id
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.created_at = datetime.now()
+        self.total_ms = 0.0
+        self.endpoint_ms = 0.0
+        self.functions: List[dict] = []
+        self.stacks: Counter = Counter()
+
+    def collect(self, call: Callable, args, kwargs):
+        """Run the endpoint in this thread under the requested profiler"""
+        started = time.perf_counter()
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(call, *args, **kwargs)
+            finally:
+                self.endpoint_ms = round((time.perf_counter() - started) * 1000, 3)
+                self.functions = function_stats(profiler)
+
+        sampler = ThreadSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000, Profile.collect.__code__)
+        try:
+            with sampler:
+                return call(*args, **kwargs)
+        finally:
+            self.endpoint_ms = round((time.perf_counter() - started) * 1000, 3)
+            self.stacks = sampler.stacks
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "profile_id": self.profile_id,
+            "mode": self.mode,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status_code": self.status_code,
+            "user_id": self.user_id,
+            "created_at": self.created_at,
+            "total_ms": self.total_ms,
+            "endpoint_ms": self.endpoint_ms,
+        }
+
+    def detail(self) -> dict:
+        result = self.summary()
+        result["functions"] = self.functions
+        result["stacks"] = [{"stack": stack, "samples": count} for stack, count in self.stacks.most_common()]
+        return result
+
+
+class ProfileStore:
+
+    def __init__(self, size: int = PROFILES_KEPT):
+        self.lock = threading.Lock()
+        self.profiles: "deque[Profile]" = deque(maxlen=size)
+
+    def add(self, profile: Profile) -> None:
+        with self.lock:
+            self.profiles.append(profile)
+
+    def list(self, company_domain: str) -> List[Profile]:
+        with self.lock:
+            return [p for p in reversed(self.profiles) if p.company_domain == company_domain]
+
+    def get(self, company_domain: str, profile_id: str) -> Optional[Profile]:
+        with self.lock:
+            for profile in self.profiles:
+                if profile.profile_id == profile_id and profile.company_domain == company_domain:
+                    return profile
+        return None
+
+
+store = ProfileStore()
+
+active: ContextVar[Optional[Profile]] = ContextVar("active_profile", default=None)
+
+
+def profiled(endpoint: Callable) -> Callable:
+    """The endpoint, profiled in its own thread when the request asked for it"""
+    if getattr(endpoint, "profiled", False):
+        # include_router builds the route again from the already wrapped endpoint
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = active.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        return profile.collect(endpoint, args, kwargs)
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def requested_mode(request: Request) -> Optional[str]:
+    mode = request.headers.get(PROFILE_HEADER) or request.query_params.get(PROFILE_PARAM)
+    if not mode:
+        return None
+    mode = mode.lower()
+    if mode in ("1", "true"):
+        return "cprofile"
+    if mode not in MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{PROFILE_HEADER} must be one of: {', '.join(MODES)}"
+        )
+    return mode
+
+
+def profiling_operator(headers) -> Optional[Tuple[int, str]]:
+    """(user id, company) of the Basic-auth user if they hold the operator token, else None"""
+    from auth import OPS_TOKEN_HEADER, is_operator, verify_credentials
+    from database import SessionLocal
+
+    if not is_operator(headers.get(OPS_TOKEN_HEADER)):
+        return None
+    authorization = headers.get("Authorization")
+    if not authorization or not authorization.lower().startswith("basic "):
+        return None
+    try:
+        username, _, password = base64.b64decode(authorization[6:]).decode("utf-8").partition(":")
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+    db = SessionLocal()
+    try:
+        user = verify_credentials(username, password, db)
+        if user is None:
+            return None
+        return user.id, user.company_domain
+    finally:
+        db.close()
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that can run a request under the profiler (see module docstring)"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if PROFILING_ENABLED and not inspect.iscoroutinefunction(endpoint):
+            endpoint = profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not PROFILING_ENABLED:
+            return handler
+
+        async def route_handler(request: Request):
+            mode = requested_mode(request)
+            if mode is None:
+                return await handler(request)
+
+            operator = await run_in_threadpool(profiling_operator, request.headers)
+            if operator is None:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Profiling requests is limited to operators (X-Ops-Token)"
+                )
+
+            profile = Profile(mode, operator[1], operator[0], request.method, request.url.path)
+            profile.route = self.path_format
+            token = active.set(profile)
+            started = time.perf_counter()
+            try:
+                response = await handler(request)
+                profile.status_code = response.status_code
+            except HTTPException as e:
+                profile.status_code = e.status_code
+                raise
+            finally:
+                active.reset(token)
+                profile.total_ms = round((time.perf_counter() - started) * 1000, 3)
+                store.add(profile)
+
+            response.headers["X-Profile-Id"] = profile.profile_id
+            return response
+
+        return route_handler
+
+
+class RollingSampler:
+    """Process-wide sampler of every thread's stack, aggregated as collapsed stacks"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+        self.interval_ms = SAMPLER_INTERVAL_MS
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, interval_ms: Optional[float] = None) -> None:
+        with self.lock:
+            if self.running:
+                return
+            if interval_ms:
+                self.interval_ms = interval_ms
+            self.stopped = threading.Event()
+            self.started_at = datetime.now()
+            self.thread = threading.Thread(target=self.run, args=(self.stopped,), name="rolling-sampler", daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        with self.lock:
+            thread, self.thread = self.thread, None
+            self.stopped.set()
+        if thread is not None:
+            thread.join()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.stacks = Counter()
+            self.samples = 0
+
+    def run(self, stopped: threading.Event) -> None:
+        own = threading.get_ident()
+        while not stopped.wait(self.interval_ms / 1000):
+            busy = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own and not is_idle(frame):
+                    busy.append(collapse(frame))
+            with self.lock:
+                self.samples += 1
+                for stack in busy:
+                    if stack in self.stacks or len(self.stacks) < MAX_STACKS:
+                        self.stacks[stack] += 1
+                    else:
+                        self.stacks["[other]"] += 1
+
+    def status(self) -> dict:
+        with self.lock:
+            return {
+                "running": self.running,
+                "interval_ms": self.interval_ms,
+                "samples": self.samples,
+                "distinct_stacks": len(self.stacks),
+                "started_at": self.started_at,
+            }
+
+    def collapsed(self, limit: Optional[int] = None) -> str:
+        with self.lock:
+            top = self.stacks.most_common(limit)
+        return "".join(f"{stack} {count}\n" for stack, count in top)
+
+
+sampler = RollingSampler()
+
+
+def shutdown() -> None:
+    sampler.stop()
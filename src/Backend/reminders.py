@@ -0,0 +1,246 @@
+"""
+Due-Action Reminders
+
+WHY THIS FILE EXISTS:
+- Nothing reacted to call_date / meeting_date, so reminders would have
+  needed the table to be polled over and over
+- Fires a reminder event a few minutes before each upcoming call/meeting
+
+HOW IT WORKS:
+- An in-process min-heap ordered by fire time, served by one thread
+- Hydrated with one range query per table for the next REMINDER_HORIZON_HOURS,
+  re-run once per horizon - DB load doesn't depend on how many reminders
+  are pending
+- The call/meeting write paths in api/leads.py schedule and cancel entries
+- Cancelled or rescheduled entries are skipped lazily when popped
+
+SINKS (REMINDER_SINKS, comma separated):
+- log      -> logging
+- inbox    -> per-user in-app inbox, read via GET /api/real-estate/reminders
+- webhook  -> JSON POST to REMINDER_WEBHOOK_URL
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import urllib.request
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REMINDER_LEAD_MINUTES = int(os.getenv("REMINDER_LEAD_MINUTES", "15"))
+REMINDER_HORIZON_HOURS = int(os.getenv("REMINDER_HORIZON_HOURS", "24"))
+INBOX_SIZE = 100
+
+
+class LogSink:
+    def send(self, event: dict) -> None:
+        logger.info("Reminder: %s %s for lead %s at %s (user %s)",
+                    event["type"], event["action_id"], event["lead_id"], event["action_at"], event["user_id"])
+
+
+class InboxSink:
+    """Last INBOX_SIZE reminders per user, kept in memory"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inboxes: Dict[int, deque] = defaultdict(lambda: deque(maxlen=INBOX_SIZE))
+
+    def send(self, event: dict) -> None:
+        with self.lock:
+            self.inboxes[event["user_id"]].append(event)
+
+    def read(self, user_id: int, clear: bool = False) -> List[dict]:
+        with self.lock:
+            events = list(self.inboxes.get(user_id, ()))
+            if clear:
+                self.inboxes.pop(user_id, None)
+            return events
+
+
+class WebhookSink:
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, event: dict) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(event).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class ReminderScheduler:
+
+    def __init__(self, sinks: list, session_factory: Optional[Callable] = None,
+                 lead_time: timedelta = timedelta(minutes=REMINDER_LEAD_MINUTES),
+                 horizon: timedelta = timedelta(hours=REMINDER_HORIZON_HOURS)):
+        self.sinks = sinks
+        self.session_factory = session_factory
+        self.lead_time = lead_time
+        self.horizon = horizon
+
+        self.heap: List[Tuple[datetime, int, dict]] = []
+        self.live: Dict[Tuple[str, int], int] = {}  # (type, id) -> seq of its current heap entry
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.window_end = datetime.min
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+    # write-path API
+
+    def schedule(self, action_type: str, action_id: int, action_at: Optional[datetime],
+                 company_domain: str, user_id: int, lead_id: int) -> None:
+        """Schedule (or reschedule) the reminder for one call/meeting"""
+        if action_at is None:
+            return self.cancel(action_type, action_id)
+
+        action_at = action_at.replace(tzinfo=None)
+        fire_at = action_at - self.lead_time
+        key = (action_type, action_id)
+
+        with self.condition:
+            # outside the loaded window: the next hydration picks it up
+            if action_at < datetime.now() or fire_at > self.window_end:
+                self.live.pop(key, None)
+                return
+
+            seq = next(self.counter)
+            self.live[key] = seq
+            heapq.heappush(self.heap, (fire_at, seq, {
+                "type": action_type,
+                "action_id": action_id,
+                "lead_id": lead_id,
+                "user_id": user_id,
+                "company_domain": company_domain,
+                "action_at": action_at.isoformat(),
+                "fire_at": fire_at.isoformat()
+            }))
+            self.condition.notify()
+
+    def cancel(self, action_type: str, action_id: int) -> None:
+        with self.condition:
+            self.live.pop((action_type, action_id), None)
+
+    @property
+    def pending(self) -> int:
+        return len(self.live)
+
+    # background thread
+
+    def hydrate(self) -> None:
+        """Load every call/meeting due inside the next horizon with one range query per table"""
+        from models import ClientCall, ClientMeeting
+
+        now = datetime.now()
+        window_start, window_end = now, now + self.horizon + self.lead_time
+
+        db = self.session_factory()
+        try:
+            calls = db.query(
+                ClientCall.call_id, ClientCall.call_date, ClientCall.company_domain,
+                ClientCall.assigned_to, ClientCall.lead_id
+            ).filter(ClientCall.call_date >= window_start, ClientCall.call_date < window_end).all()
+            meetings = db.query(
+                ClientMeeting.meeting_id, ClientMeeting.meeting_date, ClientMeeting.company_domain,
+                ClientMeeting.assigned_to, ClientMeeting.lead_id
+            ).filter(ClientMeeting.meeting_date >= window_start, ClientMeeting.meeting_date < window_end).all()
+        finally:
+            db.close()
+
+        with self.condition:
+            self.window_end = now + self.horizon
+            for row in calls:
+                if ("call", row.call_id) not in self.live:
+                    self.schedule("call", row.call_id, row.call_date, row.company_domain, row.assigned_to, row.lead_id)
+            for row in meetings:
+                if ("meeting", row.meeting_id) not in self.live:
+                    self.schedule("meeting", row.meeting_id, row.meeting_date, row.company_domain, row.assigned_to, row.lead_id)
+
+    def _next_due(self) -> List[dict]:
+        """Block until something is due (or the window needs reloading)"""
+        with self.condition:
+            while self.running:
+                now = datetime.now()
+                if now >= self.window_end:
+                    return []
+
+                due = []
+                while self.heap and self.heap[0][0] <= now:
+                    _, seq, event = heapq.heappop(self.heap)
+                    key = (event["type"], event["action_id"])
+                    if self.live.get(key) == seq:
+                        del self.live[key]
+                        due.append(event)
+                if due:
+                    return due
+
+                wake_at = min(self.heap[0][0], self.window_end) if self.heap else self.window_end
+                self.condition.wait(timeout=max((wake_at - now).total_seconds(), 0.01))
+            return []
+
+    def _run(self) -> None:
+        while self.running:
+            if datetime.now() >= self.window_end:
+                try:
+                    self.hydrate()
+                except Exception as e:
+                    logger.error("Reminder hydration failed: %s", e)
+                    with self.condition:
+                        # retry in a minute rather than spinning
+                        self.window_end = datetime.now() + timedelta(minutes=1)
+                        self.condition.wait(timeout=60)
+                    continue
+
+            for event in self._next_due():
+                for sink in self.sinks:
+                    try:
+                        sink.send(event)
+                    except Exception as e:
+                        logger.error("Reminder sink %s failed: %s", type(sink).__name__, e)
+
+    def start(self) -> None:
+        if self.thread and self.thread.is_alive():
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+
+def _build_sinks() -> list:
+    sinks = []
+    for name in os.getenv("REMINDER_SINKS", "log,inbox").split(","):
+        name = name.strip().lower()
+        if name == "log":
+            sinks.append(LogSink())
+        elif name == "inbox":
+            sinks.append(inbox)
+        elif name == "webhook" and os.getenv("REMINDER_WEBHOOK_URL"):
+            sinks.append(WebhookSink(os.getenv("REMINDER_WEBHOOK_URL")))
+    return sinks
+
+
+def _session_factory():
+    from database import SessionLocal
+    return SessionLocal()
+
+
+inbox = InboxSink()
+scheduler = ReminderScheduler(_build_sinks(), session_factory=_session_factory)
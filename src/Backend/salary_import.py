@@ -0,0 +1,287 @@
+"""
+Bulk Salary Import
+
+WHY THIS FILE EXISTS:
+- Finance sends monthly payroll as spreadsheets, and the only way in was
+  one POST /employees/{id}/salaries per row
+- Streams a CSV or NDJSON upload and upserts it in fixed-size chunks
+
+HOW IT WORKS:
+- Rows are read lazily and validated against SalaryCreate; a bad row is
+  reported with its line number and never stops the import
+- Per chunk of CHUNK_SIZE rows there is a fixed number of round-trips:
+    1. resolve employee_id / business_email for the whole chunk
+    2. fetch which (employee, year, month) keys already exist
+    3. one executemany UPDATE for existing rows per set of columns given
+       (upsert mode only); a column the row leaves empty keeps its value
+    4. one executemany INSERT for new rows
+- Each chunk is its own transaction; if the database rejects one, the
+  error is logged and its rows are reported as failed (with the chunk's
+  line range) while the import carries on
+- Rows that only give gross_salary get insurance, taxes and net from the
+  company's deduction engine (deductions.py), one vectorised call per chunk
+- Memory is bounded by CHUNK_SIZE plus at most MAX_REPORTED_ERRORS errors
+
+FILE FORMAT:
+- Columns / keys: employee_id or business_email, due_year, due_month,
+  gross_salary, insurance, taxes, net_salary, due_date
+- Empty CSV cells are treated as missing values
+- A key appearing twice in a chunk keeps its last row
+"""
+
+import csv
+import io
+import json
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+import deductions
+import payroll_reports
+from schemas import SalaryCreate
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+SALARY_FIELDS = ("gross_salary", "insurance", "taxes", "net_salary", "due_date")
+
+
+class ImportResult:
+
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped_existing = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def error(self, line: int, message: str, employee_id: Optional[int] = None) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "employee_id": employee_id, "message": message})
+
+
+def read_csv(stream) -> Iterator[Tuple[int, dict]]:
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    for record in reader:
+        # the header is line 1
+        yield reader.line_num, {
+            (key or "").strip().lower(): (value.strip() or None) if isinstance(value, str) else value
+            for key, value in record.items()
+        }
+
+
+def read_ndjson(stream) -> Iterator[Tuple[int, Optional[dict]]]:
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding="utf-8-sig"), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None
+            continue
+        yield line_number, record if isinstance(record, dict) else None
+
+
+def chunks(records: Iterator, size: int) -> Iterator[list]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+def resolve_employees(db: Session, company_domain: str, ids: set, emails: set) -> Tuple[set, Dict[str, int]]:
+    """Known employee_ids and business_email -> employee_id, in one query"""
+    conditions = []
+    params = {'company_domain': company_domain}
+    binds = []
+    if ids:
+        conditions.append("employee_id IN :ids")
+        params['ids'] = sorted(ids)
+        binds.append(bindparam('ids', expanding=True))
+    if emails:
+        conditions.append("LOWER(business_email) IN :emails")
+        params['emails'] = sorted(emails)
+        binds.append(bindparam('emails', expanding=True))
+    if not conditions:
+        return set(), {}
+
+    rows = db.execute(text(f"""
+        SELECT employee_id, business_email FROM employees_info
+        WHERE company_domain = :company_domain AND ({' OR '.join(conditions)})
+    """).bindparams(*binds), params).fetchall()
+
+    return (
+        {row.employee_id for row in rows},
+        {row.business_email.lower(): row.employee_id for row in rows if row.business_email}
+    )
+
+
+def existing_keys(db: Session, company_domain: str, keys: List[Tuple[int, int, int]]) -> set:
+    """Which (employee_id, due_year, due_month) keys already have a salary row"""
+    rows = db.execute(text("""
+        SELECT employee_id, due_year, due_month FROM employees_salaries
+        WHERE company_domain = :company_domain
+        AND employee_id IN :ids
+        AND due_year IN :years
+        AND due_month IN :months
+    """).bindparams(
+        bindparam('ids', expanding=True), bindparam('years', expanding=True), bindparam('months', expanding=True)
+    ), {
+        'company_domain': company_domain,
+        'ids': sorted({key[0] for key in keys}),
+        'years': sorted({key[1] for key in keys}),
+        'months': sorted({key[2] for key in keys})
+    }).fetchall()
+
+    # the IN lists over-select across periods; keep exact matches only
+    wanted = set(keys)
+    return {(row.employee_id, row.due_year, row.due_month) for row in rows} & wanted
+
+
+def import_chunk(db: Session, company_domain: str, chunk: list, upsert: bool, result: ImportResult) -> None:
+    parsed = []
+    for line, record in chunk:
+        result.rows += 1
+        if record is None:
+            result.error(line, "Row is not a JSON object")
+            continue
+
+        raw_id = record.get("employee_id")
+        email = (record.get("business_email") or "").strip().lower() or None
+        try:
+            employee_id = int(raw_id) if raw_id not in (None, "") else None
+        except (TypeError, ValueError):
+            result.error(line, "employee_id must be an integer")
+            continue
+        if employee_id is None and email is None:
+            result.error(line, "employee_id or business_email is required")
+            continue
+
+        try:
+            salary = SalaryCreate(**{
+                key: record.get(key) for key in ("due_year", "due_month") + SALARY_FIELDS
+                if record.get(key) is not None
+            })
+        except ValidationError as e:
+            result.error(line, validation_message(e), employee_id)
+            continue
+
+        parsed.append((line, employee_id, email, salary))
+
+    if not parsed:
+        return
+
+    known_ids, by_email = resolve_employees(
+        db, company_domain,
+        {employee_id for _, employee_id, _, _ in parsed if employee_id is not None},
+        {email for _, employee_id, email, _ in parsed if employee_id is None}
+    )
+
+    rows: Dict[Tuple[int, int, int], Tuple[int, dict]] = {}
+    for line, employee_id, email, salary in parsed:
+        if employee_id is None:
+            employee_id = by_email.get(email)
+        if employee_id is None or employee_id not in known_ids:
+            result.error(line, "Employee not found", employee_id)
+            continue
+
+        key = (employee_id, salary.due_year, salary.due_month)
+        rows[key] = (line, {
+            'company_domain': company_domain,
+            'employee_id': employee_id,
+            'due_year': salary.due_year,
+            'due_month': salary.due_month,
+            **{field: getattr(salary, field) for field in SALARY_FIELDS}
+        })
+
+    if not rows:
+        return
+
+    # rows with only a gross get their deductions from the company's engine, in one batch
+    derive = [
+        key for key, (_, params) in rows.items()
+        if deductions.needs_derivation(*(params[field] for field in deductions.AMOUNT_FIELDS))
+    ]
+    engine = deductions.for_company(db, company_domain) if derive else None
+    if engine:
+        for key in [key for key in derive if rows[key][1]['gross_salary'] > deductions.MAX_GROSS]:
+            result.error(rows.pop(key)[0], "gross_salary is too large to derive deductions", key[0])
+        derive = [key for key in derive if key in rows]
+        amounts = engine.compute([rows[key][1]['gross_salary'] for key in derive])
+        for key, derived in zip(derive, amounts):
+            rows[key][1].update(derived)
+        if not rows:
+            return
+
+    try:
+        existing = existing_keys(db, company_domain, list(rows))
+        updates = [params for key, (_, params) in rows.items() if key in existing]
+        inserts = [params for key, (_, params) in rows.items() if key not in existing]
+
+        # only the columns a row gave (or had derived) are overwritten
+        by_columns: Dict[Tuple[str, ...], List[dict]] = {}
+        for params in updates if upsert else ():
+            columns = tuple(field for field in SALARY_FIELDS if params[field] is not None)
+            if columns:
+                by_columns.setdefault(columns, []).append(params)
+        for columns, batch in by_columns.items():
+            db.execute(text(f"""
+                UPDATE employees_salaries
+                SET {', '.join(f'{column} = :{column}' for column in columns)}
+                WHERE company_domain = :company_domain
+                AND employee_id = :employee_id
+                AND due_year = :due_year
+                AND due_month = :due_month
+            """), batch)
+        if inserts:
+            db.execute(text("""
+                INSERT INTO employees_salaries
+                (company_domain, employee_id, gross_salary, insurance, taxes, net_salary,
+                 due_year, due_month, due_date, date_added)
+                VALUES (:company_domain, :employee_id, :gross_salary, :insurance, :taxes,
+                        :net_salary, :due_year, :due_month, :due_date, getdate())
+            """), inserts)
+
+        db.commit()
+
+    except Exception:
+        db.rollback()
+        first_line, last_line = chunk[0][0], chunk[-1][0]
+        logger.exception("Salary import chunk (lines %s-%s) failed for %s", first_line, last_line, company_domain)
+        for key, (line, _) in rows.items():
+            result.error(line, f"Could not save lines {first_line}-{last_line}; none of them were imported", key[0])
+        return
+
+    result.inserted += len(inserts)
+    if upsert:
+        result.updated += len(updates)
+    else:
+        result.skipped_existing += len(updates)
+    payroll_reports.salaries_changed(company_domain, {(key[1], key[2]) for key in rows})
+
+
+def import_salaries(db: Session, company_domain: str, stream, file_format: str,
+                    upsert: bool = True, chunk_size: int = CHUNK_SIZE) -> ImportResult:
+    """Stream a CSV or NDJSON file of salaries into employees_salaries"""
+    records = read_ndjson(stream) if file_format == "ndjson" else read_csv(stream)
+    result = ImportResult()
+    for chunk in chunks(records, chunk_size):
+        import_chunk(db, company_domain, chunk, upsert, result)
+    return result
@@ -72,6 +72,16 @@ class LeadUpdate(BaseModel):
             raise ValueError('Gender must be either "Male" or "Female"')
         return v
 
+class LeadActivityResponse(BaseModel):
+    call_count: int
+    meeting_count: int
+    last_call_at: Optional[datetime]
+    next_meeting_at: Optional[datetime]
+    last_status: Optional[int]
+    
+    class Config:
+        from_attributes = True
+
 class LeadResponse(BaseModel):
     lead_id: int
     name: Optional[str]
@@ -85,10 +95,24 @@ class LeadResponse(BaseModel):
     lead_status: Optional[int]
     company_domain: str
     date_added: datetime
+    activity: Optional[LeadActivityResponse] = None
     
     class Config:
         from_attributes = True
 
+class DuplicateCandidateResponse(BaseModel):
+    candidate_id: int
+    score: int
+    reasons: Optional[str]
+    status: str
+    lead_a: LeadResponse
+    lead_b: LeadResponse
+    date_added: datetime
+
+class LeadMergeRequest(BaseModel):
+    survivor_id: int = Field(..., description="Lead that is kept")
+    duplicate_id: int = Field(..., description="Lead merged into the survivor and deleted")
+
 # ACTION SCHEMAS
 
 class CallCreate(BaseModel):
@@ -110,11 +134,13 @@ class CallResponse(BaseModel):
 class MeetingCreate(BaseModel):
     meeting_date: datetime = Field(..., description="Meeting date and time")
     meeting_status: int = Field(..., description="Meeting status ID")
+    duration_minutes: int = Field(60, ge=5, le=1440, description="Meeting length in minutes")
 
 class MeetingResponse(BaseModel):
     meeting_id: int
     meeting_date: datetime
     meeting_status: int
+    duration_minutes: Optional[int] = None
     assigned_to: int
     lead_id: int
     company_domain: str
@@ -123,6 +149,15 @@ class MeetingResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TimeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+class FreeSlotsResponse(BaseModel):
+    user_id: int
+    day: date
+    slots: List[TimeSlot]
+
 # EMPLOYEE SCHEMAS -
 
 class EmployeeCreate(BaseModel):
@@ -196,6 +231,61 @@ class EmployeeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SalaryImportError(BaseModel):
+    line: int
+    employee_id: Optional[int] = None
+    message: str
+
+class EmployeeBulkDelete(BaseModel):
+    employee_ids: List[int] = Field(..., min_length=1, max_length=10000)
+
+class EmployeeBulkDeleteResponse(BaseModel):
+    employees: int = Field(..., description="Employees deleted")
+    salaries: int = Field(..., description="Salary rows deleted with them")
+    not_found: List[int]
+
+class EmailDomainChange(BaseModel):
+    old_domain: str = Field(..., max_length=100, description="Domain after the @, e.g. old.com")
+    new_domain: str = Field(..., max_length=100)
+    
+    @validator('old_domain', 'new_domain')
+    def validate_domain(cls, v):
+        v = v.strip().lstrip('@').lower()
+        if not v or '.' not in v or '@' in v or ' ' in v or '%' in v or '_' in v:
+            raise ValueError('Invalid email domain')
+        return v
+
+class EmployeeBulkUpdate(BaseModel):
+    employee_ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000,
+                                              description="Employees to update; omit for the whole company")
+    is_company_admin: Optional[bool] = None
+    business_email_domain: Optional[EmailDomainChange] = Field(
+        None, description="Move business emails on old_domain to new_domain"
+    )
+
+class EmployeeBulkUpdateResponse(BaseModel):
+    employees: int = Field(..., description="Employees updated")
+    not_matched: List[int] = Field(..., description="Requested ids that were not updated")
+
+class EmployeeImportResponse(BaseModel):
+    rows: int
+    created: int
+    failed: int
+    errors: List[SalaryImportError] = Field(..., description="First errors, capped")
+
+class EmployeeSalarySummary(BaseModel):
+    employee_id: int
+    contact_name: str
+    business_email: Optional[str]
+    is_company_admin: Optional[bool]
+    latest_year: Optional[int] = Field(None, description="Period of the most recent salary row")
+    latest_month: Optional[int] = None
+    latest_gross: Optional[Decimal] = None
+    latest_net: Optional[Decimal] = None
+    ytd_gross: Decimal = Field(..., description="Gross from January through the requested month")
+    ytd_net: Decimal
+    records: int = Field(..., description="Salary rows the employee has in total")
+
 # SALARY SCHEMAS 
 
 class SalaryCreate(BaseModel):
@@ -230,6 +320,235 @@ class SalaryResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SalaryTemplate(BaseModel):
+    """Amounts given to every employee in a template payroll run"""
+    gross_salary: Optional[Decimal] = Field(None, ge=0)
+    insurance: Optional[Decimal] = Field(None, ge=0)
+    taxes: Optional[Decimal] = Field(None, ge=0)
+    net_salary: Optional[Decimal] = Field(None, ge=0)
+
+class PayrollRunCreate(BaseModel):
+    due_year: int = Field(..., ge=2020, le=2030, description="Salary year (2020-2030)")
+    due_month: int = Field(..., ge=1, le=12, description="Salary month (1-12)")
+    source: str = Field("previous_month", pattern="^(previous_month|template)$",
+                        description="Copy each employee's previous month, or apply the template")
+    template: Optional[SalaryTemplate] = Field(None, description="Required when source is 'template'")
+    employee_ids: Optional[List[int]] = Field(None, min_length=1, description="Limit the run to these employees")
+    due_date: Optional[date] = Field(None, description="Payment due date for the generated rows")
+
+class PayrollRunResponse(BaseModel):
+    due_year: int
+    due_month: int
+    source: str
+    employees: int = Field(..., description="Employees in scope")
+    created: int = Field(..., description="Salary rows inserted")
+    skipped_existing: int = Field(..., description="Employees that already had a row for the month")
+    missing_source: int = Field(0, description="Employees with no previous-month row to copy")
+
+class SalaryImportResponse(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    skipped_existing: int
+    failed: int
+    errors: List[SalaryImportError] = Field(..., description="First errors, capped")
+
+class TaxBracket(BaseModel):
+    up_to: Optional[Decimal] = Field(None, gt=0, le=90000000000, description="Upper bound of the bracket; omit on the top bracket")
+    rate: Decimal = Field(..., ge=0, le=1, decimal_places=6, description="Rate on income within the bracket, e.g. 0.15")
+
+class DeductionConfig(BaseModel):
+    tax_brackets: List[TaxBracket] = Field(..., min_length=1, max_length=50)
+    insurance_rate: Decimal = Field(..., ge=0, le=1, decimal_places=6)
+    insurance_cap: Optional[Decimal] = Field(None, ge=0, description="Largest insurance deduction per salary")
+    tax_after_insurance: bool = Field(True, description="Tax gross minus insurance instead of gross")
+    
+    @validator('tax_brackets')
+    def validate_brackets(cls, v):
+        bounds = [bracket.up_to for bracket in v]
+        if None in bounds[:-1]:
+            raise ValueError('Only the last bracket may be open-ended')
+        limited = [bound for bound in bounds if bound is not None]
+        if any(lower >= upper for lower, upper in zip(limited, limited[1:])):
+            raise ValueError('Bracket bounds must be increasing')
+        return v
+
+class DeductionConfigResponse(DeductionConfig):
+    company_domain: str
+    date_updated: Optional[datetime]
+
+class DeductionPreviewRequest(BaseModel):
+    gross_salaries: List[Decimal] = Field(..., min_length=1, max_length=10000)
+    
+    @validator('gross_salaries', each_item=True)
+    def validate_gross(cls, v):
+        if v < 0:
+            raise ValueError('Gross salary cannot be negative')
+        return v
+
+class SalaryDeductions(BaseModel):
+    gross_salary: Decimal
+    insurance: Decimal
+    taxes: Decimal
+    net_salary: Decimal
+
+class PayrollTotals(BaseModel):
+    records: int = Field(..., description="Salary rows summed")
+    gross_salary: Decimal
+    insurance: Decimal
+    taxes: Decimal
+    net_salary: Decimal
+
+class PayrollMonthReport(PayrollTotals):
+    due_year: int
+    due_month: int
+
+class PayrollYearReport(PayrollTotals):
+    due_year: int
+
+class EmployeeYtdReport(BaseModel):
+    employee_id: int
+    contact_name: str
+    months: int = Field(..., description="Salary rows included")
+    last_month: int
+    gross_salary: Decimal
+    insurance: Decimal
+    taxes: Decimal
+    net_salary: Decimal
+
+class PayrollForecastMonth(BaseModel):
+    due_year: int
+    due_month: int
+    gross_salary: Decimal
+
+class EmployeeForecast(BaseModel):
+    employee_id: int
+    monthly_trend: Decimal = Field(..., description="Fitted change in gross per month")
+    next_month: Decimal
+    total_gross: Decimal = Field(..., description="Projected gross over the whole horizon")
+
+class PayrollForecastResponse(BaseModel):
+    base_year: Optional[int] = Field(None, description="Latest period with salaries; projections start after it")
+    base_month: Optional[int] = None
+    employees: int = Field(..., description="Projected headcount, including headcount_change")
+    months: List[PayrollForecastMonth]
+    total_gross: Decimal
+    employee_forecasts: Optional[List[EmployeeForecast]] = None
+
+class PayslipJobCreate(BaseModel):
+    due_year: int = Field(..., ge=2020, le=2030)
+    due_month: int = Field(..., ge=1, le=12)
+    output: str = Field("zip", pattern="^(zip|directory)$",
+                        description="A zip to download when done, or files in the server's payslip directory")
+
+class PayslipJobResponse(BaseModel):
+    job_id: str
+    due_year: int
+    due_month: int
+    output: str
+    status: str = Field(..., description="running, done or failed")
+    total: int = Field(..., description="Payslips in the job")
+    done: int = Field(..., description="Payslips rendered so far")
+    error: Optional[str] = None
+    path: Optional[str] = Field(None, description="Output directory, for directory jobs")
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+# ADMIN DIAGNOSTICS SCHEMAS
+
+class ProfileSummary(BaseModel):
+    profile_id: str
+    mode: str = Field(..., description="cprofile or sample")
+    method: str
+    path: str
+    route: Optional[str] = None
+    status_code: Optional[int] = None
+    user_id: int
+    created_at: datetime
+    total_ms: float = Field(..., description="Whole request, including dependencies and serialisation")
+    endpoint_ms: float = Field(..., description="Endpoint body - the part that was profiled")
+
+class ProfileFunction(BaseModel):
+    function: str
+    file: str
+    line: int
+    calls: int
+    primitive_calls: int
+    own_ms: float
+    cumulative_ms: float
+    callers: List[str]
+
+class ProfileStack(BaseModel):
+    stack: str = Field(..., description="Root-first frames joined with ';'")
+    samples: int
+
+class ProfileDetail(ProfileSummary):
+    functions: List[ProfileFunction] = Field(..., description="cprofile mode: top functions by cumulative time")
+    stacks: List[ProfileStack] = Field(..., description="sample mode: collapsed stacks")
+
+class SamplerConfig(BaseModel):
+    enabled: bool
+    interval_ms: Optional[float] = Field(None, ge=1, le=1000, description="Sampling interval")
+    reset: bool = Field(False, description="Drop the stacks collected so far")
+
+class SamplerStatus(BaseModel):
+    running: bool
+    interval_ms: float
+    samples: int
+    distinct_stacks: int
+    started_at: Optional[datetime] = None
+
+class MemoryConfig(BaseModel):
+    enabled: bool
+    frames: Optional[int] = Field(None, ge=1, le=100, description="Traceback depth kept per allocation")
+
+class MemorySnapshotCreate(BaseModel):
+    label: Optional[str] = Field(None, max_length=100, description="e.g. 'before export'")
+
+class MemorySnapshotSummary(BaseModel):
+    snapshot_id: str
+    label: Optional[str] = None
+    taken_at: datetime
+    frames: int
+    traced_bytes: int = Field(..., description="Everything tracemalloc traced at the time")
+    attributed_bytes: int = Field(..., description="The part allocated under api/ or schemas.py")
+
+class MemoryStat(BaseModel):
+    location: str = Field(..., description="file:line, or file when grouped by filename")
+    size_bytes: int
+    count: int
+
+class MemorySnapshotDetail(MemorySnapshotSummary):
+    group_by: str
+    stats: List[MemoryStat]
+
+class MemoryDiffStat(MemoryStat):
+    size_diff_bytes: int
+    count_diff: int
+
+class MemoryDiff(BaseModel):
+    snapshot_id: str
+    against: str
+    group_by: str
+    traced_diff_bytes: int
+    stats: List[MemoryDiffStat] = Field(..., description="Biggest change first")
+
+class TenantPeak(BaseModel):
+    tenant: str
+    requests: int
+    mean_bytes: int
+    max_bytes: int
+
+class MemoryStatus(BaseModel):
+    tracing: bool
+    frames: Optional[int] = None
+    started_at: Optional[datetime] = None
+    traced_bytes: int
+    peak_bytes: int
+    overhead_bytes: int = Field(..., description="Memory used by tracemalloc itself")
+    snapshots: List[MemorySnapshotSummary]
+    tenants: List[TenantPeak] = Field([], description="Request peaks per company while tracing, largest first")
+
 # LOOKUP DATA SCHEMAS
 
 class LookupResponse(BaseModel):
@@ -0,0 +1,95 @@
+"""
+SQLite Stand-in Database
+
+WHY THIS FILE EXISTS:
+- The backend only runs against SQL Server, which isn't available in CI
+  or on a laptop
+- Lets tooling (query-plan checks, benchmarks) run the real models,
+  migrations and endpoints on SQLite
+
+WHAT IT PATCHES:
+- SQL Server column types (MONEY, BIT, UNIQUEIDENTIFIER) get SQLite DDL
+- BIGINT primary keys become INTEGER so they autoincrement like IDENTITY
+- employees_info.employee_id (IDENTITY inside a composite key, which SQLite
+  can't autoincrement) gets MAX() + 1 as an insert default
+- getdate() and DB_NAME() are registered as SQLite functions
+- Decimal parameters (MONEY values) are bound as text
+"""
+
+import sqlite3
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import BigInteger, create_engine, event, func, select
+from sqlalchemy.dialects.mssql import BIT, MONEY, UNIQUEIDENTIFIER
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.schema import ColumnDefault
+
+
+sqlite3.register_adapter(Decimal, str)
+
+
+@compiles(MONEY, "sqlite")
+def _compile_money(type_, compiler, **kw):
+    return "NUMERIC(19, 4)"
+
+
+@compiles(BIT, "sqlite")
+def _compile_bit(type_, compiler, **kw):
+    return "BOOLEAN"
+
+
+@compiles(UNIQUEIDENTIFIER, "sqlite")
+def _compile_uniqueidentifier(type_, compiler, **kw):
+    return "CHAR(36)"
+
+
+@compiles(BigInteger, "sqlite")
+def _compile_bigint(type_, compiler, **kw):
+    return "INTEGER"
+
+
+def _getdate() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _number_employees(dbapi_connection, connection_record) -> None:
+    # on first connect: models imports database, which installs the stand-in
+    from models import EmployeeInfo
+
+    employee_id = EmployeeInfo.__table__.c.employee_id
+    if employee_id.default is None:
+        ColumnDefault(
+            select(func.coalesce(func.max(employee_id), 0) + 1).scalar_subquery()
+        )._set_parent_with_dispatch(employee_id)
+
+
+def install(engine: Engine) -> Engine:
+    """Register the SQL Server functions the app uses on every new connection"""
+    event.listen(engine, "first_connect", _number_employees)
+
+    @event.listens_for(engine, "connect")
+    def _register_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("getdate", 0, _getdate)
+        dbapi_connection.create_function("DB_NAME", 0, lambda: "sqlite-standin")
+
+    return engine
+
+
+def create_standin_engine(url: str = "sqlite://", migrate: bool = True) -> Engine:
+    """Engine with the full schema created and all migrations applied"""
+    from models import Base
+    import migrations
+
+    kwargs = {"connect_args": {"check_same_thread": False}}
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # a single shared connection, otherwise every checkout sees an empty database
+        kwargs["poolclass"] = StaticPool
+
+    engine = install(create_engine(url, **kwargs))
+    Base.metadata.create_all(engine)
+    if migrate:
+        migrations.upgrade(engine)
+    return engine
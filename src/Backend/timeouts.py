@@ -0,0 +1,331 @@
+"""
+Statement Timeouts and Cancellation
+
+WHY THIS FILE EXISTS:
+- A pathological filter or a lock on leads_info could keep a request's SQL
+  running for as long as the database let it, holding one of the pooled
+  connections long after the client had given up
+- Gives every statement a time limit chosen by the kind of route running
+  it, cancels a request's SQL when its client disconnects, and answers a
+  clean 504 (counted in /metrics) instead of a hung request
+
+HOW IT WORKS:
+- Routes fall into four classes, each with its own per-statement limit:
+    lookups -> lookup tables and single items (GET .../{id}, /me)
+    lists   -> every other GET
+    exports -> downloads, payroll reports and the bulk jobs (imports, bulk
+               updates, duplicate scans, payroll runs) in EXPORT_ROUTES
+    writes  -> every other POST / PUT / DELETE
+- StatementTimeoutMiddleware keeps a StatementBudget per request in a
+  contextvar (shared by reference with the threadpool, like
+  metrics.current); the class is resolved from the matched route at the
+  first statement
+- The limit is enforced by the driver, per statement:
+    pyodbc  -> Connection.timeout is set before each statement, so the ODBC
+               driver applies it as the query timeout (SQLSTATE HYT00)
+    sqlite  -> a progress handler on each stand-in connection aborts the
+               statement past its deadline ("interrupted")
+- The middleware watches the request's receive channel once the body has
+  been read; on http.disconnect the budget is cancelled: the statement in
+  flight is cancelled (pyodbc cursor.cancel(), the progress handler on
+  sqlite) and any later statement of that request is refused
+- A handle_error listener turns the driver errors into StatementTimeout
+  (504) and StatementCancelled (499, logged only - nobody is listening),
+  counted as db_statement_timeouts_total / db_statement_cancellations_total
+  per route
+
+SETTINGS (environment, seconds, 0 = no limit):
+- STATEMENT_TIMEOUT_LOOKUPS (5), STATEMENT_TIMEOUT_LISTS (30),
+  STATEMENT_TIMEOUT_EXPORTS (120), STATEMENT_TIMEOUT_WRITES (15)
+- STATEMENT_TIMEOUTS_ENABLED=false turns limits and cancellation off
+
+LIMITS:
+- The limit is per statement, not per request; a request running many
+  statements can take longer than its class's limit in total
+- SQL Server query timeouts are whole seconds (rounded up)
+- Work outside a request (payslip jobs, reminders, warm-up) has no limit
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import anyio
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_TIMEOUTS_ENABLED = os.getenv("STATEMENT_TIMEOUTS_ENABLED", "true").lower() == "true"
+STATEMENT_TIMEOUTS = {
+    "lookups": float(os.getenv("STATEMENT_TIMEOUT_LOOKUPS", "5")),
+    "lists": float(os.getenv("STATEMENT_TIMEOUT_LISTS", "30")),
+    "exports": float(os.getenv("STATEMENT_TIMEOUT_EXPORTS", "120")),
+    "writes": float(os.getenv("STATEMENT_TIMEOUT_WRITES", "15")),
+}
+
+# long-running by design, whatever their method
+EXPORT_ROUTES = frozenset({
+    "/api/hr/employees/summary",
+    "/api/hr/employees/import",
+    "/api/hr/employees/bulk-delete",
+    "/api/hr/employees/bulk-update",
+    "/api/hr/salaries/import",
+    "/api/hr/payroll-runs",
+    "/api/real-estate/leads/duplicates/scan",
+    "/api/real-estate/leads/activity/reconcile",
+})
+LOOKUP_ROUTES = frozenset({
+    "/api/auth/me",
+    "/api/auth/permissions",
+    "/api/hr/deductions/config",
+})
+
+# SQLite opcodes between progress handler calls
+PROGRESS_OPCODES = 1000
+# ODBC SQLSTATEs
+QUERY_TIMEOUT_STATE = "HYT00"
+OPERATION_CANCELLED_STATE = "HY008"
+HTTP_CLIENT_CLOSED_REQUEST = 499
+
+
+def route_class(method: str, path: str) -> str:
+    """Statement-timeout class of a route, by method and path template"""
+    if path in EXPORT_ROUTES or "/reports/" in path or path.endswith("/download"):
+        return "exports"
+    if method not in ("GET", "HEAD"):
+        return "writes"
+    if path in LOOKUP_ROUTES or "/lookup/" in path or path.endswith("}"):
+        return "lookups"
+    return "lists"
+
+
+class StatementTimeout(HTTPException):
+
+    def __init__(self, seconds: float):
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"The database did not answer within {seconds:g} seconds; narrow the request and try again"
+        )
+
+
+class StatementCancelled(HTTPException):
+
+    def __init__(self):
+        super().__init__(status_code=HTTP_CLIENT_CLOSED_REQUEST, detail="Client closed the request")
+
+
+class StatementBudget:
+    """Mutable per-request limit and cancel flag; shared by reference with worker threads"""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.kind: Optional[str] = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+        # pyodbc cursor of the statement in flight, for cancel()
+        self.cursor = None
+
+    def labels(self):
+        route = self.scope.get("route")
+        path = getattr(route, "path_format", None) or getattr(route, "path", None) or self.scope["path"]
+        return path, metrics.router_for(self.scope["path"])
+
+    @property
+    def seconds(self) -> float:
+        if self.kind is None:
+            self.kind = route_class(self.scope["method"], self.labels()[0])
+        return STATEMENT_TIMEOUTS[self.kind]
+
+    def cancel(self) -> None:
+        """Called on the event loop when the client disconnects"""
+        with self.lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            cursor, self.cursor = self.cursor, None
+        if cursor is not None and hasattr(cursor, "cancel"):
+            try:
+                cursor.cancel()
+            except Exception as e:
+                # the statement may have finished and the cursor closed meanwhile
+                logger.debug("Cursor cancel failed: %s", e)
+
+    def count(self, name: str) -> None:
+        path, router = self.labels()
+        metrics.registry.increment(name, router, path)
+
+
+current: ContextVar[Optional[StatementBudget]] = ContextVar("statement_budget", default=None)
+
+
+class StatementTimeoutMiddleware:
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not STATEMENT_TIMEOUTS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        budget = StatementBudget(scope)
+        token = current.set(budget)
+        send_stream, receive_stream = anyio.create_memory_object_stream(float("inf"))
+        watching = False
+        responded = False
+        disconnected = False
+
+        async def watch():
+            nonlocal disconnected
+            # everything after the body goes through here, so the app still sees it
+            async with send_stream:
+                while True:
+                    message = await receive()
+                    if message["type"] == "http.disconnect":
+                        # servers also answer disconnect once the response is complete
+                        if not responded:
+                            disconnected = True
+                            budget.cancel()
+                        await send_stream.send(message)
+                        return
+                    await send_stream.send(message)
+
+        async def receive_wrapper():
+            nonlocal watching, disconnected
+            if watching:
+                try:
+                    return await receive_stream.receive()
+                except anyio.EndOfStream:
+                    return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                if not responded:
+                    disconnected = True
+                    budget.cancel()
+            elif not message.get("more_body", False):
+                watching = True
+                task_group.start_soon(watch)
+            return message
+
+        async def send_wrapper(message):
+            nonlocal responded
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                responded = True
+            await send(message)
+
+        headers = dict(scope["headers"])
+        has_body = headers.get(b"content-length", b"0") not in (b"0", b"") or b"transfer-encoding" in headers
+
+        try:
+            async with anyio.create_task_group() as task_group:
+                if not has_body:
+                    watching = True
+                    task_group.start_soon(watch)
+                try:
+                    await self.app(scope, receive_wrapper, send_wrapper)
+                finally:
+                    task_group.cancel_scope.cancel()
+        finally:
+            if disconnected:
+                logger.info("Client disconnected from %s %s", scope["method"], scope["path"])
+            current.reset(token)
+
+
+# Driver-level enforcement
+
+class ConnectionState:
+    """What the stand-in's progress handler checks, per DBAPI connection"""
+
+    def __init__(self):
+        self.deadline: Optional[float] = None
+        self.budget: Optional[StatementBudget] = None
+
+    def interrupted(self) -> int:
+        if self.budget is not None and self.budget.cancelled:
+            return 1
+        return 1 if self.deadline is not None and time.monotonic() > self.deadline else 0
+
+
+def reset(dbapi_connection, connection_record, reset_state=None):
+    # before the pool's rollback, which must not be interrupted
+    state = connection_record.info.get("statement_state")
+    if state is not None:
+        state.deadline = None
+        state.budget = None
+
+
+def before_execute(conn, clauseelement, multiparams, params, execution_options):
+    budget = current.get()
+    if budget is not None and budget.cancelled:
+        budget.count("db_statement_cancellations_total")
+        raise StatementCancelled()
+    seconds = budget.seconds if budget is not None else 0
+
+    dbapi_connection = conn.connection.dbapi_connection
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        state = conn.info.get("statement_state")
+        if state is None:
+            # on first use rather than on connect, so connections opened before install() get one too
+            state = conn.info["statement_state"] = ConnectionState()
+            dbapi_connection.set_progress_handler(state.interrupted, PROGRESS_OPCODES)
+        state.budget = budget
+        state.deadline = time.monotonic() + seconds if seconds else None
+    elif hasattr(dbapi_connection, "timeout"):
+        # pyodbc applies it to the cursors created from now on
+        dbapi_connection.timeout = math.ceil(seconds) if seconds else 0
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    budget = current.get()
+    if budget is not None and not isinstance(conn.connection.dbapi_connection, sqlite3.Connection):
+        with budget.lock:
+            budget.cursor = cursor
+
+
+def handle_error(exception_context):
+    budget = current.get()
+    original = exception_context.original_exception
+    if budget is None or original is None:
+        return
+    if isinstance(original, sqlite3.OperationalError):
+        if str(original) != "interrupted":
+            return
+        cancelled = budget.cancelled
+    else:
+        sqlstate = original.args[0] if original.args and isinstance(original.args[0], str) else None
+        if sqlstate not in (QUERY_TIMEOUT_STATE, OPERATION_CANCELLED_STATE):
+            return
+        cancelled = sqlstate == OPERATION_CANCELLED_STATE or budget.cancelled
+
+    if cancelled:
+        budget.count("db_statement_cancellations_total")
+        raise StatementCancelled() from original
+    path, _ = budget.labels()
+    logger.warning(
+        "Statement timed out after %ss on %s %s", budget.seconds, budget.scope["method"], path,
+        extra={"route": path, "route_class": budget.kind, "statement": exception_context.statement[:500]
+               if exception_context.statement else None},
+    )
+    budget.count("db_statement_timeouts_total")
+    raise StatementTimeout(budget.seconds) from original
+
+
+def install(engine: Engine) -> None:
+    """Attach the timeout listeners to an engine (once); after metrics.instrument, see handle_error"""
+    if not STATEMENT_TIMEOUTS_ENABLED or event.contains(engine, "before_execute", before_execute):
+        return
+    event.listen(engine, "before_execute", before_execute)
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    # raising from handle_error skips the listeners registered after it, so
+    # this one has to come after the query trace and metrics listeners
+    event.listen(engine, "handle_error", handle_error)
+    event.listen(engine.pool, "reset", reset)
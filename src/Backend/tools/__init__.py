@@ -0,0 +1,20 @@
+"""
+Regression Checks
+
+WHY THIS PACKAGE EXISTS:
+- The query-plan and statement-count guarantees used to live only in code
+  review; these scripts check them against the SQLite stand-in
+- Kept out of migrations/, which the app imports at runtime
+
+HOW TO RUN (from src/Backend):
+    python -m tools.plan_check           # every hot statement uses an index
+    python -m tools.statement_check      # write endpoints stay within budget
+
+- plan_check.py       EXPLAIN QUERY PLAN of every statement the endpoints send
+- statement_check.py  statements per write endpoint against a budget
+
+LIMITS:
+- Exit-code scripts (0 = pass, 1 = regression), not a test suite; run them
+  before merging a query change
+- SQLite plans approximate SQL Server's; an index seek here is a proxy
+"""
@@ -0,0 +1,216 @@
+"""
+Query-Plan Regression Check
+
+WHY THIS FILE EXISTS:
+- Every hot query in api/leads.py, api/hr.py, auth.py and permissions.py
+  filters on company_domain plus an id, and must stay an index seek
+- Calls the endpoint functions (and the helpers they share with background
+  work) against the SQLite stand-in (models + all migrations), captures
+  every statement they send with a before_cursor_execute hook, and fails if
+  EXPLAIN QUERY PLAN of any of them degrades to a full table scan
+
+HOW TO RUN:
+    python -m tools.plan_check          # exit code 1 on regressions
+    python -m tools.plan_check -v       # print every statement and plan
+
+The statements are the ones the code emits, so a changed query is checked
+as it is; a new endpoint needs a step in scenarios(). Scans are only
+allowed over what the plan itself materialises (a named subquery or CTE,
+SQLAlchemy's anon_<n>, SQLite's (subquery-<n>)) and the constant row.
+"""
+
+import inspect
+import io
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi import Response, UploadFile
+from fastapi.security import HTTPBasicCredentials
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+import auth
+import reminders
+from sqlite_standin import create_standin_engine
+from models import UserInfo
+from schemas import CallCreate, MeetingCreate, PayrollRunCreate, SalaryUpdate
+from api import auth as auth_api, hr, leads
+from tools.statement_check import SEED
+
+FULL_SCAN = re.compile(r"^SCAN (\(subquery-\d+\)|\S+)")
+MATERIALISED = re.compile(r"^(?:MATERIALIZE|CO-ROUTINE) (\S+)")
+# SQLAlchemy's and SQLite's own names for unnamed subqueries
+GENERATED = re.compile(r"^(?:anon_\d+|\(subquery-\d+\))$")
+CONSTANT_ROW = "SCAN CONSTANT ROW"
+
+EXPLAINED = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+# salary history for the report, cursor and payroll-run paths
+SALARY_SEED = [
+    "INSERT INTO employees_salaries (company_domain, employee_id, gross_salary, insurance, taxes, net_salary, "
+    "due_year, due_month, due_date, date_added) VALUES "
+    "('example.com', 1, 1000, 100, 100, 800, 2025, 1, '2025-01-28', CURRENT_TIMESTAMP), "
+    "('example.com', 1, 1000, 100, 100, 800, 2025, 2, '2025-02-28', CURRENT_TIMESTAMP)",
+]
+
+
+def call(endpoint, **kwargs):
+    """Call an endpoint function directly, with the Query() defaults FastAPI would fill in"""
+    for name, parameter in inspect.signature(endpoint).parameters.items():
+        if name not in kwargs and parameter.default is not inspect.Parameter.empty:
+            kwargs[name] = getattr(parameter.default, "default", parameter.default)
+    return endpoint(**kwargs)
+
+
+def scenarios(engine):
+    """(name, step); each step gets a fresh session and the loaded user, and may use earlier results"""
+    tomorrow = date.today() + timedelta(days=1)
+    state = {}
+
+    def add_call(db, user):
+        state["call_id"] = call(leads.add_call_to_lead, lead_id=1, call_data=CallCreate(
+            call_date=datetime.now() + timedelta(days=1), call_status=1
+        ), current_user=user, db=db).call_id
+
+    def import_salaries(db, user):
+        upload = UploadFile(io.BytesIO(b"employee_id,due_year,due_month,gross_salary\n1,2025,2,1100\n1,2025,4,1200\n"),
+                            filename="salaries.csv")
+        call(hr.import_salaries, file=upload, file_format="csv", current_user=user, db=db)
+
+    return [
+        # auth.py / permissions.py - run on every request
+        ("auth.get_current_user", lambda db, user: auth.get_current_user(
+            HTTPBasicCredentials(username="user", password="pw"), db)),
+        ("auth.get_user_permissions", lambda db, user: call(
+            auth_api.get_user_permissions_endpoint, current_user=user, db=db)),
+        ("auth.get_users_for_assignment", lambda db, user: call(
+            auth_api.get_users_for_assignment, current_user=user, db=db)),
+
+        # api/leads.py
+        ("leads.get_lead_stages", lambda db, user: call(leads.get_lead_stages, current_user=user, db=db)),
+        ("leads.get_lead_statuses", lambda db, user: call(leads.get_lead_statuses, current_user=user, db=db)),
+        ("leads.get_lead_types", lambda db, user: call(leads.get_lead_types, current_user=user, db=db)),
+        ("leads.get_call_statuses", lambda db, user: call(leads.get_call_statuses, current_user=user, db=db)),
+        ("leads.get_meeting_statuses", lambda db, user: call(leads.get_meeting_statuses, current_user=user, db=db)),
+        ("leads.get_all_leads", lambda db, user: call(leads.get_all_leads, current_user=user, db=db)),
+        ("leads.get_all_leads.not_contacted", lambda db, user: call(
+            leads.get_all_leads, not_contacted_days=7, current_user=user, db=db)),
+        ("leads.get_all_leads.upcoming_meeting", lambda db, user: call(
+            leads.get_all_leads, has_upcoming_meeting=True, current_user=user, db=db)),
+        ("leads.get_all_leads.by_next_meeting", lambda db, user: call(
+            leads.get_all_leads, sort_by="next_meeting_at", current_user=user, db=db)),
+        ("leads.get_duplicate_candidates", lambda db, user: call(
+            leads.get_duplicate_candidates, current_user=user, db=db)),
+        ("leads.get_lead_by_id", lambda db, user: call(leads.get_lead_by_id, lead_id=1, current_user=user, db=db)),
+        ("leads.get_lead_calls", lambda db, user: call(leads.get_lead_calls, lead_id=1, current_user=user, db=db)),
+        ("leads.get_lead_meetings", lambda db, user: call(
+            leads.get_lead_meetings, lead_id=1, current_user=user, db=db)),
+        ("leads.get_free_meeting_slots", lambda db, user: call(
+            leads.get_free_meeting_slots, day=tomorrow, current_user=user, db=db)),
+        ("leads.add_call_to_lead", add_call),
+        ("leads.add_meeting_to_lead", lambda db, user: call(leads.add_meeting_to_lead, lead_id=1, meeting_data=MeetingCreate(
+            meeting_date=datetime.now() + timedelta(days=2), meeting_status=1
+        ), current_user=user, db=db)),
+        ("leads.delete_call", lambda db, user: call(
+            leads.delete_call, lead_id=1, call_id=state["call_id"], current_user=user, db=db)),
+        ("reminders.hydrate", lambda db, user: reminders.ReminderScheduler(
+            [], session_factory=lambda: Session(engine)).hydrate()),
+
+        # api/hr.py
+        ("hr.get_all_employees", lambda db, user: call(hr.get_all_employees, current_user=user, db=db)),
+        ("hr.get_employees_salary_summary", lambda db, user: call(
+            hr.get_employees_salary_summary, response=Response(), year=2025, month=6, current_user=user, db=db)),
+        ("hr.get_employee_by_id", lambda db, user: call(
+            hr.get_employee_by_id, employee_id=1, current_user=user, db=db)),
+        ("hr.get_employee_salaries", lambda db, user: call(
+            hr.get_employee_salaries, employee_id=1, current_user=user, db=db)),
+        ("hr.get_all_salaries", lambda db, user: call(
+            hr.get_all_salaries, response=Response(), current_user=user, db=db)),
+        ("hr.get_all_salaries.cursor", lambda db, user: call(
+            hr.get_all_salaries, response=Response(), cursor="2025-6-10", current_user=user, db=db)),
+        ("hr.create_payroll_run", lambda db, user: call(
+            hr.create_payroll_run, run=PayrollRunCreate(due_year=2025, due_month=3), current_user=user, db=db)),
+        ("hr.get_monthly_payroll_report", lambda db, user: call(
+            hr.get_monthly_payroll_report, year=2025, current_user=user, db=db)),
+        ("hr.get_yearly_payroll_report", lambda db, user: call(
+            hr.get_yearly_payroll_report, from_year=2024, to_year=2025, current_user=user, db=db)),
+        ("hr.get_year_to_date_payroll_report", lambda db, user: call(
+            hr.get_year_to_date_payroll_report, year=2025, month=6, current_user=user, db=db)),
+        ("hr.get_payroll_forecast", lambda db, user: call(hr.get_payroll_forecast, current_user=user, db=db)),
+        ("hr.import_salaries", import_salaries),
+        ("hr.update_salary_record", lambda db, user: call(
+            hr.update_salary_record, employee_id=1, year=2025, month=1,
+            salary_update=SalaryUpdate(gross_salary=1050), current_user=user, db=db)),
+    ]
+
+
+def explain(conn, statement, parameters):
+    if isinstance(parameters, list):
+        # executemany: every row runs the same plan
+        parameters = parameters[0] if parameters else ()
+    return [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+
+
+def full_scans(plan):
+    materialised = {match.group(1) for match in map(MATERIALISED.match, plan) if match}
+    scans = []
+    for detail in plan:
+        match = FULL_SCAN.match(detail)
+        if not match or detail == CONSTANT_ROW:
+            continue
+        name = match.group(1)
+        if name not in materialised and not GENERATED.match(name):
+            scans.append(detail)
+    return scans
+
+
+def run(verbose: bool = False) -> int:
+    engine = create_standin_engine()
+    with engine.begin() as conn:
+        for statement in SEED + SALARY_SEED:
+            conn.execute(text(statement))
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    failures = 0
+    checked = 0
+
+    for name, step in scenarios(engine):
+        with Session(engine) as db:
+            user = db.query(UserInfo).filter(UserInfo.id == 1).one()
+            del captured[:]
+            step(db, user)
+            statements = list(captured)
+
+        seen = set()
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                if statement in seen or not statement.lstrip().upper().startswith(EXPLAINED):
+                    continue
+                seen.add(statement)
+                plan = explain(conn, statement, parameters)
+                scans = full_scans(plan)
+                checked += 1
+                failures += bool(scans)
+                print(f"{'FAIL' if scans else 'ok  '}  {name}: {'; '.join(scans) if scans else ' '.join(statement.split())[:90]}")
+                if verbose or scans:
+                    if scans:
+                        print(f"        {' '.join(statement.split())}")
+                    for detail in plan:
+                        print(f"        {detail}")
+
+    print(f"\n{failures} of {checked} statements degraded to a full scan" if failures
+          else f"\nAll {checked} hot statements use an index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(verbose="-v" in sys.argv))
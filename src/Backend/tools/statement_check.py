@@ -0,0 +1,196 @@
+"""
+Write-Path Statement Count Check
+
+WHY THIS FILE EXISTS:
+- The create/update/delete endpoints in api/leads.py and api/hr.py do the
+  existence check, the change and the result fetch in one statement
+  (RETURNING / OUTPUT) - this keeps them that way
+- Calls each endpoint function against the SQLite stand-in inside
+  database.max_queries() and fails if it runs more statements than its
+  budget
+
+HOW TO RUN:
+    python -m tools.statement_check      # exit code 1 on regressions
+    python -m tools.statement_check -v   # print every statement
+
+Budgets include the require_permission lookup (1 statement), the lead
+activity summary upkeep and the deduction config version read (a gross-only
+salary, see deductions.py), each its own statement by design.
+
+Not covered: the duplicate scan and activity reconcile (background batch
+work over the whole company), payslip jobs (queue a job, the rendering runs
+later) and the deductions preview (writes nothing).
+"""
+
+import io
+import os
+import sys
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi import UploadFile
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import QueryBudgetExceeded, max_queries, trace_engine
+from sqlite_standin import create_standin_engine
+from models import UserInfo
+from schemas import (
+    LeadCreate, LeadUpdate, LeadMergeRequest, CallCreate, MeetingCreate,
+    EmployeeCreate, EmployeeUpdate, EmployeeBulkUpdate, EmployeeBulkDelete,
+    SalaryCreate, SalaryUpdate, PayrollRunCreate, DeductionConfig, TaxBracket
+)
+from api import leads, hr
+
+CD = "example.com"
+
+SEED = [
+    "INSERT INTO company_info (company_domain, name, telephone_number) VALUES ('example.com', 'Example', '1')",
+    "INSERT INTO user_info (id, company_domain, first_name, last_name, email, username, password_hash) "
+    "VALUES (1, 'example.com', 'A', 'B', 'a@example.com', 'user', 'pw')",
+    "INSERT INTO user_roles (id, company_domain, module_id, name) VALUES (1, 'example.com', 1, 'all')",
+    "INSERT INTO user_role_mapping (user_id, role_id) VALUES (1, 1)",
+    "INSERT INTO user_role_permissions (role_id, permission_id, module_id, feature_id, d_read, d_write, d_edit, d_delete) "
+    "VALUES (1, 1, 1, 1, 1, 1, 1, 1), (1, 2, 1, 2, 1, 1, 1, 1), (1, 3, 2, 1, 1, 1, 1, 1), (1, 4, 2, 2, 1, 1, 1, 1)",
+    "INSERT INTO employees_info (company_domain, employee_id, contact_name, date_added) "
+    "VALUES ('example.com', 1, 'Employee', CURRENT_TIMESTAMP)",
+    # a lead that already has an activity summary, for the call/meeting steps
+    "INSERT INTO leads_info (lead_id, company_domain, lead_phone, date_added) "
+    "VALUES (1, 'example.com', '1', CURRENT_TIMESTAMP)",
+    "INSERT INTO leads_activity_summary (lead_id, company_domain, call_count, meeting_count) "
+    "VALUES (1, 'example.com', 0, 0)",
+    # a second lead flagged as its duplicate, for the review and merge steps
+    "INSERT INTO leads_info (lead_id, company_domain, lead_phone, date_added) "
+    "VALUES (2, 'example.com', '2', CURRENT_TIMESTAMP)",
+    "INSERT INTO leads_activity_summary (lead_id, company_domain, call_count, meeting_count) "
+    "VALUES (2, 'example.com', 0, 0)",
+    "INSERT INTO leads_duplicate_candidates (candidate_id, company_domain, lead_id_a, lead_id_b, score, status, date_added) "
+    "VALUES (1, 'example.com', 1, 2, 100, 'pending', CURRENT_TIMESTAMP)",
+]
+
+
+def scenarios():
+    """(name, budget, endpoint, args factory); each step may use earlier results"""
+    later = datetime.now() + timedelta(days=30)
+    state = {}
+
+    return state, [
+        ("leads.create_lead", 2, leads.create_lead,
+         lambda db: (LeadCreate(lead_phone="100", name="Lead"), db.info["user"], db)),
+        ("leads.update_lead", 2, leads.update_lead,
+         lambda db: (state["lead_id"], LeadUpdate(name="Renamed"), db.info["user"], db)),
+        ("leads.add_call_to_lead", 3, leads.add_call_to_lead,
+         lambda db: (1, CallCreate(call_date=later, call_status=1), db.info["user"], db)),
+        # + the meeting index version read (meeting_index.get_index)
+        ("leads.add_meeting_to_lead", 4, leads.add_meeting_to_lead,
+         lambda db: (1, MeetingCreate(meeting_date=later, meeting_status=1), db.info["user"], db)),
+        # deletes recompute the lead's summary: aggregate reads + merge read + update
+        ("leads.delete_call", 6, leads.delete_call,
+         lambda db: (1, state["call_id"], db.info["user"], db)),
+        ("leads.delete_meeting", 6, leads.delete_meeting,
+         lambda db: (1, state["meeting_id"], db.info["user"], db)),
+        ("leads.delete_lead", 4, leads.delete_lead,
+         lambda db: (state["lead_id"], db.info["user"], db)),
+        ("leads.dismiss_duplicate_candidate", 2, leads.dismiss_duplicate_candidate,
+         lambda db: (1, db.info["user"], db)),
+        # the ORM merge: lock both leads, re-point calls and meetings, drop the duplicate's
+        # candidates, summary and row, recompute the survivor's summary, reload it
+        ("leads.merge_leads", 12, leads.merge_leads,
+         lambda db: (LeadMergeRequest(survivor_id=1, duplicate_id=2), db.info["user"], db)),
+
+        ("hr.create_employee", 2, hr.create_employee,
+         lambda db: (EmployeeCreate(contact_name="New", business_email="new@old.example"), db.info["user"], db)),
+        # the file and id-list endpoints run a fixed number of statements per chunk
+        # (employee_bulk.CHUNK_SIZE / salary_import.CHUNK_SIZE rows); these fit in one
+        ("hr.import_employees", 2, hr.import_employees,
+         lambda db: (upload("employees.csv", b"contact_name,business_email\nFirst,first@old.example\nSecond,\n"),
+                     "csv", db.info["user"], db)),
+        ("hr.bulk_update_employees", 2, hr.bulk_update_employees,
+         lambda db: (EmployeeBulkUpdate(is_company_admin=False, business_email_domain={
+             "old_domain": "old.example", "new_domain": "new.example"
+         }), db.info["user"], db)),
+        # upsert checks write and edit permissions; per chunk: employee lookup,
+        # deduction version read, existing months, insert
+        ("hr.import_salaries", 6, hr.import_salaries,
+         lambda db: (upload("salaries.csv", b"employee_id,due_year,due_month,gross_salary\n1,2025,4,1000\n2,2025,4,1100\n"),
+                     "csv", "upsert", db.info["user"], db)),
+        ("hr.create_payroll_run", 3, hr.create_payroll_run,
+         lambda db: (PayrollRunCreate(due_year=2025, due_month=5), db.info["user"], db)),
+        ("hr.update_employee", 2, hr.update_employee,
+         lambda db: (1, EmployeeUpdate(contact_name="Renamed"), db.info["user"], db)),
+        ("hr.add_salary_to_employee", 3, hr.add_salary_to_employee,
+         lambda db: (1, SalaryCreate(due_year=2025, due_month=1, gross_salary=100), db.info["user"], db)),
+        ("hr.update_salary_record", 2, hr.update_salary_record,
+         lambda db: (1, 2025, 1, SalaryUpdate(net_salary=90), db.info["user"], db)),
+        ("hr.delete_salary_record", 2, hr.delete_salary_record,
+         lambda db: (1, 2025, 1, db.info["user"], db)),
+        # the company's first config is an insert after the update found no row
+        ("hr.put_deduction_config.create", 3, hr.put_deduction_config,
+         lambda db: (DeductionConfig(tax_brackets=[TaxBracket(rate="0.1")], insurance_rate="0.05"), db.info["user"], db)),
+        ("hr.put_deduction_config.update", 2, hr.put_deduction_config,
+         lambda db: (DeductionConfig(tax_brackets=[TaxBracket(rate="0.2")], insurance_rate="0.05"), db.info["user"], db)),
+        # checks employee and salary delete permissions
+        ("hr.bulk_delete_employees", 4, hr.bulk_delete_employees,
+         lambda db: (EmployeeBulkDelete(employee_ids=[state["employee_id"], state["employee_id"] + 1]), db.info["user"], db)),
+        ("hr.delete_employee", 3, hr.delete_employee,
+         lambda db: (1, db.info["user"], db)),
+    ]
+
+
+def upload(filename: str, content: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename=filename)
+
+
+def remember(state, name, result):
+    if name == "leads.create_lead":
+        state["lead_id"] = result.lead_id
+    elif name == "leads.add_call_to_lead":
+        state["call_id"] = result.call_id
+    elif name == "leads.add_meeting_to_lead":
+        state["meeting_id"] = result.meeting_id
+    elif name == "hr.create_employee":
+        state["employee_id"] = result.employee_id
+
+
+def run(verbose: bool = False) -> int:
+    engine = create_standin_engine()
+    with engine.begin() as conn:
+        for statement in SEED:
+            conn.execute(text(statement))
+
+    trace_engine(engine)
+    failures = 0
+
+    with Session(engine) as db:
+        # build the company's meeting index and deduction tables up front; they are one-offs per worker
+        # (the deduction tables still cost their version read per use)
+        leads.meeting_index.get_index(db, CD)
+        hr.deductions.for_company(db, CD)
+
+    state, steps = scenarios()
+    for name, budget, endpoint, args in steps:
+        # a fresh session per step, with the user already loaded - as get_current_user leaves it
+        with Session(engine) as db:
+            db.info["user"] = db.query(UserInfo).filter(UserInfo.id == 1).one()
+            endpoint_args = args(db)
+            try:
+                with max_queries(budget, name) as trace:
+                    result = endpoint(*endpoint_args)
+                over = False
+            except QueryBudgetExceeded:
+                over = True
+        remember(state, name, result)
+
+        failures += over
+        print(f"{'FAIL' if over else 'ok  '}  {name}: {len(trace.statements)} statement(s), budget {budget}")
+        if verbose or over:
+            for statement in trace.statements:
+                print(f"        {statement!r}")
+
+    print(f"\n{failures} endpoint(s) over budget" if failures else "\nAll write paths within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(verbose="-v" in sys.argv))
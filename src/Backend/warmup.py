@@ -0,0 +1,249 @@
+"""
+Startup Warm-Up and Readiness
+
+WHY THIS FILE EXISTS:
+- The first requests a worker served paid for everything that is lazy:
+  opening pooled connections (an ODBC connect each), configuring the ORM
+  mappers, compiling each statement, and filling the per-company caches
+- The load balancer had no way to tell a cold worker from a warm one
+
+HOW IT WORKS:
+- main.py starts warmup.start() on startup; the steps below run in a
+  background thread, so the worker answers /live at once and /ready
+  only when every step has finished
+    schema      -> fail while migrations are pending (migrations.pending):
+                   the code reads tables a migration creates, such as
+                   leads_activity_summary, so an un-migrated database
+                   must not take traffic
+    pool        -> open WARMUP_POOL_CONNECTIONS connections at the same
+                   time (pool_size by default) and give them back to the
+                   pool, so they stay open for the first requests
+    mappers     -> configure_mappers(), which the first ORM query would
+                   otherwise do
+    statements  -> run the statements every request runs (user lookup,
+                   permission merge, admin check) and the hot read shapes
+                   (lookup tables, lead by id, a lead's calls and
+                   meetings) once for WARMUP_TENANT, a domain no company
+                   can have. That fills SQLAlchemy's compiled cache and,
+                   on SQL Server, the plan cache, and returns no rows
+    caches      -> deduction tables of every company and the meeting
+                   index of every company with upcoming meetings (up to
+                   WARMUP_MAX_COMPANIES each)
+- A failed step (say the database is not up yet) is logged and the whole
+  warm-up is retried every WARMUP_RETRY_SECONDS; /ready stays 503 until
+  it succeeds
+
+LIMITS:
+- The statements are the endpoints' shapes, written out again here; if an
+  endpoint's query changes and this list does not, that statement is only
+  compiled on its first real request - it is never a wrong result
+- WARMUP_ENABLED=false skips the steps; the worker is ready at once
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.security import HTTPBasicCredentials
+from sqlalchemy import and_, func, text
+from sqlalchemy.orm import configure_mappers, joinedload
+
+import deductions
+import meeting_index
+import migrations
+import permissions
+from auth import get_current_user, is_company_admin
+from database import SessionLocal, engine
+from models import (
+    CallStatus, ClientCall, ClientMeeting, CompanyInfo, LeadsInfo, LeadsStage, LeadsStatus, LeadsType,
+    MeetingStatus, UserInfo
+)
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", "0"))
+WARMUP_TENANT = os.getenv("WARMUP_TENANT", "warmup.invalid")
+WARMUP_MAX_COMPANIES = int(os.getenv("WARMUP_MAX_COMPANIES", "100"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+
+# no user, lead or employee has id 0
+SENTINEL_ID = 0
+LOOKUP_MODELS = (LeadsStage, LeadsStatus, LeadsType, CallStatus, MeetingStatus)
+
+
+def check_schema() -> int:
+    missing = migrations.pending(engine)
+    if missing:
+        raise RuntimeError(f"migrations {missing} are pending; run `python -m migrations upgrade`")
+    return 0
+
+
+def warm_pool() -> int:
+    """Open the connections together, so each one is a real connect"""
+    wanted = WARMUP_POOL_CONNECTIONS or getattr(engine.pool, "size", lambda: 1)()
+    connections = []
+    try:
+        for _ in range(wanted):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+def warm_mappers() -> int:
+    configure_mappers()
+    return 1
+
+
+def warm_statements() -> int:
+    db = SessionLocal()
+    sentinel = UserInfo(id=SENTINEL_ID, company_domain=WARMUP_TENANT, uid=uuid.UUID(int=0))
+    try:
+        statements = 0
+
+        # every request: Basic auth lookup, permission merge; every admin call: the admin check
+        try:
+            get_current_user(HTTPBasicCredentials(username=WARMUP_TENANT, password=""), db)
+        except HTTPException:
+            pass
+        permissions.get_user_permissions(db, SENTINEL_ID)
+        is_company_admin(db, sentinel)
+        statements += 3
+
+        # api/leads.py lookup endpoints
+        for model in LOOKUP_MODELS:
+            db.query(model).filter(model.company_domain == WARMUP_TENANT).all()
+            statements += 1
+
+        # get_lead_by_id, and the lead check + rows of get_lead_calls / get_lead_meetings
+        db.query(LeadsInfo).options(joinedload(LeadsInfo.activity)).filter(
+            and_(LeadsInfo.lead_id == SENTINEL_ID, LeadsInfo.company_domain == WARMUP_TENANT)
+        ).first()
+        db.query(LeadsInfo).filter(
+            and_(LeadsInfo.lead_id == SENTINEL_ID, LeadsInfo.company_domain == WARMUP_TENANT)
+        ).first()
+        db.query(ClientCall).filter(ClientCall.lead_id == SENTINEL_ID).all()
+        db.query(ClientMeeting).filter(ClientMeeting.lead_id == SENTINEL_ID).all()
+        statements += 4
+        return statements
+    finally:
+        db.rollback()
+        db.close()
+
+
+def warm_caches() -> int:
+    db = SessionLocal()
+    try:
+        companies = [row.company_domain for row in db.query(CompanyInfo.company_domain).order_by(
+            CompanyInfo.company_domain
+        ).limit(WARMUP_MAX_COMPANIES)]
+        for company_domain in companies:
+            deductions.for_company(db, company_domain)
+
+        since = meeting_index.window_start()
+        busy = [row.company_domain for row in db.query(ClientMeeting.company_domain).filter(
+            ClientMeeting.meeting_date >= since
+        ).group_by(ClientMeeting.company_domain).order_by(
+            func.count().desc()
+        ).limit(WARMUP_MAX_COMPANIES)]
+        for company_domain in busy:
+            meeting_index.get_index(db, company_domain)
+        return len(companies) + len(busy)
+    finally:
+        db.rollback()
+        db.close()
+
+
+STEPS: List[Tuple[str, Callable[[], int]]] = [
+    ("schema", check_schema),
+    ("pool", warm_pool),
+    ("mappers", warm_mappers),
+    ("statements", warm_statements),
+    ("caches", warm_caches),
+]
+
+
+class Warmup:
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], int]]] = STEPS):
+        self.steps = steps
+        self.lock = threading.Lock()
+        self.state = "pending"
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.timings: Dict[str, dict] = {}
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.started_at = datetime.now()
+            if not WARMUP_ENABLED:
+                self.state = "ready"
+                self.finished_at = self.started_at
+                return
+            self.state = "warming"
+            self.thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def attempt(self) -> bool:
+        self.attempts += 1
+        for name, step in self.steps:
+            if self.stopped.is_set():
+                return False
+            started = time.perf_counter()
+            try:
+                items = step()
+            except Exception as e:
+                # /ready is public; the driver's message only goes to the log
+                self.error = f"{name} step failed"
+                logger.warning("Warm-up step %s failed (attempt %s): %s", name, self.attempts, e)
+                return False
+            self.timings[name] = {"ms": round((time.perf_counter() - started) * 1000, 1), "items": items}
+        return True
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            if self.attempt():
+                with self.lock:
+                    self.state = "ready"
+                    self.error = None
+                    self.finished_at = datetime.now()
+                logger.info("Warm-up finished in %.0f ms: %s",
+                            (self.finished_at - self.started_at).total_seconds() * 1000, self.timings)
+                return
+            self.stopped.wait(WARMUP_RETRY_SECONDS)
+
+    def status(self) -> dict:
+        with self.lock:
+            return {
+                "state": self.state,
+                "attempts": self.attempts,
+                "error": self.error,
+                "steps": dict(self.timings),
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+warmup = Warmup()
@@ -18,6 +18,8 @@ const HRSalaries = ({ user, onLogout }) => {
   const [editError, setEditError] = useState(null);
   const [fieldErrors, setFieldErrors] = useState({});
   const [permissions, setPermissions] = useState({});
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const navigate = useNavigate();
 
   useEffect(() => {
@@ -55,14 +57,21 @@ const HRSalaries = ({ user, onLogout }) => {
     }
   };
 
+  // the salaries list is keyset-paginated; X-Next-Cursor points at the next page
+  const fetchSalariesPage = (cursor) => {
+    const token = localStorage.getItem('auth_token');
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    return fetch(`http://localhost:8000/api/hr/salaries${query}`, {
+      headers: { 'Authorization': `Basic ${token}` },
+    });
+  };
+
   const fetchData = async () => {
     try {
       const token = localStorage.getItem('auth_token');
       
       const [salariesResponse, employeesResponse] = await Promise.all([
-        fetch('http://localhost:8000/api/hr/salaries', {
-          headers: { 'Authorization': `Basic ${token}` },
-        }),
+        fetchSalariesPage(null),
         fetch('http://localhost:8000/api/hr/employees', {
           headers: { 'Authorization': `Basic ${token}` },
         })
@@ -73,6 +82,7 @@ const HRSalaries = ({ user, onLogout }) => {
         const employeesData = await employeesResponse.json();
         
         setSalaries(salariesData);
+        setNextCursor(salariesResponse.headers.get('X-Next-Cursor'));
         setEmployees(employeesData);
       } else if (salariesResponse.status === 403) {
         setError('You do not have permission to view salaries');
@@ -87,6 +97,26 @@ const HRSalaries = ({ user, onLogout }) => {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await fetchSalariesPage(nextCursor);
+      if (response.ok) {
+        const page = await response.json();
+        setSalaries(current => [...current, ...page]);
+        setNextCursor(response.headers.get('X-Next-Cursor'));
+      } else {
+        setError('Failed to fetch salary data');
+      }
+    } catch (error) {
+      console.error('Failed to fetch more salaries:', error);
+      setError('Failed to load salary data');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getEmployeeName = (employeeId) => {
     const employee = employees.find(emp => emp.employee_id === employeeId);
     return employee ? employee.contact_name : `Employee ${employeeId}`;
@@ -754,6 +784,17 @@ const HRSalaries = ({ user, onLogout }) => {
                       )}
                     </tbody>
                   </table>
+                  {nextCursor && (
+                    <div className="px-6 py-4 flex justify-center border-t border-gray-200">
+                      <button
+                        onClick={handleLoadMore}
+                        disabled={loadingMore}
+                        className="py-2 px-4 rounded-lg font-medium text-sm text-blue-600 border border-blue-200 hover:bg-blue-50 transition-colors disabled:opacity-50"
+                      >
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                      </button>
+                    </div>
+                  )}
                 </div>
               )}
             </div>